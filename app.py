@@ -1,28 +1,22 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime, timedelta
+import hmac
+import io
 import json
+import os
+import pandas as pd
 import numpy as np
-import requests
 import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from dining_agent import DiningHallAgent
+from weather_forecast import ForecastPrefetcher
 
 app = Flask(__name__)
 
-# Initialize the AI agent (with error handling)
-dining_agent = None
-agent_error = None
-
-try:
-    dining_agent = DiningHallAgent(
-        enable_tracing=False,
-        recursion_limit=50  # Increased from default 15
-    )
-    print("✅ Dining Agent initialized successfully with recursion limit: 50")
-except Exception as e:
-    agent_error = str(e)
-    print(f"❌ Failed to initialize Dining Agent: {e}")
-    print("Chat functionality will use fallback responses")
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,21 +47,215 @@ def convert_numpy_types(obj):
     else:
         return obj
 
+def format_prediction_columns(predictions, include_conditions=False, chunk_size=512):
+    """Yield StaffingPredictions as lists of API rows, converting each column to Python values once"""
+    columns = predictions.to_columns()
+    workers = [(WORKER_DISPLAY_NAMES.get(role, role), columns[role]) for role in predictions.roles]
+    dates = columns['date']
+    transactions = columns['predicted_transactions']
+    total_hours = columns['total_predicted_hours']
+    for start in range(0, len(dates), chunk_size):
+        rows = []
+        for i in range(start, min(start + chunk_size, len(dates))):
+            row = {'date': dates[i]}
+            if include_conditions:
+                row['weather'] = columns['weather'][i]
+                row['event'] = columns['event'][i]
+            row['predicted_transactions'] = transactions[i]
+            row['total_predicted_hours'] = total_hours[i]
+            row['workers'] = {name: hours[i] for name, hours in workers}
+            rows.append(row)
+        yield rows
+
+def format_prediction_arrays(predictions):
+    """Format StaffingPredictions as column arrays, with worker columns keyed by display name"""
+    columns = predictions.to_columns()
+    return {
+        'date': columns['date'],
+        'weather': columns['weather'],
+        'event': columns['event'],
+        'predicted_transactions': columns['predicted_transactions'],
+        'total_predicted_hours': columns['total_predicted_hours'],
+        'workers': {WORKER_DISPLAY_NAMES.get(role, role): columns[role] for role in predictions.roles}
+    }
+
+def format_prediction_record(record):
+    """Format one prediction record (role columns plus totals) as an API row with display names"""
+    row = {
+        'date': record['date'],
+        'weather': record['weather'],
+        'event': record['event'],
+        'predicted_transactions': record['predicted_transactions'],
+        'total_predicted_hours': record['total_predicted_hours'],
+        'workers': {}
+    }
+    for key, value in record.items():
+        if key.startswith('actual_'):
+            row['workers'][WORKER_DISPLAY_NAMES.get(key, key)] = value
+    return row
+
+def format_scenario_totals(totals):
+    """Range totals of a scenario session with display names for the roles"""
+    totals = dict(totals)
+    totals['workers'] = {WORKER_DISPLAY_NAMES.get(key, key): value for key, value in totals.pop('role_hours').items()}
+    return totals
+
+def is_condition_value(value):
+    """True for a weather/event given as a name or an integer code (bools are not codes)"""
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+def stream_json_array(chunks):
+    """Stream an iterable of row lists as a single JSON array response"""
+    def generate():
+        first = True
+        for rows in chunks:
+            for row in rows:
+                yield ('[' if first else ',') + app.json.dumps(row, separators=(',', ':'))
+                first = False
+        yield '[]' if first else ']'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 # Try to initialize the predictor with your models
 predictor = None
 models_loaded = False
+model_watcher = None
+model_source = {'tx_model_path': 'tx_model.pkl', 'work_model_path': 'work_model.pkl', 'native_model_dir': None}
+predictor_load_seconds = None
+predictor_load_bytes = None
 try:
-    from inference import StaffingPredictor
-    predictor = StaffingPredictor()
-    predictor.load_models('tx_model.pkl', 'work_model.pkl')
+    from inference import (StaffingPredictor, ModelFileWatcher, ScenarioSession, FacilityRegistry,
+                           MODEL_METADATA_FILE, QUANTILE_METADATA_FILE, resident_memory_bytes)
+    load_started = time.perf_counter()
+    rss_before = resident_memory_bytes()
+    predictor = StaffingPredictor(backend=os.environ.get('PREDICTOR_BACKEND', 'xgboost'))
+    # Prefer native XGBoost artifacts (see convert_models.py) over the pickles
+    native_model_dir = os.environ.get('NATIVE_MODEL_DIR', 'models')
+    if os.path.exists(os.path.join(native_model_dir, MODEL_METADATA_FILE)):
+        model_source['native_model_dir'] = native_model_dir
+        predictor.load_native_models(native_model_dir)
+    else:
+        predictor.load_models(model_source['tx_model_path'], model_source['work_model_path'])
     models_loaded = True
+    predictor_load_seconds = time.perf_counter() - load_started
+    rss_after = resident_memory_bytes()
+    if rss_before is not None and rss_after is not None:
+        predictor_load_bytes = max(rss_after - rss_before, 0)
     print("✓ Models loaded successfully!")
+    # Optional quantile models add prediction intervals (see train_quantile_models.py)
+    quantile_model_dir = os.environ.get('QUANTILE_MODEL_DIR', 'quantile_models')
+    if os.path.exists(os.path.join(quantile_model_dir, QUANTILE_METADATA_FILE)):
+        try:
+            predictor.load_quantile_models(quantile_model_dir)
+            print("✓ Quantile models loaded, prediction intervals enabled")
+        except Exception as e:
+            print(f"⚠️  Warning: Could not load quantile models - {e}")
+    # Precompute every date x weather x event scenario for the next year in the background
+    predictor.build_scenario_cube_async(num_days=365, path='scenario_cube.npz')
+    # Optionally hot-reload retrained models as soon as they land on disk
+    watch_interval = float(os.environ.get('MODEL_WATCH_INTERVAL', '0'))
+    if watch_interval > 0:
+        model_watcher = ModelFileWatcher(predictor, interval=watch_interval, **model_source).start()
 except Exception as e:
     print(f"⚠️  Warning: Could not load models - {e}")
     print("Running in demo mode with mock data")
     predictor = None
     models_loaded = False
 
+# Other dining facilities, each with its own model pair, loaded on first use (see facilities.example.json).
+# The predictor above serves the default facility.
+facility_registry = None
+if models_loaded:
+    try:
+        facility_config = os.environ.get('FACILITY_CONFIG', 'facilities.json')
+        facility_options = {'predictor_options': {'backend': predictor.backend}}
+        if os.environ.get('FACILITY_MEMORY_BUDGET_MB'):
+            facility_options['memory_budget_mb'] = float(os.environ['FACILITY_MEMORY_BUDGET_MB'])
+        if os.path.exists(facility_config):
+            facility_registry = FacilityRegistry.from_config(facility_config, **facility_options)
+        else:
+            facility_registry = FacilityRegistry(**facility_options)
+        default_facility = facility_registry.default_facility or os.environ.get('DEFAULT_FACILITY', 'centerpointe')
+        default_name = facility_registry.facilities.get(default_facility, {}).get('name')
+        facility_registry.register(default_facility, name=default_name, predictor=predictor,
+                                   memory_bytes=predictor_load_bytes, **model_source)
+        print(f"✓ Facilities: {', '.join(facility_registry.facilities)} (default: {default_facility})")
+    except Exception as e:
+        print(f"⚠️  Warning: Could not load facility config - {e}")
+        facility_registry = FacilityRegistry()
+        facility_registry.register(os.environ.get('DEFAULT_FACILITY', 'centerpointe'), predictor=predictor,
+                                   memory_bytes=predictor_load_bytes, **model_source)
+
+# Initialize the AI agent (with error handling). It shares the predictor and facility registry above,
+# so each process keeps one copy of the models instead of loading them again for the agent.
+dining_agent = None
+agent_error = None
+
+try:
+    dining_agent = DiningHallAgent(
+        enable_tracing=False,
+        recursion_limit=50,  # Increased from default 15
+        predictor=predictor,
+        facility_registry=facility_registry
+    )
+    print("✅ Dining Agent initialized successfully with recursion limit: 50")
+    if predictor is not None and dining_agent.predictor is predictor:
+        saved_memory = f"~{predictor_load_bytes / 1e6:.1f} MB" if predictor_load_bytes is not None else "one model copy"
+        logger.info(f"Agent shares the app's predictor: saved {saved_memory} of resident memory "
+                    f"and {predictor_load_seconds:.2f}s of startup model loading")
+except Exception as e:
+    agent_error = str(e)
+    print(f"❌ Failed to initialize Dining Agent: {e}")
+    print("Chat functionality will use fallback responses")
+
+def facility_predictor(facility=None):
+    """Predictor for a request's optional facility ID (the default facility's when none is given)"""
+    if not facility or facility_registry is None:
+        return predictor
+    return facility_registry.get(facility)
+
+# What-if scenario sessions, least recently used evicted first
+MAX_SCENARIO_SESSIONS = int(os.environ.get('MAX_SCENARIO_SESSIONS', '64'))
+MAX_SCENARIO_DAYS = 3660
+MAX_BATCH_DAYS = int(os.environ.get('MAX_BATCH_DAYS', '3660'))
+MAX_SCENARIO_BATCH = int(os.environ.get('MAX_SCENARIO_BATCH', '100000'))
+# Request body limit for scenario batches, about 128 bytes per row by default
+MAX_SCENARIO_BYTES = int(os.environ.get('MAX_SCENARIO_BYTES', str(MAX_SCENARIO_BATCH * 128)))
+# No endpoint takes a larger body; this also stops chunked uploads that send no Content-Length
+app.config['MAX_CONTENT_LENGTH'] = MAX_SCENARIO_BYTES
+MAX_MATRIX_DATES = int(os.environ.get('MAX_MATRIX_DATES', '31'))
+
+class ScenarioSessionStore:
+    """Thread-safe LRU map of session ID to ScenarioSession; the least recently used are dropped first"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def put(self, session_id, session):
+        with self._lock:
+            self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+
+    def pop(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+scenario_sessions = ScenarioSessionStore(MAX_SCENARIO_SESSIONS) if models_loaded else None
+
 # Worker type mapping for display
 WORKER_DISPLAY_NAMES = {
     'actual_foh_general': 'General Purpose Worker',
@@ -78,65 +266,24 @@ WORKER_DISPLAY_NAMES = {
     'actual_management': 'Management'
 }
 
-# National Weather Service API functions
+# NWS 7-day forecast, refreshed in the background so requests never wait on the network.
+# FORECAST_REFRESH_INTERVAL=0 turns the lookup off and every date uses the default weather.
+FORECAST_REFRESH_INTERVAL = float(os.environ.get('FORECAST_REFRESH_INTERVAL', '1800'))
+FORECAST_MAX_AGE = float(os.environ.get('FORECAST_MAX_AGE', '21600'))
+forecast_prefetcher = None
+if FORECAST_REFRESH_INTERVAL > 0:
+    # Cal Poly Pomona coordinates (approximate)
+    forecast_prefetcher = ForecastPrefetcher(lat=34.0575, lon=-117.8231, interval=FORECAST_REFRESH_INTERVAL,
+                                             max_age=FORECAST_MAX_AGE).start()
+
 def get_weather_forecast(date):
     """
-    Get weather forecast from National Weather Service API for a specific date.
-    Returns weather condition if within 7 days from today, None otherwise.
+    Get weather forecast from the prefetched National Weather Service forecast for a specific date.
+    Returns weather condition if within 7 days from today and the forecast is fresh, None otherwise.
     """
-    today = datetime.now().date()
-    target_date = date.date() if isinstance(date, datetime) else date
-    
-    # Only get weather for dates within 7 days from today
-    if (target_date - today).days > 7 or target_date < today:
+    if forecast_prefetcher is None:
         return None
-    
-    try:
-        # Cal Poly Pomona coordinates (approximate)
-        lat, lon = 34.0575, -117.8231
-        
-        # Get forecast data from NWS API
-        forecast_url = f"https://api.weather.gov/points/{lat},{lon}"
-        response = requests.get(forecast_url, timeout=10)
-        
-        if response.status_code != 200:
-            return None
-            
-        data = response.json()
-        forecast_url = data['properties']['forecast']
-        
-        # Get the actual forecast
-        forecast_response = requests.get(forecast_url, timeout=10)
-        if forecast_response.status_code != 200:
-            return None
-            
-        forecast_data = forecast_response.json()
-        periods = forecast_data['properties']['periods']
-        
-        # Find the forecast for the target date
-        for period in periods:
-            period_date = datetime.fromisoformat(period['startTime'].replace('Z', '+00:00')).date()
-            if period_date == target_date:
-                # Map NWS conditions to our weather categories
-                detailed_forecast = period['detailedForecast'].lower()
-                short_forecast = period['shortForecast'].lower()
-                
-                if 'rain' in detailed_forecast or 'rain' in short_forecast or 'shower' in detailed_forecast:
-                    return 'rainy'
-                elif 'sunny' in short_forecast or 'clear' in short_forecast:
-                    return 'sunny'
-                elif 'cloud' in short_forecast or 'overcast' in short_forecast:
-                    return 'cloudy'
-                elif period.get('temperature', 0) > 95:  # Extreme heat threshold
-                    return 'extreme_heat'
-                else:
-                    return 'sunny'  # Default fallback
-                    
-    except Exception as e:
-        print(f"Error fetching weather data: {e}")
-        return None
-    
-    return None
+    return forecast_prefetcher.get(date)
 
 def get_mock_prediction_simple(date_str):
     """Generate mock prediction data for simple date-only predictions"""
@@ -174,6 +321,7 @@ def get_mock_prediction_simple(date_str):
 MOCK_WEATHER_OPTIONS = ['sunny', 'cloudy', 'rainy', 'extreme_heat']
 MOCK_EVENT_OPTIONS = ['regular_day', 'club_fair', 'career_fair', 'sports_events', 'graduation', 
                      'parent_weekend', 'prospective_student_day', 'conference_hosting', 'campus_construction']
+MOCK_FIDELITY_LEVELS = {'full': 1.0, 'high': 0.75, 'medium': 0.5, 'preview': 0.25}
 
 def get_mock_prediction(date, weather, event):
     """Generate mock prediction data for demo purposes"""
@@ -237,6 +385,38 @@ def get_weather_options():
     else:
         return jsonify(MOCK_WEATHER_OPTIONS)
 
+@app.route('/api/input-codes')
+def get_input_codes():
+    """Integer code table for weather and event inputs (a value's code is its list index)"""
+    if models_loaded and predictor:
+        return jsonify(predictor.get_code_table())
+    return jsonify({'weather': MOCK_WEATHER_OPTIONS, 'event': MOCK_EVENT_OPTIONS})
+
+@app.route('/api/facilities')
+def get_facilities():
+    """Configured dining facilities, which are loaded, and their resident model memory"""
+    if facility_registry is None:
+        return jsonify({'default_facility': None, 'facilities': {}})
+    return jsonify(facility_registry.info())
+
+# Measured preview-fidelity error per model version (computed on first request)
+fidelity_reports = {}
+
+@app.route('/api/fidelity-levels')
+def get_fidelity_levels():
+    """Preview fidelity levels with their error against the full models on the historical data"""
+    if not (models_loaded and predictor):
+        return jsonify({'levels': MOCK_FIDELITY_LEVELS, 'report': None})
+    try:
+        model_version = predictor.model_version
+        if model_version not in fidelity_reports:
+            fidelity_reports.clear()
+            fidelity_reports[model_version] = predictor.fidelity_report(os.environ.get('FIDELITY_DATA', 'df.csv'))
+        return jsonify({'levels': predictor.FIDELITY_LEVELS, 'model_version': model_version,
+                        'report': fidelity_reports[model_version]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/event-options')
 def get_event_options():
     """Get available campus events"""
@@ -255,6 +435,7 @@ def predict_staffing():
         date_str = data.get('date')
         weather = data.get('weather')
         event = data.get('event')
+        fidelity = data.get('fidelity')  # optional reduced-tree preview level, see /api/fidelity-levels
         
         # Validate inputs
         if not all([date_str, weather, event]):
@@ -268,7 +449,11 @@ def predict_staffing():
         
         # Get prediction
         if models_loaded and predictor:
-            prediction = predictor.predict_staffing_requirements(date, weather, event)
+            try:
+                active_predictor = facility_predictor(data.get('facility'))
+                prediction = active_predictor.predict_staffing_requirements(date, weather, event, fidelity=fidelity)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             prediction = convert_numpy_types(prediction)
         else:
             prediction = get_mock_prediction(date_str, weather, event)
@@ -299,6 +484,7 @@ def simple_batch_predict():
         
         start_date_str = data.get('start_date')
         end_date_str = data.get('end_date')
+        fidelity = data.get('fidelity')
         
         # Validate inputs
         if not all([start_date_str, end_date_str]):
@@ -310,7 +496,22 @@ def simple_batch_predict():
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        if (end_date - start_date).days + 1 > MAX_BATCH_DAYS:
+            return jsonify({'error': f'Date range is limited to {MAX_BATCH_DAYS} days'}), 400
         
+        # Get simple predictions (date-only, using default weather/event)
+        if models_loaded and predictor:
+            if end_date < start_date:
+                return jsonify([])
+            try:
+                active_predictor = facility_predictor(data.get('facility'))
+                # One batched pass over the days of the range not already in the predictor's range cache
+                predictions = active_predictor.predict_range(start_date, end_date, 'sunny', 'regular_day',
+                                                             fidelity=fidelity)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return stream_json_array(format_prediction_columns(predictions))
+
         # Generate date range
         dates = []
         current_date = start_date
@@ -318,18 +519,11 @@ def simple_batch_predict():
             dates.append(current_date)
             current_date += timedelta(days=1)
         
-        # Get simple predictions (date-only, using default weather/event)
         formatted_predictions = []
         
         for date in dates:
             date_str = date.strftime('%Y-%m-%d')
-            
-            if models_loaded and predictor:
-                # Use default conditions for simple prediction
-                prediction = predictor.predict_staffing_requirements(date, 'sunny', 'regular_day')
-                prediction = convert_numpy_types(prediction)
-            else:
-                prediction = get_mock_prediction_simple(date_str)
+            prediction = get_mock_prediction_simple(date_str)
             
             formatted_row = {
                 'date': date_str,
@@ -351,6 +545,75 @@ def simple_batch_predict():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/scenario-matrix', methods=['POST'])
+def scenario_matrix():
+    """
+    API endpoint for the full weather x event matrix of one or more dates.
+
+    Takes 'date' or a 'dates' list (plus optional facility and fidelity). Each date's
+    combinations are predicted as one batch; every metric comes back as a
+    [weather][event] nested list following the returned weather_conditions and events.
+    """
+    try:
+        data = request.get_json()
+        
+        date_strs = data.get('dates') or ([data['date']] if data.get('date') else [])
+        
+        # Validate inputs
+        if not date_strs or not isinstance(date_strs, list):
+            return jsonify({'error': 'Missing date or dates parameter'}), 400
+        if len(date_strs) > MAX_MATRIX_DATES:
+            return jsonify({'error': f'Limited to {MAX_MATRIX_DATES} dates per request'}), 400
+        
+        # Parse dates
+        try:
+            dates = [datetime.strptime(date_str, '%Y-%m-%d') for date_str in date_strs]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        weather_conditions = predictor.get_available_weather_conditions() if models_loaded and predictor else MOCK_WEATHER_OPTIONS
+        events = predictor.get_available_events() if models_loaded and predictor else MOCK_EVENT_OPTIONS
+        shape = (len(dates), len(weather_conditions), len(events))
+        
+        if models_loaded and predictor:
+            try:
+                active_predictor = facility_predictor(data.get('facility'))
+                predictions = active_predictor.predict_scenario_matrix(dates, fidelity=data.get('fidelity'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            transactions = predictions.predicted_transactions.reshape(shape).tolist()
+            total_hours = predictions.total_predicted_hours.reshape(shape).tolist()
+            workers = {WORKER_DISPLAY_NAMES.get(role, role): predictions.role_hours[:, i].reshape(shape).tolist()
+                       for i, role in enumerate(predictions.roles)}
+        else:
+            # Use mock data
+            predictions = [get_mock_prediction(date_str, weather, event)
+                           for date_str in date_strs for weather in weather_conditions for event in events]
+            def mock_matrix(key):
+                values = np.array([prediction.get(key, 0) for prediction in predictions])
+                return values.reshape(shape).tolist()
+            transactions = mock_matrix('predicted_transactions')
+            total_hours = mock_matrix('total_predicted_hours')
+            workers = {WORKER_DISPLAY_NAMES.get(key, key): mock_matrix(key)
+                       for key in predictions[0] if key.startswith('actual_')}
+        
+        return jsonify({
+            'weather_conditions': weather_conditions,
+            'events': events,
+            'matrices': [
+                {
+                    'date': date_str,
+                    'predicted_transactions': transactions[i],
+                    'total_predicted_hours': total_hours[i],
+                    'workers': {name: matrix[i] for name, matrix in workers.items()}
+                }
+                for i, date_str in enumerate(date_strs)
+            ]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/detailed-predict', methods=['POST'])
 def detailed_predict():
     """API endpoint for detailed prediction of a specific date with weather and event"""
@@ -374,9 +637,16 @@ def detailed_predict():
         weather_from_api = get_weather_forecast(date)
         weather_used = weather_from_api if weather_from_api else 'sunny'  # Default fallback
         
-        # Get prediction
+        # Get prediction, with intervals when quantile models are loaded
         if models_loaded and predictor:
-            prediction = predictor.predict_staffing_requirements(date, weather_used, event)
+            try:
+                active_predictor = facility_predictor(data.get('facility'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if active_predictor.quantile_models is not None:
+                prediction = active_predictor.predict_staffing_intervals(date, weather_used, event)
+            else:
+                prediction = active_predictor.predict_staffing_requirements(date, weather_used, event)
             prediction = convert_numpy_types(prediction)
         else:
             prediction = get_mock_prediction(date_str, weather_used, event)
@@ -398,22 +668,45 @@ def detailed_predict():
                 display_name = WORKER_DISPLAY_NAMES.get(key, key)
                 formatted_prediction['workers'][display_name] = value
         
+        # Prediction intervals keyed by quantile, e.g. {'p10': ..., 'p50': ..., 'p90': ...}
+        intervals = prediction.get('intervals')
+        if intervals:
+            formatted_prediction['intervals'] = {
+                'quantiles': intervals['quantiles'],
+                'predicted_transactions': intervals['predicted_transactions'],
+                'total_predicted_hours': intervals['total_predicted_hours'],
+                'workers': {
+                    WORKER_DISPLAY_NAMES.get(key, key): value
+                    for key, value in intervals.items() if key.startswith('actual_')
+                }
+            }
+        
         return jsonify(formatted_prediction)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch-predict', methods=['POST'])
 def batch_predict_staffing():
-    """API endpoint for batch predictions over a date range"""
+    """
+    API endpoint for batch predictions over a date range with per-day conditions.
+
+    weather/event are either one value for every day (default sunny/regular_day) or arrays with
+    one value per day; overrides maps 'YYYY-MM-DD' to {'weather'?, 'event'?} on top of them.
+    All days are predicted in one vectorized call. Pass format='columns' for column arrays
+    instead of one object per day.
+    """
     try:
         data = request.get_json()
         
         start_date_str = data.get('start_date')
         end_date_str = data.get('end_date')
-        weather = data.get('weather')
-        event = data.get('event')
+        weather = data.get('weather', 'sunny')
+        event = data.get('event', 'regular_day')
+        overrides = data.get('overrides') or {}
         
         # Validate inputs
-        if not all([start_date_str, end_date_str, weather, event]):
+        if not all([start_date_str, end_date_str]) or weather is None or event is None:
             return jsonify({'error': 'Missing required parameters'}), 400
         
         # Parse dates
@@ -422,41 +715,63 @@ def batch_predict_staffing():
             end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        num_days = (end_date - start_date).days + 1
+        if num_days <= 0:
+            return jsonify([])
+        if num_days > MAX_BATCH_DAYS:
+            return jsonify({'error': f'Date range is limited to {MAX_BATCH_DAYS} days'}), 400
+        dates = [start_date + timedelta(days=i) for i in range(num_days)]
         
-        # Generate date range
-        dates = []
-        current_date = start_date
-        while current_date <= end_date:
-            dates.append(current_date)
-            current_date += timedelta(days=1)
+        # Per-day weather and event: a single value repeated, or one array entry per day
+        conditions = {}
+        for name, value in (('weather', weather), ('event', event)):
+            if isinstance(value, list):
+                if len(value) != num_days:
+                    return jsonify({'error': f'{name} array length ({len(value)}) must match the number of days ({num_days})'}), 400
+                for i, item in enumerate(value):
+                    if not is_condition_value(item):
+                        return jsonify({'error': f'{name}[{i}] must be a name or an integer code'}), 400
+                conditions[name] = np.empty(num_days, dtype=object)
+                conditions[name][:] = value
+            elif is_condition_value(value):
+                conditions[name] = np.full(num_days, value, dtype=object)
+            else:
+                return jsonify({'error': f'{name} must be a name, an integer code or an array with one per day'}), 400
         
-        # Create weather and event lists
-        weather_conditions = [weather] * len(dates)
-        events = [event] * len(dates)
+        # Sparse per-date overrides on top of the defaults
+        if not isinstance(overrides, dict):
+            return jsonify({'error': 'overrides must map YYYY-MM-DD dates to {"weather", "event"}'}), 400
+        for date_str, override in overrides.items():
+            try:
+                index = (datetime.strptime(date_str, '%Y-%m-%d') - start_date).days
+            except ValueError:
+                return jsonify({'error': f'Invalid override date: {date_str}. Use YYYY-MM-DD'}), 400
+            if not 0 <= index < num_days:
+                return jsonify({'error': f'Override date {date_str} is outside the requested range'}), 400
+            if not isinstance(override, dict):
+                return jsonify({'error': f'Override for {date_str} must be an object with "weather" and/or "event"'}), 400
+            unknown = sorted(set(override) - {'weather', 'event'})
+            if unknown:
+                return jsonify({'error': f'Override for {date_str} has unknown key(s): {", ".join(unknown)}'}), 400
+            for name in ('weather', 'event'):
+                if name in override:
+                    if not is_condition_value(override[name]):
+                        return jsonify({'error': f'Override {name} for {date_str} must be a name or an integer code'}), 400
+                    conditions[name][index] = override[name]
+        weather_conditions = conditions['weather'].tolist()
+        events = conditions['event'].tolist()
         
         # Get batch predictions
         if models_loaded and predictor:
-            batch_predictions = predictor.batch_predict(dates, weather_conditions, events)
-            # Format response
-            formatted_predictions = []
-            for _, row in batch_predictions.iterrows():
-                row_dict = convert_numpy_types(row.to_dict())
-                formatted_row = {
-                    'date': row_dict['date'],
-                    'weather': row_dict['weather'],
-                    'event': row_dict['event'],
-                    'predicted_transactions': row_dict.get('predicted_transactions', 0),
-                    'total_predicted_hours': row_dict.get('total_predicted_hours', 0),
-                    'workers': {}
-                }
-                
-                # Add worker predictions with display names
-                for key, value in row_dict.items():
-                    if key.startswith('actual_'):
-                        display_name = WORKER_DISPLAY_NAMES.get(key, key)
-                        formatted_row['workers'][display_name] = value
-                
-                formatted_predictions.append(formatted_row)
+            try:
+                active_predictor = facility_predictor(data.get('facility'))
+                predictions = active_predictor.predict_columns(dates, weather_conditions, events,
+                                                               fidelity=data.get('fidelity'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if data.get('format') == 'columns':
+                return jsonify(format_prediction_arrays(predictions))
+            return stream_json_array(format_prediction_columns(predictions, include_conditions=True))
         else:
             # Use mock data
             formatted_predictions = []
@@ -484,6 +799,275 @@ def batch_predict_staffing():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def mock_condition_name(value, options):
+    """Map an integer code to its mock option name; names pass through unchanged"""
+    if isinstance(value, int) and 0 <= value < len(options):
+        return options[value]
+    return value
+
+def format_mock_scenario_row(date_str, weather, event):
+    """Mock prediction for one scenario, formatted like the scenario-batch result rows"""
+    prediction = get_mock_prediction(date_str, weather, event)
+    return {
+        'date': date_str,
+        'weather': weather,
+        'event': event,
+        'predicted_transactions': prediction.get('predicted_transactions', 0),
+        'total_predicted_hours': prediction.get('total_predicted_hours', 0),
+        'workers': {WORKER_DISPLAY_NAMES.get(key, key): value
+                    for key, value in prediction.items() if key.startswith('actual_')}
+    }
+
+def parse_scenario_rows(data):
+    """
+    Read bulk scenario rows from a CSV body or upload, or from JSON.
+
+    CSV needs date, weather and event (or campus_event) columns. JSON takes
+    {"scenarios": [...]} where each row is {"date", "weather", "event"} or a
+    [date, weather, event] triple.
+
+    Returns:
+        (dates, weather_conditions, events) as lists of date strings and names
+    """
+    upload = request.files.get('file')
+    if upload is not None or request.mimetype == 'text/csv':
+        body = upload.read() if upload is not None else request.get_data()
+        frame = pd.read_csv(io.BytesIO(body), dtype=str, keep_default_na=False, skipinitialspace=True)
+        frame = frame.rename(columns={'campus_event': 'event'})
+        missing = [column for column in ('date', 'weather', 'event') if column not in frame.columns]
+        if missing:
+            raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+        return frame['date'].tolist(), frame['weather'].tolist(), frame['event'].tolist()
+
+    scenarios = (data or {}).get('scenarios')
+    if not isinstance(scenarios, list):
+        raise ValueError('Expected a "scenarios" list or a CSV upload')
+    dates, weather_conditions, events = [], [], []
+    for i, scenario in enumerate(scenarios):
+        try:
+            if isinstance(scenario, dict):
+                date, weather, event = scenario['date'], scenario['weather'], scenario['event']
+            else:
+                date, weather, event = scenario
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Row {i}: expected {{"date", "weather", "event"}} or [date, weather, event]')
+        if not isinstance(date, str):
+            raise ValueError(f'Row {i}: date must be a YYYY-MM-DD string')
+        for name, value in (('weather', weather), ('event', event)):
+            if not is_condition_value(value):
+                raise ValueError(f'Row {i}: {name} must be a name or an integer code')
+        dates.append(date)
+        weather_conditions.append(weather)
+        events.append(event)
+    return dates, weather_conditions, events
+
+@app.route('/api/scenario-batch', methods=['POST'])
+def scenario_batch_predict():
+    """
+    API endpoint for scoring a large list of arbitrary (date, weather, event) scenarios.
+
+    Accepts JSON ({"scenarios": [...]}) or CSV (text/csv body or a multipart "file" upload);
+    facility, fidelity and format also come from the query string. Duplicate scenarios are
+    predicted once, all rows in one batched pass, and results come back in input order with
+    the time spent parsing, predicting and serializing (also sent as a Server-Timing header).
+    """
+    started = time.perf_counter()
+    if request.content_length is not None and request.content_length > MAX_SCENARIO_BYTES:
+        return jsonify({'error': f'Request body is limited to {MAX_SCENARIO_BYTES} bytes'}), 413
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object with a "scenarios" list'}), 400
+        options = {**request.args.to_dict(), **{key: data[key] for key in ('facility', 'fidelity', 'format') if key in data}}
+        try:
+            date_strings, weather_conditions, events = parse_scenario_rows(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if len(date_strings) > MAX_SCENARIO_BATCH:
+            return jsonify({'error': f'Batch is limited to {MAX_SCENARIO_BATCH} scenarios, got {len(date_strings)}'}), 413
+
+        # Scenario lists repeat a small set of dates, so parse each distinct string once
+        parsed_dates = {}
+        for i, date_string in enumerate(date_strings):
+            if date_string not in parsed_dates:
+                try:
+                    parsed_dates[date_string] = datetime.strptime(date_string, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': f'Row {i}: invalid date {date_string!r}. Use YYYY-MM-DD'}), 400
+        dates = [parsed_dates[date_string] for date_string in date_strings]
+        parse_seconds = time.perf_counter() - started
+
+        if models_loaded and predictor:
+            try:
+                active_predictor = facility_predictor(options.get('facility'))
+                predictions = active_predictor.predict_scenarios(dates, weather_conditions, events,
+                                                                 fidelity=options.get('fidelity'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            # Count on codes, as predict_scenarios dedupes, so a name and its code are one scenario
+            weather_codes, event_codes = active_predictor.encode_inputs(weather_conditions, events)
+            unique_scenarios = len(set(zip(dates, weather_codes.tolist(), event_codes.tolist())))
+            inference_seconds = time.perf_counter() - started - parse_seconds
+            if options.get('format') == 'columns':
+                results = format_prediction_arrays(predictions)
+            else:
+                results = [row for rows in format_prediction_columns(predictions, include_conditions=True)
+                           for row in rows]
+        else:
+            # Use mock data, one mock prediction per distinct scenario
+            mock_rows = {}
+            rows = []
+            for date, weather, event in zip(dates, weather_conditions, events):
+                key = (date, mock_condition_name(weather, MOCK_WEATHER_OPTIONS),
+                       mock_condition_name(event, MOCK_EVENT_OPTIONS))
+                if key not in mock_rows:
+                    mock_rows[key] = format_mock_scenario_row(date.strftime('%Y-%m-%d'), *key[1:])
+                rows.append(mock_rows[key])
+            unique_scenarios = len(mock_rows)
+            inference_seconds = time.perf_counter() - started - parse_seconds
+            if options.get('format') == 'columns':
+                results = {key: [row[key] for row in rows]
+                           for key in ('date', 'weather', 'event', 'predicted_transactions', 'total_predicted_hours')}
+                results['workers'] = {name: [row['workers'][name] for row in rows]
+                                      for name in (rows[0]['workers'] if rows else {})}
+            else:
+                results = rows
+        results_json = app.json.dumps(results, separators=(',', ':'))
+        serialize_seconds = time.perf_counter() - started - parse_seconds - inference_seconds
+
+        timings = {
+            'parse': round(parse_seconds * 1000, 3),
+            'inference': round(inference_seconds * 1000, 3),
+            'serialize': round(serialize_seconds * 1000, 3),
+        }
+        summary = app.json.dumps({
+            'count': len(dates),
+            'unique_scenarios': unique_scenarios,
+            'max_batch_size': MAX_SCENARIO_BATCH,
+            'timings_ms': timings,
+        }, separators=(',', ':'))
+        # Splice the already serialized results into the summary object
+        response = Response(summary[:-1] + ',"results":' + results_json + '}', mimetype='application/json')
+        response.headers['Server-Timing'] = ', '.join(f'{name};dur={ms}' for name, ms in timings.items())
+        return response
+        
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'Request body is limited to {MAX_SCENARIO_BYTES} bytes'}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scenario-sessions', methods=['POST'])
+def create_scenario_session():
+    """Start a what-if session over a date range; later edits recompute only the changed days"""
+    if not (models_loaded and predictor):
+        return jsonify({'error': 'Scenario sessions require the prediction models'}), 503
+    try:
+        data = request.get_json()
+        
+        start_date_str = data.get('start_date')
+        end_date_str = data.get('end_date')
+        if not all([start_date_str, end_date_str]):
+            return jsonify({'error': 'Missing required parameters'}), 400
+        
+        try:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        if (end_date - start_date).days >= MAX_SCENARIO_DAYS:
+            return jsonify({'error': f'Date range is limited to {MAX_SCENARIO_DAYS} days'}), 400
+        
+        try:
+            session = ScenarioSession(facility_predictor(data.get('facility')), start_date, end_date,
+                                      weather=data.get('weather', 'sunny'), event=data.get('event', 'regular_day'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        session_id = uuid.uuid4().hex
+        scenario_sessions.put(session_id, session)
+        snapshot = session.snapshot()
+        return jsonify({
+            'session_id': session_id,
+            'predictions': [format_prediction_record(record) for record in snapshot['records']],
+            'totals': format_scenario_totals(snapshot['totals'])
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scenario-sessions/<session_id>', methods=['GET'])
+def get_scenario_session(session_id):
+    """Current inputs, predictions and totals of a what-if session"""
+    session = scenario_sessions.get(session_id) if scenario_sessions is not None else None
+    if session is None:
+        return jsonify({'error': 'Unknown or expired scenario session'}), 404
+    session.refresh()
+    snapshot = session.snapshot()
+    return jsonify({
+        'session_id': session_id,
+        'predictions': [format_prediction_record(record) for record in snapshot['records']],
+        'totals': format_scenario_totals(snapshot['totals'])
+    })
+
+@app.route('/api/scenario-sessions/<session_id>/changes', methods=['POST'])
+def apply_scenario_changes(session_id):
+    """Apply per-day weather/event edits; returns only the changed days and the updated totals"""
+    session = scenario_sessions.get(session_id) if scenario_sessions is not None else None
+    if session is None:
+        return jsonify({'error': 'Unknown or expired scenario session'}), 404
+    try:
+        data = request.get_json()
+        changes = data.get('changes')
+        if not isinstance(changes, list) or not all(isinstance(change, dict) and 'date' in change
+                                                    for change in changes):
+            return jsonify({'error': 'changes must be a list of {date, weather?, event?} objects'}), 400
+        for i, change in enumerate(changes):
+            if not isinstance(change['date'], str):
+                return jsonify({'error': f'changes[{i}].date must be a YYYY-MM-DD string'}), 400
+            for name in ('weather', 'event'):
+                if name in change and not is_condition_value(change[name]):
+                    return jsonify({'error': f'changes[{i}].{name} must be a name or an integer code'}), 400
+        
+        try:
+            result = session.apply(changes)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'session_id': session_id,
+            'changed': [format_prediction_record(record) for record in result['changed']],
+            'totals': format_scenario_totals(result['totals'])
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scenario-sessions/<session_id>', methods=['DELETE'])
+def delete_scenario_session(session_id):
+    """End a what-if session"""
+    if scenario_sessions is not None:
+        scenario_sessions.pop(session_id)
+    return jsonify({'success': True})
+
+@app.route('/api/admin/reload-models', methods=['POST'])
+def reload_models():
+    """Hot-swap retrained models from the configured model files without restarting"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({'error': 'Admin endpoints are disabled. Set ADMIN_TOKEN to enable them.'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), admin_token.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    if not (models_loaded and predictor):
+        return jsonify({'error': 'Models are not loaded'}), 503
+
+    try:
+        model_version = predictor.reload_models(**model_source)
+        return jsonify({'success': True, 'model_version': model_version})
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}")
+        return jsonify({'error': f'Reload failed, current models kept: {e}', 'model_version': predictor.model_version}), 500
+
 @app.route('/api/tomorrow-summary')
 def get_tomorrow_summary():
     """Get quick summary for tomorrow with default conditions"""
@@ -496,7 +1080,11 @@ def get_tomorrow_summary():
         event = 'regular_day'
         
         if models_loaded and predictor:
-            prediction = predictor.predict_staffing_requirements(tomorrow, weather, event)
+            try:
+                active_predictor = facility_predictor(request.args.get('facility'))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            prediction = active_predictor.predict_staffing_requirements(tomorrow, weather, event)
             prediction = convert_numpy_types(prediction)
         else:
             prediction = get_mock_prediction(tomorrow.strftime('%Y-%m-%d'), weather, event)
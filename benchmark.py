@@ -0,0 +1,226 @@
+"""
+Benchmark the StaffingPredictor hot paths.
+
+Times single-day predict_staffing_requirements and predict_transactions,
+batch_predict over 7/30/365/3650 days, cold model loading, and feature
+construction alone, on the shipped models with seeded random inputs. Each
+benchmark reports throughput (rows/s) and p50/p95/p99 latency. Results are
+written as JSON so a run on one commit can be compared against a baseline
+saved from another.
+
+The prediction cache is disabled and no scenario cube is built, so every call
+runs the models.
+
+Usage:
+    python benchmark.py --out baseline.json
+    python benchmark.py --out current.json --baseline baseline.json --threshold 0.10
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from inference import StaffingPredictor, xgb
+
+BATCH_SIZES = (7, 30, 365, 3650)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _random_inputs(rng: np.random.Generator, num_rows: int, start: datetime):
+    """Seeded dates (consecutive from a random offset) and random weather/event names."""
+    offset = int(rng.integers(0, 365))
+    dates = [start + timedelta(days=offset + i) for i in range(num_rows)]
+    weather = rng.choice(StaffingPredictor.WEATHER_CODES, num_rows).tolist()
+    events = rng.choice(StaffingPredictor.EVENT_CODES, num_rows).tolist()
+    return dates, weather, events
+
+
+def measure(fn: Callable[[int], Any], rows: int, iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Time repeated calls of fn(i).
+
+    Args:
+        fn: Callable run once per iteration with the iteration index
+        rows: Rows processed per call (for throughput)
+        iterations: Timed calls
+        warmup: Untimed calls run first
+
+    Returns:
+        Latency percentiles and mean in milliseconds, and throughput in rows per second
+    """
+    for i in range(warmup):
+        fn(i)
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn(i)
+        latencies[i] = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000.0
+    return {
+        'rows': rows,
+        'iterations': iterations,
+        'mean_ms': round(float(latencies.mean() * 1000.0), 4),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'throughput_rows_per_s': round(float(rows / latencies.mean()), 1),
+    }
+
+
+def run_benchmarks(tx_model_path: str, work_model_path: str, backend: str = 'xgboost', seed: int = 0,
+                   iterations: int = 200, batch_iterations: int = 20, load_iterations: int = 5,
+                   start_date: datetime = datetime(2025, 1, 1)) -> Dict[str, Any]:
+    """
+    Run every benchmark.
+
+    Args:
+        tx_model_path: Pickled transaction model
+        work_model_path: Pickled staffing model
+        backend: StaffingPredictor backend
+        seed: Seed for the random inputs
+        iterations: Timed calls for single-day and feature benchmarks
+        batch_iterations: Timed calls per batch size (scaled down above 365 days)
+        load_iterations: Timed cold loads
+        start_date: Start of the window random dates are drawn from
+
+    Returns:
+        {'meta': {...}, 'results': {benchmark name: measure() result}}
+    """
+    results: Dict[str, Dict[str, float]] = {}
+
+    print("Benchmarking cold model load...")
+    results['cold_load'] = measure(
+        lambda i: StaffingPredictor(tx_model_path, work_model_path, cache_size=0, backend=backend),
+        rows=1, iterations=load_iterations, warmup=1
+    )
+
+    predictor = StaffingPredictor(tx_model_path, work_model_path, cache_size=0, backend=backend)
+    rng = np.random.default_rng(seed)
+
+    dates, weather, events = _random_inputs(rng, iterations, start_date)
+    print("Benchmarking single-day predictions...")
+    results['predict_staffing_requirements'] = measure(
+        lambda i: predictor.predict_staffing_requirements(dates[i], weather[i], events[i]),
+        rows=1, iterations=iterations, warmup=min(20, iterations)
+    )
+    results['predict_transactions'] = measure(
+        lambda i: predictor.predict_transactions(dates[i], weather[i], events[i]),
+        rows=1, iterations=iterations, warmup=min(20, iterations)
+    )
+
+    print("Benchmarking feature construction...")
+    for num_rows in (1, 365):
+        dates, weather, events = _random_inputs(rng, num_rows, start_date)
+        results[f'features_{num_rows}'] = measure(
+            lambda i: predictor._assemble_features(dates, weather, events),
+            rows=num_rows, iterations=iterations, warmup=min(20, iterations)
+        )
+
+    for num_rows in BATCH_SIZES:
+        print(f"Benchmarking batch_predict over {num_rows} days...")
+        dates, weather, events = _random_inputs(rng, num_rows, start_date)
+        results[f'batch_predict_{num_rows}'] = measure(
+            lambda i: predictor.batch_predict(dates, weather, events),
+            rows=num_rows, iterations=max(5, min(batch_iterations, batch_iterations * 365 // num_rows)), warmup=1
+        )
+
+    meta = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'backend': backend,
+        'seed': seed,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'xgboost': xgb.__version__ if xgb is not None else None,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+    }
+    return {'meta': meta, 'results': results}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.10) -> List[str]:
+    """
+    Print p50/p95 changes against a baseline and list regressions.
+
+    Args:
+        current: run_benchmarks() output
+        baseline: Earlier run_benchmarks() output
+        threshold: Relative p50 slowdown counted as a regression (0.10 = 10%)
+
+    Returns:
+        Names of the benchmarks whose p50 regressed by more than threshold
+    """
+    print(f"\nComparison against baseline {baseline['meta'].get('commit')} "
+          f"({baseline['meta'].get('created_at')}):")
+    print(f"{'benchmark':32} {'base p50':>10} {'p50':>10} {'change':>8} {'base p95':>10} {'p95':>10}")
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:32} {'-':>10} {result['p50_ms']:>10.3f}      new")
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:32} {base['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} {change:>+7.1%} "
+              f"{base['p95_ms']:>10.3f} {result['p95_ms']:>10.3f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StaffingPredictor inference")
+    parser.add_argument('--tx', default='tx_model.pkl', help='Pickled transaction model')
+    parser.add_argument('--work', default='work_model.pkl', help='Pickled staffing model')
+    parser.add_argument('--backend', default='xgboost', choices=list(StaffingPredictor.BACKENDS),
+                        help='Model evaluation backend')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random inputs')
+    parser.add_argument('--iterations', type=int, default=200, help='Timed calls for single-day benchmarks')
+    parser.add_argument('--batch-iterations', type=int, default=20, help='Timed calls for small batches')
+    parser.add_argument('--load-iterations', type=int, default=5, help='Timed cold model loads')
+    parser.add_argument('--out', default='benchmark_results.json', help='Where to write this run (JSON)')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='p50 slowdown counted as a regression')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.tx, args.work, args.backend, args.seed, args.iterations,
+                            args.batch_iterations, args.load_iterations)
+
+    print(f"\n{'benchmark':32} {'rows':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rows/s':>12}")
+    for name, result in report['results'].items():
+        print(f"{name:32} {result['rows']:>6} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} "
+              f"{result['p99_ms']:>10.3f} {result['throughput_rows_per_s']:>12.1f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Convert the pickled staffing models into native XGBoost artifacts.
+
+Usage:
+    python convert_models.py --tx tx_model.pkl --work work_model.pkl --out models --format ubj
+"""
+import argparse
+
+from inference import convert_pickle_models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert pickled staffing models to native XGBoost format")
+    parser.add_argument('--tx', default='tx_model.pkl', help='Pickled transaction model')
+    parser.add_argument('--work', default='work_model.pkl', help='Pickled staffing model')
+    parser.add_argument('--out', default='models', help='Output directory for the native artifacts')
+    parser.add_argument('--format', default='ubj', choices=['ubj', 'json'], help='Booster serialization format')
+    args = parser.parse_args()
+
+    metadata_path = convert_pickle_models(args.tx, args.work, args.out, args.format)
+    print(f"✓ Native models written to {args.out} (metadata: {metadata_path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ import warnings  # Add this import
 from typing import Literal, List, Dict, Any, Optional
 
 import boto3
+import numpy as np
 import pandas as pd
 
 from weather_forecast import WeatherService
@@ -20,7 +21,7 @@ from langgraph.graph import StateGraph, MessagesState
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, ToolMessage
 
-from inference import StaffingPredictor
+from inference import StaffingPredictor, FacilityRegistry, MODEL_METADATA_FILE
 
 # Suppress XGBoost model compatibility warnings
 warnings.filterwarnings('ignore', category=UserWarning, module='xgboost')
@@ -46,10 +47,14 @@ class DiningHallAgent:
             aws_region: str = None,
             tx_model_path: str = './tx_model.pkl',
             work_model_path: str = './work_model.pkl',
+            native_model_dir: Optional[str] = './models',
             data_file_path: str = 'df.csv',
             enable_tracing: bool = False,
             recursion_limit: int = 15,
-            default_location: str = "Pomona,CA"
+            default_location: str = "Pomona,CA",
+            scenario_cube_days: int = 365,
+            facility_registry: Optional[FacilityRegistry] = None,
+            predictor: Optional[StaffingPredictor] = None
     ):
         """
         Initialize the Dining Hall Agent.
@@ -59,10 +64,18 @@ class DiningHallAgent:
             aws_region: AWS region for Bedrock client
             tx_model_path: Path to transaction prediction model
             work_model_path: Path to work hours prediction model
+            native_model_dir: Directory of native XGBoost artifacts, used instead of the pickles when present
             data_file_path: Path to historical data CSV file
             enable_tracing: Whether to enable conversation tracing
             recursion_limit: Maximum recursion limit for the agent
             default_location: Default location for weather queries (format: "City,State")
+            scenario_cube_days: Days of precomputed scenarios to build in the background (0 disables)
+            facility_registry: Optional registry of other dining facilities' models, selected by the
+                prediction tools' facility argument; also serves as the shared model service the
+                default predictor is taken from when no predictor is given
+            predictor: Already-loaded predictor to share (e.g. the Flask app's); when given, or when
+                facility_registry is, the model paths and scenario_cube_days are ignored and no
+                second copy of the models is loaded
         """
         self.logger = self._setup_logging()
         self.aws_region = aws_region or os.environ.get("AWS_REGION", "us-west-2")
@@ -70,6 +83,7 @@ class DiningHallAgent:
         self.data_file_path = data_file_path
         self.recursion_limit = recursion_limit
         self.default_location = default_location
+        self.facility_registry = facility_registry
 
         # Conversation state
         self.conversation_history: List[Any] = []
@@ -83,7 +97,7 @@ class DiningHallAgent:
 
         # Initialize components
         self._setup_bedrock_client()
-        self._setup_predictor(tx_model_path, work_model_path)
+        self._setup_predictor(tx_model_path, work_model_path, scenario_cube_days, native_model_dir, predictor)
         self._setup_agent()
 
         # Initialize WeatherService
@@ -121,12 +135,25 @@ class DiningHallAgent:
             self.logger.error(f"Failed to initialize Bedrock client: {e}")
             raise
 
-    def _setup_predictor(self, tx_model_path: str, work_model_path: str):
-        """Initialize the staffing predictor with trained models."""
+    def _setup_predictor(self, tx_model_path: str, work_model_path: str, scenario_cube_days: int = 0,
+                         native_model_dir: Optional[str] = None, predictor: Optional[StaffingPredictor] = None):
+        """Initialize the staffing predictor with trained models, or share an already-loaded one."""
+        if predictor is None and self.facility_registry is not None:
+            predictor = self.facility_registry.get()
+        if predictor is not None:
+            self.predictor = predictor
+            self.logger.info(f"Using shared staffing predictor {predictor!r}; no second model copy loaded")
+            return
+
         try:
             self.predictor = StaffingPredictor()
-            self.predictor.load_models(tx_model_path, work_model_path)
+            if native_model_dir and os.path.exists(os.path.join(native_model_dir, MODEL_METADATA_FILE)):
+                self.predictor.load_native_models(native_model_dir)
+            else:
+                self.predictor.load_models(tx_model_path, work_model_path)
             self.logger.info("Staffing predictor models loaded successfully")
+            if scenario_cube_days > 0:
+                self.predictor.build_scenario_cube_async(num_days=scenario_cube_days)
         except Exception as e:
             self.logger.error(f"Failed to load predictor models: {e}")
             raise
@@ -169,6 +196,25 @@ class DiningHallAgent:
         self.system_prompt = prompt
         self.logger.info("System prompt updated")
 
+    def set_facility_registry(self, facility_registry: Optional[FacilityRegistry]):
+        """Use a registry of facility models for tool calls that name a facility."""
+        self.facility_registry = facility_registry
+        if facility_registry is not None:
+            self.logger.info(f"Facility registry set: {', '.join(facility_registry.facilities)}")
+
+    def _predictor_for(self, facility: Optional[str] = None) -> StaffingPredictor:
+        """
+        Predictor for a tool call's optional facility ID (the agent's own predictor when none is given).
+
+        Raises:
+            ValueError: If the facility is unknown
+        """
+        if not facility:
+            return self.predictor
+        if self.facility_registry is None:
+            raise ValueError(f"Unknown facility: {facility}. No other facilities are configured")
+        return self.facility_registry.get(facility)
+
     def _output_trace(self, element: str, trace, node: bool = True):
         """Output tracing information if enabled."""
         if self.enable_tracing and self.trace_handle:
@@ -240,12 +286,13 @@ class DiningHallAgent:
             return self._history_retrieve_impl(query)
 
         @tool
-        def predict_workhours(daterange, weather, event, target_roles=None):
+        def predict_workhours(daterange, weather, event, target_roles=None, facility=None):
             """
             Predicts staffing hours needed for dining hall operations.
             [Same as before - no changes needed]
+            Optional facility: dining facility ID from get_prediction_options (defaults to the main facility).
             """
-            return self._predict_workhours_impl(daterange, weather, event, target_roles)
+            return self._predict_workhours_impl(daterange, weather, event, target_roles, facility)
 
         @tool
         def get_prediction_options():
@@ -256,12 +303,13 @@ class DiningHallAgent:
             return self._get_prediction_options_impl()
 
         @tool
-        def predict_transactions_only(date, weather, event):
+        def predict_transactions_only(date, weather, event, facility=None):
             """
             Predicts customer transaction volume only.
             [Same as before - no changes needed]
+            Optional facility: dining facility ID from get_prediction_options (defaults to the main facility).
             """
-            return self._predict_transactions_only_impl(date, weather, event)
+            return self._predict_transactions_only_impl(date, weather, event, facility)
 
         @tool
         def get_weather_for_prediction(location=None, date=None):
@@ -815,19 +863,24 @@ class DiningHallAgent:
                 })
             }
 
-    def _predict_workhours_impl(self, daterange, weather, event, target_roles=None) -> Dict[str, Any]:
+    def _predict_workhours_impl(self, daterange, weather, event, target_roles=None, facility=None) -> Dict[str, Any]:
         """Implementation of predict_workhours tool."""
         try:
+            try:
+                predictor = self._predictor_for(facility)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+
             # Validate that predictor is loaded
-            if self.predictor.tx_estimator is None or self.predictor.work_estimator is None:
+            if predictor.tx_estimator is None or predictor.work_estimator is None:
                 return {
                     'success': False,
                     'error': 'Prediction models not loaded. Please check model files.'
                 }
 
             # Validate weather and event options
-            valid_weather = self.predictor.get_available_weather_conditions()
-            valid_events = self.predictor.get_available_events()
+            valid_weather = predictor.get_available_weather_conditions()
+            valid_events = predictor.get_available_events()
 
             # Parse daterange input
             if isinstance(daterange, str):
@@ -911,16 +964,16 @@ class DiningHallAgent:
                     'error': 'Event must be a string or list of strings'
                 }
 
-            # Validate weather conditions
-            invalid_weather = [w for w in weather_list if w not in valid_weather]
+            # Encode once and validate the whole horizon in one vectorized step
+            weather_codes, event_codes = predictor.encode_inputs(weather_list, event_list)
+            invalid_weather = sorted(set(np.asarray(weather_list, dtype=object)[weather_codes < 0].tolist()))
             if invalid_weather:
                 return {
                     'success': False,
                     'error': f'Invalid weather conditions: {invalid_weather}. Valid options: {valid_weather}'
                 }
 
-            # Validate events
-            invalid_events = [e for e in event_list if e not in valid_events]
+            invalid_events = sorted(set(np.asarray(event_list, dtype=object)[event_codes < 0].tolist()))
             if invalid_events:
                 return {
                     'success': False,
@@ -932,7 +985,7 @@ class DiningHallAgent:
 
             if is_single_date:
                 # Single date prediction
-                prediction = self.predictor.predict_staffing_requirements(
+                prediction = predictor.predict_staffing_requirements(
                     date=dates[0],
                     weather=weather_list[0],
                     event=event_list[0],
@@ -949,14 +1002,28 @@ class DiningHallAgent:
                 }
 
             else:
-                # Batch prediction
-                batch_results = self.predictor.batch_predict(
+                # Batch prediction, streamed chunk by chunk so long horizons stay bounded in memory
+                records, errors = [], []
+                total_hours = 0.0
+                total_transactions = 0
+                for chunk in predictor.iter_predict(
                     dates=dates,
-                    weather_conditions=weather_list,
-                    events=event_list,
+                    weather_conditions=weather_codes,
+                    events=event_codes,
                     target_features=target_roles
-                )
-
+                ):
+                    failed = chunk['error'].notna()
+                    for _, row in chunk[failed].iterrows():
+                        errors.append({'date': row['date'], 'error': row['error']})
+                    predicted = chunk[~failed].drop(columns='error')
+                    if predicted.empty:
+                        continue
+                    predicted = predicted.astype({'predicted_transactions': 'int64'})
+                    total_hours += predicted['total_predicted_hours'].sum()
+                    total_transactions += predicted['predicted_transactions'].sum()
+                    records.extend(predicted.to_dict('records'))
+
+                num_predicted = max(len(records), 1)
                 result = {
                     'success': True,
                     'prediction_type': 'date_range',
@@ -965,15 +1032,19 @@ class DiningHallAgent:
                         'end_date': dates[-1].strftime('%Y-%m-%d'),
                         'total_days': len(dates)
                     },
-                    'predictions': batch_results.to_dict('records'),
+                    'predictions': records,
                     'summary': {
-                        'total_predicted_hours': batch_results['total_predicted_hours'].sum(),
-                        'total_predicted_transactions': batch_results['predicted_transactions'].sum(),
-                        'average_daily_hours': batch_results['total_predicted_hours'].mean(),
-                        'average_daily_transactions': batch_results['predicted_transactions'].mean()
+                        'total_predicted_hours': total_hours,
+                        'total_predicted_transactions': total_transactions,
+                        'average_daily_hours': total_hours / num_predicted,
+                        'average_daily_transactions': total_transactions / num_predicted
                     }
                 }
+                if errors:
+                    result['errors'] = errors
 
+            if facility:
+                result['facility'] = facility
             self.logger.info(f"Successfully generated predictions for {len(dates)} dates")
             return result
 
@@ -993,7 +1064,10 @@ class DiningHallAgent:
                 'events': self.predictor.get_available_events(),
                 'default_staffing_roles': self.predictor.get_default_staffing_roles(),
                 'weather_impact_map': self.predictor.WEATHER_IMPACT_MAP,
-                'event_impact_map': self.predictor.EVENT_IMPACT_MAP
+                'event_impact_map': self.predictor.EVENT_IMPACT_MAP,
+                'facilities': {
+                    facility_id: config['name'] for facility_id, config in self.facility_registry.facilities.items()
+                } if self.facility_registry is not None else {}
             }
         except Exception as e:
             self.logger.error(f"Error getting prediction options: {str(e)}")
@@ -1002,9 +1076,14 @@ class DiningHallAgent:
                 'error': str(e)
             }
 
-    def _predict_transactions_only_impl(self, date, weather, event) -> Dict[str, Any]:
+    def _predict_transactions_only_impl(self, date, weather, event, facility=None) -> Dict[str, Any]:
         """Implementation of predict_transactions_only tool."""
         try:
+            try:
+                predictor = self._predictor_for(facility)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
+
             # Validate inputs
             try:
                 target_date = datetime.datetime.strptime(date, '%Y-%m-%d')
@@ -1014,8 +1093,8 @@ class DiningHallAgent:
                     'error': f'Invalid date format. Use YYYY-MM-DD. Received: {date}'
                 }
 
-            valid_weather = self.predictor.get_available_weather_conditions()
-            valid_events = self.predictor.get_available_events()
+            valid_weather = predictor.get_available_weather_conditions()
+            valid_events = predictor.get_available_events()
 
             if weather not in valid_weather:
                 return {
@@ -1030,14 +1109,15 @@ class DiningHallAgent:
                 }
 
             # Make prediction
-            predicted_transactions = self.predictor.predict_transactions(target_date, weather, event)
+            predicted_transactions = predictor.predict_transactions(target_date, weather, event)
 
             # Get enrollment info for context
-            enrollment_features = self.predictor.calculate_enrollment_features(target_date)
+            enrollment_features = predictor.calculate_enrollment_features(target_date)
 
             return {
                 'success': True,
                 'date': date,
+                'facility': facility,
                 'weather': weather,
                 'event': event,
                 'predicted_transactions': predicted_transactions,
@@ -1,8 +1,1151 @@
+import numpy as np
 import pandas as pd
 import pickle
 import datetime
-from typing import Dict, List, Optional
-from xgboost import XGBRegressor
+import functools
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from tree_ensemble import CompiledTreeEnsemble
+
+try:
+    import xgboost as xgb
+except ImportError:  # read-only replicas can run the 'numpy' backend without xgboost
+    xgb = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # only needed for StaffingPredictions.to_arrow
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Native model artifacts (see StaffingPredictor.save_native_models)
+MODEL_METADATA_FILE = 'model_meta.json'
+NATIVE_FORMAT_VERSION = 1
+
+# Companion quantile models (see QuantileModels and train_quantile_models.py)
+QUANTILE_METADATA_FILE = 'quantile_meta.json'
+
+
+class CalendarFeatureStore:
+    """
+    Precomputed calendar and enrollment features for every day in a span of years.
+
+    Each feature is held in a contiguous NumPy array indexed by day offset from
+    January 1st of ``start_year``, so building features for a batch of dates is
+    an array gather (or a plain slice for a date range) instead of re-running the
+    academic calendar and enrollment math per row. Values are produced by the
+    predictor's own get_academic_period_multiplier/calculate_enrollment_features,
+    and the table is rebuilt automatically whenever the predictor's
+    OPERATIONAL_CONSTANTS or SPECIAL_PERIODS change.
+    """
+
+    # Calendar columns, in the same order as the model's feature list
+    COLUMNS = (
+        'day_of_week', 'month', 'year', 'day_of_year', 'week_of_year', 'is_weekend',
+        'seasonal_multiplier', 'total_enrollment', 'active_enrollment', 'residential_students',
+        'commuter_students', 'total_meal_plan_holders', 'enrollment_seasonal_factor',
+    )
+    FLOAT_COLUMNS = ('seasonal_multiplier', 'enrollment_seasonal_factor')
+
+    def __init__(self, predictor: 'StaffingPredictor', start_year: int = 2020, end_year: int = 2035):
+        """
+        Initialize the store. Arrays are built lazily on first lookup.
+
+        Args:
+            predictor: Predictor whose calendar configuration the features derive from
+            start_year: First calendar year covered (inclusive)
+            end_year: Last calendar year covered (inclusive)
+        """
+        if end_year < start_year:
+            raise ValueError("end_year must not be before start_year")
+
+        self.predictor = predictor
+        self.start_year = start_year
+        self.end_year = end_year
+        self.base_ordinal = datetime.date(start_year, 1, 1).toordinal()
+        self.num_days = datetime.date(end_year, 12, 31).toordinal() - self.base_ordinal + 1
+
+        self.columns: Dict[str, np.ndarray] = {}
+        self.matrix = np.empty((0, len(self.COLUMNS)), dtype=np.float32)
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    def _config_fingerprint(self) -> str:
+        """Snapshot of the calendar configuration the arrays were built from."""
+        return repr((sorted(self.predictor.OPERATIONAL_CONSTANTS.items()), self.predictor.SPECIAL_PERIODS))
+
+    def compute_rows(self, dates: List[datetime.date]) -> Dict[str, np.ndarray]:
+        """
+        Compute calendar features directly, without the precomputed table.
+
+        Args:
+            dates: Dates to compute features for
+
+        Returns:
+            Dictionary mapping each column name to an array with one value per date
+        """
+        values = {column: [] for column in self.COLUMNS}
+        for date in dates:
+            enrollment = self.predictor.calculate_enrollment_features(date)
+            day_of_week = date.weekday()
+            values['day_of_week'].append(day_of_week)
+            values['month'].append(date.month)
+            values['year'].append(date.year)
+            values['day_of_year'].append(date.timetuple().tm_yday)
+            values['week_of_year'].append(date.isocalendar()[1])
+            values['is_weekend'].append(1 if day_of_week >= 5 else 0)
+            for column in self.COLUMNS[6:]:
+                values[column].append(enrollment[column])
+
+        return {
+            column: np.array(values[column], dtype=np.float64 if column in self.FLOAT_COLUMNS else np.int64)
+            for column in self.COLUMNS
+        }
+
+    def _build(self) -> None:
+        fingerprint = self._config_fingerprint()
+        dates = [datetime.date.fromordinal(self.base_ordinal + offset) for offset in range(self.num_days)]
+        columns = self.compute_rows(dates)
+        self.matrix = np.column_stack([columns[column] for column in self.COLUMNS]).astype(np.float32)
+        self.columns = columns
+        self._fingerprint = fingerprint
+
+    def rebuild(self) -> None:
+        """Recompute every column for the configured span of years."""
+        with self._lock:
+            self._build()
+
+    def ensure_current(self) -> None:
+        """Rebuild the arrays if they are missing or the calendar configuration changed."""
+        if self._fingerprint != self._config_fingerprint():
+            with self._lock:
+                if self._fingerprint != self._config_fingerprint():
+                    self._build()
+
+    def offsets(self, dates: List[datetime.date]) -> np.ndarray:
+        """Day offsets of the given dates relative to the start of the span."""
+        return np.fromiter((date.toordinal() for date in dates), dtype=np.int64, count=len(dates)) - self.base_ordinal
+
+    def lookup(self, dates: List[datetime.date]) -> Dict[str, np.ndarray]:
+        """
+        Get calendar features for arbitrary dates.
+
+        Dates outside the precomputed span are computed on the fly.
+
+        Args:
+            dates: Dates to look up
+
+        Returns:
+            Dictionary mapping each column name to an array with one value per date
+        """
+        self.ensure_current()
+        offsets = self.offsets(dates)
+        in_span = (offsets >= 0) & (offsets < self.num_days)
+
+        if in_span.all():
+            return {column: self.columns[column][offsets] for column in self.COLUMNS}
+
+        result = {column: np.empty(len(dates), dtype=self.columns[column].dtype) for column in self.COLUMNS}
+        inside = np.flatnonzero(in_span)
+        outside = np.flatnonzero(~in_span)
+        computed = self.compute_rows([dates[i] for i in outside])
+        for column in self.COLUMNS:
+            result[column][inside] = self.columns[column][offsets[inside]]
+            result[column][outside] = computed[column]
+        return result
+
+    def fill(self, dates: List[datetime.date], out: np.ndarray) -> np.ndarray:
+        """
+        Write calendar features for the given dates into a float32 matrix.
+
+        Args:
+            dates: Dates to look up
+            out: Array of shape (len(dates), len(COLUMNS)), typically a view into a
+                larger model feature buffer
+
+        Returns:
+            out
+        """
+        self.ensure_current()
+        offsets = self.offsets(dates)
+        in_span = (offsets >= 0) & (offsets < self.num_days)
+
+        if in_span.all():
+            out[...] = self.matrix[offsets]
+            return out
+
+        inside = np.flatnonzero(in_span)
+        outside = np.flatnonzero(~in_span)
+        out[inside] = self.matrix[offsets[inside]]
+        computed = self.compute_rows([dates[i] for i in outside])
+        out[outside] = np.column_stack([computed[column] for column in self.COLUMNS])
+        return out
+
+    def slice(self, start_date: datetime.date, num_days: int) -> Dict[str, np.ndarray]:
+        """
+        Get calendar features for consecutive days as zero-copy array views.
+
+        Args:
+            start_date: First day of the range
+            num_days: Number of consecutive days
+
+        Returns:
+            Dictionary mapping each column name to an array view
+        """
+        start = start_date.toordinal() - self.base_ordinal
+        if start < 0 or start + num_days > self.num_days:
+            return self.lookup([start_date + datetime.timedelta(days=i) for i in range(num_days)])
+
+        self.ensure_current()
+        return {column: self.columns[column][start:start + num_days] for column in self.COLUMNS}
+
+    def __len__(self) -> int:
+        return self.num_days
+
+
+class PredictionCache:
+    """
+    Thread-safe, size-bounded LRU cache for prediction results.
+
+    Keys are hashable tuples built by StaffingPredictor (they include the model
+    version, so results from a replaced model can never be served).
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept; 0 disables caching
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (marking it most recently used), or None."""
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """Remove and return the value for key, or None."""
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries. Hit/miss counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DateRangeCache:
+    """
+    Thread-safe cache of per-day results over contiguous date ranges.
+
+    For each key (model version, conditions, ...) the cached days are held as
+    disjoint, sorted segments of day ordinals, each with one array per output,
+    and adjacent segments are merged. A range request reads the covered days
+    with array slices and computes only the missing sub-ranges, so overlapping
+    ranges from different callers share work. When more than max_days days are
+    cached, whole keys are dropped least recently used first, and a single key
+    over the limit keeps only max_days days, the most recently computed first.
+    """
+
+    def __init__(self, max_days: int = 100000):
+        """
+        Args:
+            max_days: Maximum number of cached days across all keys; 0 disables caching
+        """
+        self.max_days = max_days
+        self.hits = 0
+        self.misses = 0
+        self._segments: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_range(self, key: Hashable, start: int, stop: int,
+                  compute: Callable[[np.ndarray], Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+        """
+        Results for the days [start, stop), computing only the ones not cached.
+
+        Args:
+            key: Cache key the results belong to
+            start: First day ordinal
+            stop: Day ordinal after the last day
+            compute: Called once with the ordinals of all missing days (in order); returns
+                a tuple of arrays whose first axis follows those ordinals
+
+        Returns:
+            Tuple of arrays with one row per day of the range
+
+        Raises:
+            ValueError: If the range is empty
+        """
+        if stop <= start:
+            raise ValueError("Date range is empty")
+        with self._lock:
+            segments = [segment for segment in self._segments.get(key, []) if segment[0] < stop and segment[1] > start]
+            if key in self._segments:
+                self._segments.move_to_end(key)
+
+        # Missing sub-ranges between the cached segments
+        gaps = []
+        cursor = start
+        for segment_start, segment_stop, _ in segments:
+            if segment_start > cursor:
+                gaps.append((cursor, segment_start))
+            cursor = max(cursor, segment_stop)
+        if cursor < stop:
+            gaps.append((cursor, stop))
+
+        computed = []
+        if gaps:
+            ordinals = np.concatenate([np.arange(gap_start, gap_stop) for gap_start, gap_stop in gaps])
+            arrays = compute(ordinals)
+            offset = 0
+            for gap_start, gap_stop in gaps:
+                length = gap_stop - gap_start
+                computed.append((gap_start, gap_stop, tuple(array[offset:offset + length] for array in arrays)))
+                offset += length
+
+        with self._lock:
+            missing_days = sum(gap_stop - gap_start for gap_start, gap_stop in gaps)
+            self.misses += missing_days
+            self.hits += (stop - start) - missing_days
+            if computed and self.max_days > 0:
+                self._insert(key, computed)
+
+        # Assemble the range from the segments read above and the computed gaps
+        pieces = sorted(segments + computed, key=lambda piece: piece[0])
+        first = pieces[0][2]
+        out = tuple(np.empty((stop - start,) + array.shape[1:], dtype=array.dtype) for array in first)
+        for piece_start, piece_stop, arrays in pieces:
+            lo, hi = max(piece_start, start), min(piece_stop, stop)
+            for target, array in zip(out, arrays):
+                target[lo - start:hi - start] = array[lo - piece_start:hi - piece_start]
+        return out
+
+    def _insert(self, key: Hashable, pieces: List[Tuple[int, int, Tuple[np.ndarray, ...]]]) -> None:
+        """Add computed segments, merging overlapping and adjacent ones, then evict over capacity. Caller holds _lock."""
+        segments = sorted(self._segments.get(key, []) + pieces, key=lambda segment: segment[0])
+        merged = [segments[0]]
+        for segment_start, segment_stop, arrays in segments[1:]:
+            last = merged[-1]
+            if segment_stop <= last[1]:
+                continue  # already covered (computed concurrently by another caller)
+            if segment_start < last[1]:
+                # Partial overlap: keep only the days past the end of the previous segment
+                arrays = tuple(array[last[1] - segment_start:] for array in arrays)
+                segment_start = last[1]
+            if segment_start == last[1]:
+                merged[-1] = (last[0], segment_stop,
+                              tuple(np.concatenate([a, b]) for a, b in zip(last[2], arrays)))
+            else:
+                merged.append((segment_start, segment_stop, arrays))
+        self._segments[key] = merged
+        self._segments.move_to_end(key)
+
+        while self._num_days() > self.max_days and len(self._segments) > 1:
+            self._segments.popitem(last=False)
+        if self._num_days() > self.max_days:
+            # The one remaining key alone is over capacity; keep the days just computed first
+            is_recent = [any(segment[0] < piece[1] and piece[0] < segment[1] for piece in pieces) for segment in merged]
+            ordered = ([segment for segment, recent in zip(merged, is_recent) if recent]
+                       + [segment for segment, recent in zip(merged, is_recent) if not recent])
+            kept, budget = [], self.max_days
+            for segment_start, segment_stop, arrays in ordered:
+                if budget <= 0:
+                    break
+                length = min(segment_stop - segment_start, budget)
+                kept.append((segment_start, segment_start + length, tuple(array[:length] for array in arrays)))
+                budget -= length
+            self._segments[key] = sorted(kept, key=lambda segment: segment[0])
+
+    def _num_days(self) -> int:
+        return sum(stop - start for segments in self._segments.values() for start, stop, _ in segments)
+
+    def clear(self) -> None:
+        """Drop all cached days. Hit/miss counters are kept."""
+        with self._lock:
+            self._segments.clear()
+
+    def info(self) -> Dict[str, int]:
+        """Cache statistics; hits and misses count days."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'keys': len(self._segments),
+                'segments': sum(len(segments) for segments in self._segments.values()),
+                'days': self._num_days(),
+                'max_days': self.max_days,
+            }
+
+
+class BoosterEnsemble:
+    """
+    One model stage evaluated directly on a float32 feature matrix.
+
+    Wraps either a single XGBoost model or a cross-validation ensemble (an object
+    with an ``estimators`` list whose fold predictions are clipped to
+    ``y_min``/``y_max`` and averaged, like the trainer used in ml_training) and
+    calls each booster's inplace_predict, skipping pandas construction and
+    XGBoost's DataFrame validation. The booster feature order is checked once,
+    when the ensemble is built. Estimators that are not XGBoost models fall back
+    to their own predict() on a DataFrame.
+    """
+
+    def __init__(
+            self,
+            boosters: List[Any],
+            feature_names: List[str],
+            iteration_ranges: Optional[List[Tuple[int, int]]] = None,
+            clip: Optional[Tuple[float, float]] = None,
+            fallback: Any = None
+    ):
+        self.boosters = boosters
+        self.feature_names = list(feature_names)
+        self.iteration_ranges = iteration_ranges or [(0, 0)] * len(boosters)
+        self.clip = clip
+        self.fallback = fallback
+
+    def validate_feature_order(self) -> None:
+        """Raise ValueError if any booster was trained on a different feature order."""
+        for booster in self.boosters:
+            if booster.feature_names is not None and list(booster.feature_names) != self.feature_names:
+                raise ValueError(
+                    f"Model feature order {booster.feature_names} does not match expected {self.feature_names}"
+                )
+
+    def set_single_threaded(self) -> None:
+        """Pin every XGBoost booster to one thread; parallelism is handled by the caller."""
+        for booster in self.boosters:
+            if hasattr(booster, 'set_param'):
+                booster.set_param({'nthread': 1})
+
+    def num_rounds(self) -> Optional[int]:
+        """Boosting rounds evaluated per booster (None for fallback models)."""
+        if self.fallback is not None or not self.boosters:
+            return None
+        begin, end = self.iteration_ranges[0]
+        return (end or self.boosters[0].num_boosted_rounds()) - begin
+
+    def truncated(self, fraction: float) -> 'BoosterEnsemble':
+        """
+        Copy that evaluates only the first fraction of each booster's boosting rounds.
+
+        Shares the boosters; at least one round is always kept. Fallback models
+        cannot be truncated and are returned unchanged.
+        """
+        if self.fallback is not None or fraction >= 1:
+            return self
+        iteration_ranges = []
+        for booster, (begin, end) in zip(self.boosters, self.iteration_ranges):
+            end = end or booster.num_boosted_rounds()
+            iteration_ranges.append((begin, begin + max(1, int(round((end - begin) * fraction)))))
+        return BoosterEnsemble(self.boosters, self.feature_names, iteration_ranges, self.clip)
+
+    def compiled(self) -> 'BoosterEnsemble':
+        """Copy of this ensemble evaluated by CompiledTreeEnsemble instead of XGBoost."""
+        if self.fallback is not None:
+            raise ValueError("Only XGBoost models can be compiled for the numpy backend")
+        boosters = [
+            booster if isinstance(booster, CompiledTreeEnsemble) else CompiledTreeEnsemble.from_booster(booster)
+            for booster in self.boosters
+        ]
+        return BoosterEnsemble(boosters, self.feature_names, self.iteration_ranges, self.clip)
+
+    @staticmethod
+    def _iteration_range(model: Any) -> Tuple[int, int]:
+        """Trees used by the sklearn predict(): up to best_iteration when early stopping was used."""
+        try:
+            return 0, int(model.best_iteration) + 1
+        except (AttributeError, TypeError):
+            return 0, 0
+
+    @classmethod
+    def from_estimator(cls, estimator: Any, feature_names: List[str]) -> 'BoosterEnsemble':
+        """
+        Build an ensemble from a loaded estimator, validating its feature order.
+
+        Args:
+            estimator: XGBRegressor, xgboost Booster, or CV ensemble of either
+            feature_names: Column order the predictor will supply
+
+        Returns:
+            BoosterEnsemble for the estimator
+
+        Raises:
+            ValueError: If a booster was trained on a different feature order
+        """
+        members = getattr(estimator, 'estimators', None)
+        clip = None
+        if members:
+            if getattr(estimator, 'task', 'regression') == 'regression' and hasattr(estimator, 'y_min'):
+                clip = (estimator.y_min, estimator.y_max)
+        else:
+            members = [estimator]
+
+        boosters = []
+        for member in members:
+            booster = member.get_booster() if hasattr(member, 'get_booster') else member
+            if not hasattr(booster, 'inplace_predict'):
+                return cls([], feature_names, fallback=estimator)
+            boosters.append(booster)
+
+        ensemble = cls(boosters, feature_names, [cls._iteration_range(member) for member in members], clip)
+        ensemble.validate_feature_order()
+        return ensemble
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        Predict from a float32 matrix whose columns follow feature_names.
+
+        Returns:
+            Array of shape (n,) for single-target models or (n, targets) otherwise
+        """
+        if self.fallback is not None:
+            return np.asarray(self.fallback.predict(pd.DataFrame(features, columns=self.feature_names)))
+
+        total = None
+        for booster, iteration_range in zip(self.boosters, self.iteration_ranges):
+            predictions = booster.inplace_predict(
+                features, iteration_range=iteration_range, missing=np.nan, validate_features=False
+            )
+            if self.clip is not None:
+                predictions = predictions.clip(*self.clip)
+            if len(self.boosters) == 1:
+                return predictions
+            total = predictions.astype(np.float64) if total is None else total + predictions
+
+        return total / len(self.boosters)
+
+
+def quantile_label(quantile: float) -> str:
+    """Key used for a quantile in results, e.g. 0.1 -> 'p10'."""
+    return f"p{quantile * 100:g}"
+
+
+class QuantileModels:
+    """
+    Companion quantile models that turn point predictions into intervals.
+
+    One booster for transactions and one per staffing role, each trained with
+    XGBoost's reg:quantileerror over the same quantile_alpha list, so a single
+    inplace_predict call returns every quantile of its target at once. Hour
+    quantiles take the point-predicted transactions as their total_transactions
+    feature, exactly like the point staffing model, so all quantiles of both
+    stages are evaluated on the one feature matrix the point prediction builds.
+    """
+
+    def __init__(
+            self,
+            quantiles: List[float],
+            tx_stage: BoosterEnsemble,
+            role_stages: List[BoosterEnsemble],
+            roles: List[str],
+            signature: str = ''
+    ):
+        self.quantiles = list(quantiles)
+        self.tx_stage = tx_stage
+        self.role_stages = role_stages
+        self.roles = list(roles)
+        self.signature = signature
+
+    @property
+    def labels(self) -> List[str]:
+        return [quantile_label(quantile) for quantile in self.quantiles]
+
+    def predict(self, features: np.ndarray, num_tx_features: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate every quantile of both stages.
+
+        Args:
+            features: Work feature matrix with total_transactions already filled in
+            num_tx_features: Width of the transaction model's leading feature slice
+
+        Returns:
+            Tuple (transaction_quantiles, role_hour_quantiles): int64 array of shape
+            (n, quantiles) and float32 array of shape (n, roles, quantiles), clipped
+            at zero, hours rounded to 0.1 and sorted so quantiles never cross
+        """
+        num_rows = len(features)
+        raw_transactions = np.asarray(self.tx_stage.predict(features[:, :num_tx_features])).reshape(num_rows, -1)
+        transactions = np.sort(np.maximum(raw_transactions.astype(np.int64), 0), axis=1)
+
+        raw_hours = np.stack(
+            [np.asarray(stage.predict(features)).reshape(num_rows, -1) for stage in self.role_stages], axis=1
+        )
+        hours = np.sort(np.round(np.maximum(raw_hours, 0), 1).astype(np.float32), axis=2)
+        return transactions, hours
+
+    def save(self, output_dir: str, model_format: str = 'ubj') -> str:
+        """
+        Write the boosters and a quantile_meta.json sidecar.
+
+        Returns:
+            Path of the metadata file
+        """
+        if model_format not in ('ubj', 'json'):
+            raise ValueError(f"Invalid model_format: {model_format}. Must be 'ubj' or 'json'")
+        os.makedirs(output_dir, exist_ok=True)
+
+        def write(stage: BoosterEnsemble, name: str) -> Dict[str, Any]:
+            file_name = f"{name}.{model_format}"
+            stage.boosters[0].save_model(os.path.join(output_dir, file_name))
+            return {'file': file_name, 'sha256': _file_sha256(os.path.join(output_dir, file_name)),
+                    'feature_names': stage.feature_names}
+
+        metadata = {
+            'format_version': NATIVE_FORMAT_VERSION,
+            'quantiles': self.quantiles,
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'tx': write(self.tx_stage, 'tx_quantiles'),
+            'roles': [dict(write(stage, f"{role}_quantiles"), role=role)
+                      for role, stage in zip(self.roles, self.role_stages)],
+        }
+        metadata_path = os.path.join(output_dir, QUANTILE_METADATA_FILE)
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        return metadata_path
+
+    @classmethod
+    def load(cls, model_dir: str, use_mmap: bool = True, compile_trees: bool = False) -> 'QuantileModels':
+        """
+        Load models written by save().
+
+        Raises:
+            ValueError: If the metadata is unsupported, a file fails its checksum,
+                or a booster's feature order does not match its metadata
+        """
+        with open(os.path.join(model_dir, QUANTILE_METADATA_FILE)) as f:
+            metadata = json.load(f)
+        if metadata.get('format_version') != NATIVE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported quantile model format version: {metadata.get('format_version')}")
+
+        def read(entry: Dict[str, Any]) -> BoosterEnsemble:
+            booster = _read_native_booster(os.path.join(model_dir, entry['file']), entry['sha256'], use_mmap,
+                                           compile_trees=compile_trees)
+            stage = BoosterEnsemble([booster], entry['feature_names'])
+            stage.validate_feature_order()
+            if not compile_trees:
+                stage.set_single_threaded()
+            return stage
+
+        entries = [metadata['tx']] + metadata['roles']
+        return cls(
+            quantiles=metadata['quantiles'],
+            tx_stage=read(metadata['tx']),
+            role_stages=[read(entry) for entry in metadata['roles']],
+            roles=[entry['role'] for entry in metadata['roles']],
+            signature=hashlib.sha256(''.join(entry['sha256'] for entry in entries).encode()).hexdigest(),
+        )
+
+    def __repr__(self) -> str:
+        return f"QuantileModels(quantiles={self.quantiles}, roles={len(self.roles)})"
+
+
+class ScenarioCube:
+    """
+    Dense table of predictions for every date x weather x event combination.
+
+    ``transactions`` has shape (days, weathers, events) and ``hours`` has shape
+    (days, weathers, events, outputs), holding exactly the clipped and rounded
+    values the batched prediction path produces. Lookups inside the horizon are
+    plain array indexing. Cubes can be persisted with save()/load(); the model
+    signature and calendar fingerprint stored alongside let a loader tell
+    whether a file on disk is still valid for the current models.
+    """
+
+    def __init__(
+            self,
+            start_date: datetime.date,
+            weather_conditions: List[str],
+            events: List[str],
+            transactions: np.ndarray,
+            hours: np.ndarray,
+            model_signature: str = '',
+            calendar_fingerprint: str = ''
+    ):
+        self.start_ordinal = start_date.toordinal()
+        self.weather_conditions = list(weather_conditions)
+        self.events = list(events)
+        self.transactions = transactions
+        self.hours = hours
+        self.model_signature = model_signature
+        self.calendar_fingerprint = calendar_fingerprint
+        self.model_version = None  # set by the predictor that installs the cube
+
+        self._weather_index = {weather: i for i, weather in enumerate(self.weather_conditions)}
+        self._event_index = {event: i for i, event in enumerate(self.events)}
+
+    @property
+    def num_days(self) -> int:
+        return self.transactions.shape[0]
+
+    @property
+    def start_date(self) -> datetime.date:
+        return datetime.date.fromordinal(self.start_ordinal)
+
+    def locate(self, dates: List[datetime.date], weather_conditions: Sequence,
+               events: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Map rows to cube coordinates.
+
+        Weather and events are names, or integer code arrays (StaffingPredictor.encode_inputs),
+        which index the cube's axes directly since cubes are built in code-table order.
+
+        Returns:
+            Tuple (hit_mask, day_index, weather_index, event_index); indices are
+            only meaningful where hit_mask is True
+        """
+        day_index = np.fromiter((date.toordinal() for date in dates), dtype=np.int64,
+                                count=len(dates)) - self.start_ordinal
+        weather_index = self._axis_index(weather_conditions, self._weather_index)
+        event_index = self._axis_index(events, self._event_index)
+        hit = ((day_index >= 0) & (day_index < self.num_days)
+               & (weather_index >= 0) & (weather_index < len(self.weather_conditions))
+               & (event_index >= 0) & (event_index < len(self.events)))
+        return hit, day_index, weather_index, event_index
+
+    @staticmethod
+    def _axis_index(values: Sequence, index: Dict[str, int]) -> np.ndarray:
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+            return values.astype(np.int64)
+        return np.fromiter((index.get(value, -1) for value in values), dtype=np.int64, count=len(values))
+
+    def save(self, path: str) -> None:
+        """Persist the cube to an .npz file (written atomically)."""
+        metadata = json.dumps({
+            'start_ordinal': self.start_ordinal,
+            'weather_conditions': self.weather_conditions,
+            'events': self.events,
+            'model_signature': self.model_signature,
+            'calendar_fingerprint': self.calendar_fingerprint,
+        })
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, transactions=self.transactions, hours=self.hours, metadata=np.array(metadata))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ScenarioCube':
+        """Load a cube previously written with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            metadata = json.loads(str(data['metadata']))
+            return cls(
+                start_date=datetime.date.fromordinal(metadata['start_ordinal']),
+                weather_conditions=metadata['weather_conditions'],
+                events=metadata['events'],
+                transactions=data['transactions'],
+                hours=data['hours'],
+                model_signature=metadata['model_signature'],
+                calendar_fingerprint=metadata['calendar_fingerprint'],
+            )
+
+    def __repr__(self) -> str:
+        return (f"ScenarioCube(start={self.start_date.isoformat()}, days={self.num_days}, "
+                f"scenarios={len(self.weather_conditions) * len(self.events)})")
+
+
+class ModelSet:
+    """
+    An immutable, versioned tx/work model pair.
+
+    StaffingPredictor replaces its whole ModelSet in one reference assignment,
+    and every prediction reads that reference once, so no request can combine
+    a transaction model from one load with a staffing model from another.
+    """
+
+    def __init__(
+            self,
+            tx_estimator: Any = None,
+            work_estimator: Any = None,
+            tx_stage: Optional[BoosterEnsemble] = None,
+            work_stage: Optional[BoosterEnsemble] = None,
+            tx_signature: str = '',
+            work_signature: str = '',
+            version: int = 0,
+            quantile_models: Optional[QuantileModels] = None,
+            fidelity: float = 1.0
+    ):
+        self.tx_estimator = tx_estimator
+        self.work_estimator = work_estimator
+        self.tx_stage = tx_stage
+        self.work_stage = work_stage
+        self.tx_signature = tx_signature
+        self.work_signature = work_signature
+        self.version = version
+        self.quantile_models = quantile_models
+        self.fidelity = fidelity
+        self._reduced: Dict[float, 'ModelSet'] = {}
+
+    @property
+    def signature(self) -> str:
+        """Content hash identifying the model pair."""
+        return f"{self.tx_signature}:{self.work_signature}"
+
+    def attributes(self) -> Dict[str, Any]:
+        return {name: value for name, value in vars(self).items() if not name.startswith('_')}
+
+    def replace(self, **changes) -> 'ModelSet':
+        """Copy of this set with some attributes replaced."""
+        attributes = self.attributes()
+        attributes.update(changes)
+        return ModelSet(**attributes)
+
+    def at_fidelity(self, fraction: float) -> 'ModelSet':
+        """
+        Same pair evaluating only the first fraction of boosting rounds of both stages.
+
+        Reduced sets share the boosters and keep this set's version but record
+        their fidelity, so full-fidelity artifacts (the scenario cube) are not
+        served for them; they are built once per fraction and reused.
+        """
+        if fraction >= 1:
+            return self
+        reduced = self._reduced.get(fraction)
+        if reduced is None:
+            reduced = self.replace(tx_stage=self.tx_stage.truncated(fraction),
+                                   work_stage=self.work_stage.truncated(fraction),
+                                   fidelity=fraction)
+            self._reduced[fraction] = reduced
+        return reduced
+
+
+@dataclass
+class StaffingPredictions:
+    """
+    Columnar staffing predictions: one array per output instead of one dict per day.
+
+    role_hours holds one column per role (in roles order), already clipped at
+    zero and rounded to 0.1; totals are summed across roles the same way
+    predict_staffing_requirements does, so values match the per-day dicts.
+    The conversions hand the underlying arrays to pandas, Arrow or JSON without
+    walking rows.
+    """
+
+    roles: List[str]
+    role_hours: np.ndarray
+    total_predicted_hours: np.ndarray
+    predicted_transactions: np.ndarray
+    dates: Optional[List[str]] = None
+    weather: Optional[Sequence[str]] = None
+    event: Optional[Sequence[str]] = None
+    quantiles: Optional[List[float]] = None
+    transaction_quantiles: Optional[np.ndarray] = None
+    role_hour_quantiles: Optional[np.ndarray] = None
+    total_hour_quantiles: Optional[np.ndarray] = None
+
+    def with_intervals(self, quantiles: List[float], transaction_quantiles: np.ndarray,
+                       role_hour_quantiles: np.ndarray) -> 'StaffingPredictions':
+        """
+        Attach quantile predictions from QuantileModels.predict.
+
+        The total-hours band sums the per-role quantiles, which assumes roles
+        move together: a conservative band rather than an exact quantile of the sum.
+        """
+        role_hour_quantiles = role_hour_quantiles[:, :len(self.roles)]
+        total = np.zeros((len(role_hour_quantiles), len(quantiles)), dtype=role_hour_quantiles.dtype)
+        for i in range(role_hour_quantiles.shape[1]):
+            total += role_hour_quantiles[:, i]
+        self.quantiles = list(quantiles)
+        self.transaction_quantiles = transaction_quantiles
+        self.role_hour_quantiles = role_hour_quantiles
+        self.total_hour_quantiles = np.round(total, 1)
+        return self
+
+    def intervals(self, index: int) -> Optional[Dict[str, Any]]:
+        """One day's intervals as {'quantiles', 'predicted_transactions', 'total_predicted_hours', role...}."""
+        if self.quantiles is None:
+            return None
+        labels = [quantile_label(quantile) for quantile in self.quantiles]
+        intervals = {
+            'quantiles': self.quantiles,
+            'predicted_transactions': dict(zip(labels, self.transaction_quantiles[index].tolist())),
+            'total_predicted_hours': dict(zip(labels, self.total_hour_quantiles[index].tolist())),
+        }
+        for i, role in enumerate(self.roles[:self.role_hour_quantiles.shape[1]]):
+            intervals[role] = dict(zip(labels, self.role_hour_quantiles[index, i].tolist()))
+        return intervals
+
+    @classmethod
+    def from_arrays(
+            cls,
+            role_hours: np.ndarray,
+            predicted_transactions: np.ndarray,
+            roles: List[str],
+            dates: Optional[List[datetime.date]] = None,
+            weather: Optional[Sequence[str]] = None,
+            event: Optional[Sequence[str]] = None
+    ) -> 'StaffingPredictions':
+        """
+        Build from model-stage outputs.
+
+        Args:
+            role_hours: Array of shape (n, outputs); the first len(roles) columns are used
+            predicted_transactions: Array of shape (n,)
+            roles: Staffing role names labelling the hour columns
+            dates: Optional dates of the rows
+            weather: Optional weather condition of each row
+            event: Optional event of each row
+        """
+        role_hours = np.round(np.maximum(role_hours[:, :len(roles)], 0), 1)
+        # Accumulate role by role in the hours dtype, exactly like the per-day totals
+        total_hours = np.zeros(len(role_hours), dtype=role_hours.dtype)
+        for i in range(len(roles)):
+            total_hours += role_hours[:, i]
+        return cls(
+            roles=list(roles),
+            role_hours=role_hours,
+            total_predicted_hours=np.round(total_hours, 1),
+            predicted_transactions=np.maximum(np.asarray(predicted_transactions, dtype=np.int64), 0),
+            dates=[date.strftime('%Y-%m-%d') for date in dates] if dates is not None else None,
+            weather=weather,
+            event=event,
+        )
+
+    def __len__(self) -> int:
+        return len(self.predicted_transactions)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """One day as the dictionary predict_staffing_requirements returns."""
+        results = {role: self.role_hours[index, i] for i, role in enumerate(self.roles)}
+        results['total_predicted_hours'] = self.total_predicted_hours[index]
+        results['predicted_transactions'] = int(self.predicted_transactions[index])
+        if self.quantiles is not None:
+            results['intervals'] = self.intervals(index)
+        return results
+
+    def _columns(self) -> Dict[str, Any]:
+        columns = {role: self.role_hours[:, i] for i, role in enumerate(self.roles)}
+        columns['total_predicted_hours'] = self.total_predicted_hours
+        columns['predicted_transactions'] = self.predicted_transactions
+        for name in ('dates', 'weather', 'event'):
+            values = getattr(self, name)
+            if values is not None:
+                columns['date' if name == 'dates' else name] = values
+        return columns
+
+    def to_columns(self, role_names: Optional[Dict[str, str]] = None) -> Dict[str, list]:
+        """
+        JSON-ready columns of native Python values.
+
+        Args:
+            role_names: Optional mapping of role column to output name (e.g. display names)
+        """
+        role_names = role_names or {}
+        return {role_names.get(name, name): values.tolist() if isinstance(values, np.ndarray) else list(values)
+                for name, values in self._columns().items()}
+
+    def to_pandas(self) -> pd.DataFrame:
+        """DataFrame in the batch_predict column layout."""
+        return pd.DataFrame(self._columns())
+
+    def to_arrow(self) -> Any:
+        """
+        pyarrow Table of the columns; numeric columns are wrapped without copying.
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if pa is None:
+            raise ImportError("pyarrow is required for StaffingPredictions.to_arrow")
+        return pa.table(self._columns())
+
+
+class InferenceStats:
+    """
+    Opt-in latency counters and histograms for StaffingPredictor.
+
+    Every recorded span has a name (a public method, or 'stage.<name>' for the
+    features, tx_model, work_model, postprocess and results stages) and the
+    number of rows it processed; spans are aggregated per name and batch-size
+    bucket into a call count, row count, total/min/max time and a fixed-bucket
+    latency histogram. Times come from the monotonic perf_counter clock.
+    Counters track cache and scenario-cube hits.
+
+    Safe to share between threads. The optional callback receives every span as
+    callback(name, rows, seconds) and is called outside the internal lock; it
+    must be cheap, since it runs on the prediction path.
+    """
+
+    # Upper bounds (rows) of the batch-size buckets; larger batches share one overflow bucket
+    BATCH_BUCKETS = (1, 7, 31, 366, 3660)
+
+    # Upper bounds (milliseconds) of the latency histogram buckets
+    LATENCY_BUCKETS_MS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 4, 5, 7.5, 10, 15, 20, 30, 50, 75, 100,
+                          150, 250, 500, 1000, 2500, 10000)
+
+    def __init__(self, callback: Optional[Callable[[str, int, float], None]] = None):
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._spans: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._counters: Dict[str, int] = {}
+
+    @classmethod
+    def batch_bucket(cls, rows: int) -> str:
+        """Label of the batch-size bucket for a span of this many rows."""
+        lower = 1
+        for upper in cls.BATCH_BUCKETS:
+            if rows <= upper:
+                return str(upper) if lower == upper else f"{lower}-{upper}"
+            lower = upper + 1
+        return f">{cls.BATCH_BUCKETS[-1]}"
+
+    def record(self, name: str, rows: int, seconds: float) -> None:
+        """Add one span to the aggregates and pass it to the callback."""
+        key = (name, self.batch_bucket(rows))
+        bucket = int(np.searchsorted(self.LATENCY_BUCKETS_MS, seconds * 1000.0))
+        with self._lock:
+            span = self._spans.get(key)
+            if span is None:
+                span = self._spans[key] = {
+                    'calls': 0, 'rows': 0, 'total_seconds': 0.0, 'min_seconds': seconds, 'max_seconds': seconds,
+                    'histogram': [0] * (len(self.LATENCY_BUCKETS_MS) + 1),
+                }
+            span['calls'] += 1
+            span['rows'] += rows
+            span['total_seconds'] += seconds
+            span['min_seconds'] = min(span['min_seconds'], seconds)
+            span['max_seconds'] = max(span['max_seconds'], seconds)
+            span['histogram'][bucket] += 1
+        if self.callback is not None:
+            self.callback(name, rows, seconds)
+
+    def lap(self, name: str, rows: int, started: float) -> float:
+        """Record a span that began at started; returns now, the start of the next span."""
+        now = time.perf_counter()
+        self.record(name, rows, now - started)
+        return now
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def _percentile(self, histogram: List[int], calls: int, max_seconds: float, quantile: float) -> float:
+        """Upper bound (ms) of the histogram bucket holding the quantile, capped at the observed max."""
+        rank = quantile * calls
+        seen = 0
+        for bound, count in zip(self.LATENCY_BUCKETS_MS, histogram):
+            seen += count
+            if seen >= rank:
+                return min(bound, max_seconds * 1000.0)
+        return max_seconds * 1000.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Aggregates so far.
+
+        Returns:
+            {'spans': {name: {bucket: {'calls', 'rows', 'total_ms', 'mean_ms', 'min_ms',
+            'max_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'histogram'}}}, 'counters': {name: count}}.
+            Percentiles are histogram-bucket upper bounds; 'histogram' maps each
+            bucket's upper bound ('<=1ms', ..., '>10000ms') to its span count.
+        """
+        labels = [f"<={bound:g}ms" for bound in self.LATENCY_BUCKETS_MS] + [f">{self.LATENCY_BUCKETS_MS[-1]:g}ms"]
+        with self._lock:
+            spans = {key: dict(span, histogram=list(span['histogram'])) for key, span in self._spans.items()}
+            counters = dict(self._counters)
+
+        report: Dict[str, Dict[str, Any]] = {}
+        for (name, bucket), span in sorted(spans.items()):
+            calls, histogram = span['calls'], span['histogram']
+            report.setdefault(name, {})[bucket] = {
+                'calls': calls,
+                'rows': span['rows'],
+                'total_ms': round(span['total_seconds'] * 1000.0, 3),
+                'mean_ms': round(span['total_seconds'] * 1000.0 / calls, 3),
+                'min_ms': round(span['min_seconds'] * 1000.0, 3),
+                'max_ms': round(span['max_seconds'] * 1000.0, 3),
+                'p50_ms': round(self._percentile(histogram, calls, span['max_seconds'], 0.50), 3),
+                'p95_ms': round(self._percentile(histogram, calls, span['max_seconds'], 0.95), 3),
+                'p99_ms': round(self._percentile(histogram, calls, span['max_seconds'], 0.99), 3),
+                'histogram': {label: count for label, count in zip(labels, histogram) if count},
+            }
+        return {'spans': report, 'counters': counters}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+
+def _instrumented(name: str, batched: bool = True, count_rows: Optional[Callable[..., int]] = None) -> Callable:
+    """
+    Record a StaffingPredictor method call as a span when instrumentation is on.
+
+    The span's row count is count_rows(*args, **kwargs) when given, else the
+    length of the first argument for batched methods and 1 otherwise. When
+    instrumentation is off this costs one attribute check.
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stats = self._stats
+            if stats is None:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                if count_rows is not None:
+                    rows = count_rows(*args, **kwargs)
+                else:
+                    rows = len(args[0] if args else kwargs.get('dates', ())) if batched else 1
+                stats.lap(name, rows, started)
+        return wrapper
+    return decorator
+
+
+def _range_days(start_date: datetime.date, end_date: datetime.date, *args, **kwargs) -> int:
+    """Days in an inclusive date range (0 if empty), the row count of predict_range spans."""
+    try:
+        return max(0, (end_date - start_date).days + 1)
+    except TypeError:
+        return 0
 
 
 class StaffingPredictor:
@@ -12,6 +1155,30 @@ class StaffingPredictor:
     This predictor uses a two-stage approach:
     1. Predict total transactions based on date, weather, and events
     2. Predict staffing hours for each role based on predicted transactions and other features
+
+    Thread safety:
+    A single instance may be shared by all request threads of a threaded WSGI
+    server. Prediction methods are safe to call concurrently: the boosters are
+    only read (XGBoost's inplace_predict is thread-safe), single-row calls use
+    per-thread feature buffers, and the prediction cache, calendar store and
+    scenario cube guard their state with locks. Models live in one immutable
+    ModelSet that loads and reload_models() replace atomically, so predictions
+    in flight finish on the pair they started with.
+
+    Every booster runs single-threaded. A call's thread budget depends on its
+    size: batches of up to small_batch_rows rows run in the calling thread, and
+    larger batches are split into chunks evaluated on a bounded internal
+    executor with up to nthread workers. A semaphore caps concurrent model
+    evaluations at nthread, so many concurrent small requests spread across
+    cores instead of each spinning up a full OpenMP team and oversubscribing
+    the CPU.
+
+    Instrumentation:
+    enable_instrumentation() starts recording monotonic-clock spans for each
+    public prediction method and for the features, tx_model, work_model,
+    postprocess and results stages, aggregated per batch-size bucket (see
+    InferenceStats and stats()). It is off by default and then costs one
+    attribute check per call and stage.
     """
 
     # Constants for current operational parameters (2024-2025 baseline)
@@ -47,6 +1214,24 @@ class StaffingPredictor:
         'campus_construction': 0.94,
     }
 
+    # Fraction of boosting rounds evaluated per fidelity level (see fidelity_report for measured error)
+    FIDELITY_LEVELS = {
+        'full': 1.0,
+        'high': 0.75,
+        'medium': 0.5,
+        'preview': 0.25,
+    }
+    # Granularity client-supplied fidelity fractions are rounded to
+    FIDELITY_STEP = 0.05
+
+    # Seconds a model swap waits before rebuilding the scenario cube, so a
+    # load_tx_model/load_work_model pair triggers one rebuild instead of two
+    CUBE_REBUILD_DELAY = 1.0
+
+    # Published integer codes for weather and event inputs: a value's code is its position here
+    WEATHER_CODES = tuple(WEATHER_IMPACT_MAP)
+    EVENT_CODES = tuple(EVENT_IMPACT_MAP)
+
     # Special academic periods with exact dates
     SPECIAL_PERIODS = [
         {'name': 'move_in_week', 'dates': [(8, 15, 8, 22)], 'multiplier': 1.28},
@@ -62,36 +1247,418 @@ class StaffingPredictor:
         'actual_kitchen_line', 'actual_dish_room', 'actual_management'
     ]
 
-    def __init__(self, tx_model_path: Optional[str] = None, work_model_path: Optional[str] = None):
+    # Model evaluation backends: XGBoost itself, or the pure-NumPy CompiledTreeEnsemble
+    BACKENDS = ('xgboost', 'numpy')
+
+    # Model input columns, in training order
+    TX_FEATURE_COLUMNS = list(CalendarFeatureStore.COLUMNS) + ['weather_impact', 'event_impact']
+    WORK_FEATURE_COLUMNS = TX_FEATURE_COLUMNS + ['total_transactions']
+
+    def __init__(
+            self,
+            tx_model_path: Optional[str] = None,
+            work_model_path: Optional[str] = None,
+            calendar_start_year: int = 2020,
+            calendar_end_year: int = 2035,
+            cache_size: int = 4096,
+            backend: str = 'xgboost',
+            nthread: Optional[int] = None,
+            small_batch_rows: int = 256,
+            instrument: bool = False,
+            range_cache_days: int = 100000
+    ):
         """
         Initialize the StaffingPredictor.
 
         Args:
             tx_model_path: Path to the trained transaction prediction model (pickle file)
             work_model_path: Path to the trained staffing prediction model (pickle file)
+            calendar_start_year: First year covered by the precomputed calendar features
+            calendar_end_year: Last year covered by the precomputed calendar features
+            cache_size: Maximum number of memoized predictions (0 disables the cache)
+            backend: 'xgboost' to evaluate with XGBoost, or 'numpy' to compile the boosters into
+                flat arrays evaluated by CompiledTreeEnsemble (matches XGBoost within float32
+                tolerance; with JSON native artifacts it does not need xgboost installed)
+            nthread: Total inference thread budget (defaults to the number of CPUs)
+            small_batch_rows: Batches up to this many rows run single-threaded in the calling thread
+            instrument: Record per-method and per-stage timings from the start (see enable_instrumentation)
+            range_cache_days: Days of predict_range results kept for reuse (0 disables the range cache)
         """
-        self.tx_estimator = None
-        self.work_estimator = None
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Invalid backend: {backend}. Must be one of {list(self.BACKENDS)}")
+        if backend == 'xgboost' and xgb is None:
+            raise ImportError("xgboost is not installed; use backend='numpy' with JSON native models")
+
+        self.backend = backend
+        self.nthread = max(1, nthread or os.cpu_count() or 1)
+        self.small_batch_rows = small_batch_rows
+        self._inference_slots = threading.BoundedSemaphore(self.nthread)
+        # submit() tasks and batch chunks use separate pools: a submitted task that fans
+        # out chunks waits on them, and must not hold the worker they need
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._chunk_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._shut_down = False
+
+        self._models = ModelSet()
+        self._swap_lock = threading.Lock()
+        self._buffers = threading.local()
+        self._stats: Optional[InferenceStats] = InferenceStats() if instrument else None
+        self.prediction_cache = PredictionCache(cache_size)
+        self.range_cache = DateRangeCache(range_cache_days)
+
+        self.scenario_cube: Optional[ScenarioCube] = None
+        self._cube_config: Optional[Dict[str, Any]] = None
+        self._cube_lock = threading.Lock()
+        self._cube_timer: Optional[threading.Timer] = None
+        self.calendar_features = CalendarFeatureStore(self, calendar_start_year, calendar_end_year)
 
         if tx_model_path:
             self.load_tx_model(tx_model_path)
         if work_model_path:
             self.load_work_model(work_model_path)
 
+    @staticmethod
+    def _read_model(model_path: str) -> Tuple[Any, str]:
+        """Unpickle a model file, returning the estimator and a hash of the file contents."""
+        with open(model_path, 'rb') as f:
+            payload = f.read()
+        return pickle.loads(payload), hashlib.sha256(payload).hexdigest()
+
+    def _build_stage(self, estimator: Any, feature_names: List[str]) -> BoosterEnsemble:
+        """Wrap a loaded estimator for this predictor's backend."""
+        stage = BoosterEnsemble.from_estimator(estimator, feature_names)
+        if self.backend == 'numpy':
+            return stage.compiled()
+        stage.set_single_threaded()
+        return stage
+
+    @property
+    def tx_estimator(self) -> Any:
+        return self._models.tx_estimator
+
+    @property
+    def work_estimator(self) -> Any:
+        return self._models.work_estimator
+
+    @property
+    def _tx_stage(self) -> Optional[BoosterEnsemble]:
+        return self._models.tx_stage
+
+    @property
+    def _work_stage(self) -> Optional[BoosterEnsemble]:
+        return self._models.work_stage
+
+    @property
+    def model_version(self) -> int:
+        """Incremented on every model load or swap; caches and the scenario cube key on it."""
+        return self._models.version
+
+    @property
+    def model_signatures(self) -> Dict[str, str]:
+        return {'tx': self._models.tx_signature, 'work': self._models.work_signature}
+
     def load_tx_model(self, model_path: str) -> None:
         """Load the transaction prediction model from a pickle file."""
-        with open(model_path, 'rb') as f:
-            self.tx_estimator = pickle.load(f)
+        estimator, signature = self._read_model(model_path)
+        stage = self._build_stage(estimator, self.TX_FEATURE_COLUMNS)
+        self._swap_models(tx_estimator=estimator, tx_stage=stage, tx_signature=signature)
 
     def load_work_model(self, model_path: str) -> None:
         """Load the staffing prediction model from a pickle file."""
-        with open(model_path, 'rb') as f:
-            self.work_estimator = pickle.load(f)
+        estimator, signature = self._read_model(model_path)
+        stage = self._build_stage(estimator, self.WORK_FEATURE_COLUMNS)
+        self._swap_models(work_estimator=estimator, work_stage=stage, work_signature=signature)
 
     def load_models(self, tx_model_path: str, work_model_path: str) -> None:
         """Load both models at once."""
-        self.load_tx_model(tx_model_path)
-        self.load_work_model(work_model_path)
+        self._install_models(self._read_model_pair(tx_model_path, work_model_path))
+
+    def _read_model_pair(self, tx_model_path: str, work_model_path: str) -> ModelSet:
+        """Unpickle and wrap a tx/work pair without installing it."""
+        tx_estimator, tx_signature = self._read_model(tx_model_path)
+        work_estimator, work_signature = self._read_model(work_model_path)
+        return ModelSet(
+            tx_estimator=tx_estimator,
+            work_estimator=work_estimator,
+            tx_stage=self._build_stage(tx_estimator, self.TX_FEATURE_COLUMNS),
+            work_stage=self._build_stage(work_estimator, self.WORK_FEATURE_COLUMNS),
+            tx_signature=tx_signature,
+            work_signature=work_signature,
+        )
+
+    def _smoke_test(self, models: ModelSet) -> None:
+        """
+        Run a candidate pair over a few real feature rows before it goes live.
+
+        Raises:
+            ValueError: If the pair produces too few outputs or non-finite/negative predictions
+        """
+        weather_conditions = self.get_available_weather_conditions()
+        events = self.get_available_events()
+        today = datetime.date.today()
+        dates = [today + datetime.timedelta(days=i) for i in range(len(events))]
+        rows = [weather_conditions[i % len(weather_conditions)] for i in range(len(events))]
+
+        features = self._assemble_features(dates, rows, events)
+        predicted_transactions, role_hours = self._predict_matrix_serial(features, models)
+        if len(role_hours) != len(dates) or role_hours.shape[1] < len(self.DEFAULT_STAFFING_ROLES):
+            raise ValueError(f"Staffing model returned shape {role_hours.shape}, expected "
+                             f"({len(dates)}, >={len(self.DEFAULT_STAFFING_ROLES)})")
+        if not np.all(np.isfinite(role_hours)) or np.any(predicted_transactions < 0):
+            raise ValueError("Smoke prediction produced invalid values")
+
+    def _install_models(self, models: ModelSet) -> int:
+        """Atomically make a prepared pair the live one; returns the new model version."""
+        return self._swap_models(**{name: value for name, value in models.attributes().items()
+                                    if name not in ('version', 'quantile_models')})
+
+    def _swap_models(self, **changes) -> int:
+        with self._swap_lock:
+            self._models = self._models.replace(version=self._models.version + 1, **changes)
+            version = self._models.version
+        self._on_models_changed()
+        return version
+
+    def reload_models(
+            self,
+            tx_model_path: Optional[str] = None,
+            work_model_path: Optional[str] = None,
+            native_model_dir: Optional[str] = None,
+            use_mmap: bool = True
+    ) -> int:
+        """
+        Hot-swap a retrained model pair without restarting.
+
+        The new pair is loaded and validated (feature order and a smoke
+        prediction) while the current pair keeps serving, then both models are
+        swapped in with a single reference assignment. On any failure the current
+        models stay in place.
+
+        Args:
+            tx_model_path: Pickled transaction model
+            work_model_path: Pickled staffing model
+            native_model_dir: Directory of native artifacts, used instead of the pickles when given
+            use_mmap: Read native booster files through mmap
+
+        Returns:
+            The new model version
+
+        Raises:
+            ValueError: If neither source is given or the new models fail validation
+        """
+        if native_model_dir:
+            models = self._read_native_model_pair(native_model_dir, use_mmap)
+        elif tx_model_path and work_model_path:
+            models = self._read_model_pair(tx_model_path, work_model_path)
+        else:
+            raise ValueError("Either native_model_dir or both tx_model_path and work_model_path are required")
+
+        self._smoke_test(models)
+        return self._install_models(models)
+
+    def reload_models_async(self, *args, **kwargs) -> threading.Thread:
+        """Same as reload_models, but loads and validates on a background daemon thread."""
+        thread = threading.Thread(
+            target=self._reload_quietly,
+            args=args,
+            kwargs=kwargs,
+            name='model-reloader',
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _reload_quietly(self, *args, **kwargs) -> None:
+        try:
+            version = self.reload_models(*args, **kwargs)
+            logger.info("Models reloaded (model_version=%s)", version)
+        except Exception as e:
+            logger.error("Error reloading models, keeping the current ones: %s", e)
+
+    def save_native_models(self, output_dir: str, model_format: str = 'ubj') -> str:
+        """
+        Write the loaded models as native XGBoost boosters plus a metadata sidecar.
+
+        Every booster is saved with Booster.save_model in UBJSON ('ubj') or JSON
+        ('json') format. model_meta.json records, per stage, the booster files,
+        their SHA-256, feature order, iteration ranges and fold clipping bounds,
+        along with the staffing roles and the training hash (content hash of the
+        source model files) so scenario cubes and caches stay valid across formats.
+
+        Args:
+            output_dir: Directory to write the artifacts to (created if missing)
+            model_format: 'ubj' or 'json'
+
+        Returns:
+            Path of the metadata file
+
+        Raises:
+            ValueError: If models are not loaded or are not XGBoost models
+        """
+        if model_format not in ('ubj', 'json'):
+            raise ValueError(f"Invalid model_format: {model_format}. Must be 'ubj' or 'json'")
+        models = self._models
+        self._check_models_loaded(models)
+        os.makedirs(output_dir, exist_ok=True)
+
+        stages = {}
+        for stage_name, stage in (('tx', models.tx_stage), ('work', models.work_stage)):
+            if stage.fallback is not None or self.backend != 'xgboost':
+                raise ValueError(f"The {stage_name} model is not an XGBoost model and cannot be saved natively")
+
+            files = []
+            for i, booster in enumerate(stage.boosters):
+                file_name = f"{stage_name}_model.{i}.{model_format}"
+                booster.save_model(os.path.join(output_dir, file_name))
+                files.append({'file': file_name, 'sha256': _file_sha256(os.path.join(output_dir, file_name))})
+
+            # Smoke prediction on a zero row also tells us the output width
+            probe = np.zeros((1, len(stage.feature_names)), dtype=np.float32)
+            num_outputs = int(np.asarray(stage.predict(probe)).reshape(1, -1).shape[1])
+
+            stages[stage_name] = {
+                'boosters': files,
+                'feature_names': stage.feature_names,
+                'iteration_ranges': [list(iteration_range) for iteration_range in stage.iteration_ranges],
+                'clip': None if stage.clip is None else [float(bound) for bound in stage.clip],
+                'num_outputs': num_outputs,
+            }
+
+        metadata = {
+            'format_version': NATIVE_FORMAT_VERSION,
+            'xgboost_version': xgb.__version__,
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'staffing_roles': self.DEFAULT_STAFFING_ROLES,
+            'training_hash': {'tx': models.tx_signature, 'work': models.work_signature},
+            'stages': stages,
+        }
+        metadata_path = os.path.join(output_dir, MODEL_METADATA_FILE)
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        return metadata_path
+
+    def load_native_models(self, model_dir: str, use_mmap: bool = True) -> None:
+        """
+        Load both models from artifacts written by save_native_models.
+
+        This path does not unpickle anything, so neither scikit-learn nor the
+        training-time wrapper classes need to be importable, and the files load
+        across XGBoost versions. With use_mmap the booster files are checksummed
+        through a read-only memory map; either way each file is copied once into
+        the buffer XGBoost parses, since Booster.load_model only takes a bytearray.
+
+        Args:
+            model_dir: Directory containing model_meta.json and the booster files
+            use_mmap: Read booster files through mmap instead of a read() buffer
+
+        Raises:
+            ValueError: If the metadata is unsupported, a file fails its checksum,
+                or a booster's feature order does not match
+        """
+        self._install_models(self._read_native_model_pair(model_dir, use_mmap))
+
+    def _read_native_model_pair(self, model_dir: str, use_mmap: bool = True) -> ModelSet:
+        """Read native artifacts into a ModelSet without installing it."""
+        with open(os.path.join(model_dir, MODEL_METADATA_FILE)) as f:
+            metadata = json.load(f)
+        if metadata.get('format_version') != NATIVE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported native model format version: {metadata.get('format_version')}")
+
+        expected_features = {'tx': self.TX_FEATURE_COLUMNS, 'work': self.WORK_FEATURE_COLUMNS}
+        stages = {}
+        for stage_name, stage_meta in metadata['stages'].items():
+            if stage_meta['feature_names'] != expected_features[stage_name]:
+                raise ValueError(f"Feature order of the {stage_name} model does not match the predictor")
+
+            boosters = [
+                _read_native_booster(os.path.join(model_dir, entry['file']), entry['sha256'], use_mmap,
+                                     compile_trees=self.backend == 'numpy')
+                for entry in stage_meta['boosters']
+            ]
+            stage = BoosterEnsemble(
+                boosters,
+                stage_meta['feature_names'],
+                [tuple(iteration_range) for iteration_range in stage_meta['iteration_ranges']],
+                None if stage_meta['clip'] is None else tuple(stage_meta['clip'])
+            )
+            stage.validate_feature_order()
+            if self.backend == 'xgboost':
+                stage.set_single_threaded()
+            stages[stage_name] = stage
+
+        return ModelSet(
+            tx_estimator=stages['tx'],
+            work_estimator=stages['work'],
+            tx_stage=stages['tx'],
+            work_stage=stages['work'],
+            tx_signature=metadata['training_hash']['tx'],
+            work_signature=metadata['training_hash']['work'],
+        )
+
+    def load_quantile_models(self, model_dir: str, use_mmap: bool = True) -> None:
+        """
+        Load companion quantile models (see train_quantile_models.py) for prediction intervals.
+
+        They stay attached across later reloads of the point models.
+
+        Args:
+            model_dir: Directory containing quantile_meta.json and the booster files
+            use_mmap: Read booster files through mmap
+
+        Raises:
+            ValueError: If the models' feature order or roles do not match the predictor
+        """
+        quantile_models = QuantileModels.load(model_dir, use_mmap, compile_trees=self.backend == 'numpy')
+        if quantile_models.tx_stage.feature_names != self.TX_FEATURE_COLUMNS:
+            raise ValueError("Feature order of the transaction quantile model does not match the predictor")
+        for role, stage in zip(quantile_models.roles, quantile_models.role_stages):
+            if stage.feature_names != self.WORK_FEATURE_COLUMNS:
+                raise ValueError(f"Feature order of the {role} quantile model does not match the predictor")
+        if quantile_models.roles != self.DEFAULT_STAFFING_ROLES[:len(quantile_models.roles)]:
+            raise ValueError(f"Quantile model roles {quantile_models.roles} do not match the staffing roles")
+        self._swap_models(quantile_models=quantile_models)
+
+    @property
+    def quantile_models(self) -> Optional[QuantileModels]:
+        return self._models.quantile_models
+
+    @property
+    def model_signature(self) -> str:
+        """Content hash identifying the loaded tx/work model pair."""
+        return self._models.signature
+
+    def _on_models_changed(self) -> None:
+        """
+        Drop results of the previous models and schedule a scenario cube rebuild if one is in use.
+
+        The rebuild waits CUBE_REBUILD_DELAY seconds and each further swap restarts the wait,
+        so swaps in quick succession (such as loading the tx and work models one at a time)
+        rebuild the cube once, from the last pair.
+        """
+        with self._cube_lock:
+            self.scenario_cube = None
+            if self._cube_config is not None:
+                if self._cube_timer is not None:
+                    self._cube_timer.cancel()
+                self._cube_timer = threading.Timer(self.CUBE_REBUILD_DELAY, self._rebuild_cube)
+                self._cube_timer.name = 'scenario-cube-builder'
+                self._cube_timer.daemon = True
+                self._cube_timer.start()
+        self.prediction_cache.clear()
+        self.range_cache.clear()
+
+    def _rebuild_cube(self) -> None:
+        if self.tx_estimator is not None and self.work_estimator is not None:
+            self._build_cube_quietly(**self._cube_config)
+
+    def cache_info(self) -> Dict[str, int]:
+        """Get prediction cache statistics (hits, misses, size, maxsize)."""
+        return self.prediction_cache.info()
+
+    def clear_cache(self) -> None:
+        """Drop all memoized predictions."""
+        self.prediction_cache.clear()
 
     def get_academic_period_multiplier(self, date: datetime) -> float:
         """
@@ -188,86 +1755,447 @@ class StaffingPredictor:
         Returns:
             DataFrame with exactly the features from your available_features list
         """
-        # Validate inputs
-        if weather not in self.WEATHER_IMPACT_MAP:
-            raise ValueError(f"Invalid weather: {weather}. Must be one of {list(self.WEATHER_IMPACT_MAP.keys())}")
+        self._validate_inputs(weather, event)
+        return self.create_batch_features([date], [weather], [event])
 
-        if event not in self.EVENT_IMPACT_MAP:
-            raise ValueError(f"Invalid event: {event}. Must be one of {list(self.EVENT_IMPACT_MAP.keys())}")
+    def create_batch_features(self, dates: List[datetime], weather_conditions: List[str],
+                              events: List[str]) -> pd.DataFrame:
+        """
+        Create the feature matrix for many rows at once.
 
-        # Basic date features
-        day_of_week = date.weekday()
-        month = date.month
-        year = date.year
-        day_of_year = date.timetuple().tm_yday
-        week_of_year = date.isocalendar()[1]
-        is_weekend = 1 if day_of_week >= 5 else 0
-
-        # Get enrollment features
-        enrollment_features = self.calculate_enrollment_features(date)
-
-        # Environmental impacts
-        weather_impact = self.WEATHER_IMPACT_MAP[weather]
-        event_impact = self.EVENT_IMPACT_MAP[event]
-
-        # Create DataFrame with exactly your available_features
-        features = pd.DataFrame({
-            # Date and time features (all numerical)
-            'day_of_week': [day_of_week],
-            'month': [month],
-            'year': [year],
-            'day_of_year': [day_of_year],
-            'week_of_year': [week_of_year],
-            'is_weekend': [is_weekend],
-
-            # Academic calendar (numerical version)
-            'seasonal_multiplier': [enrollment_features['seasonal_multiplier']],
-
-            # Student population (known from enrollment data)
-            'total_enrollment': [enrollment_features['total_enrollment']],
-            'active_enrollment': [enrollment_features['active_enrollment']],
-            'residential_students': [enrollment_features['residential_students']],
-            'commuter_students': [enrollment_features['commuter_students']],
-            'total_meal_plan_holders': [enrollment_features['total_meal_plan_holders']],
-            'enrollment_seasonal_factor': [enrollment_features['enrollment_seasonal_factor']],
-
-            # Environmental factors (numerical impacts)
-            'weather_impact': [weather_impact],
-            'event_impact': [event_impact],
-        })
+        Produces the same columns, in the same order, as create_model_features,
+        with one row per (date, weather, event) triple. Inputs are assumed to be
+        validated already.
+
+        Args:
+            dates: Dates for prediction
+            weather_conditions: Weather condition per date
+            events: Campus event type per date
 
-        return features
+        Returns:
+            DataFrame with one feature row per input date
+        """
+        features = self._assemble_features(dates, weather_conditions, events)
+        return pd.DataFrame(features[:, :len(self.TX_FEATURE_COLUMNS)], columns=self.TX_FEATURE_COLUMNS)
 
-    def predict_transactions(self, date: datetime, weather: str, event: str) -> int:
+    def _assemble_features(self, dates: List[datetime], weather_conditions: Sequence, events: Sequence,
+                           out: Optional[np.ndarray] = None) -> np.ndarray:
         """
-        First stage: Predict total transactions for a given date.
+        Write model features for validated rows into a float32 buffer.
+
+        Columns follow WORK_FEATURE_COLUMNS; the trailing total_transactions column
+        is left for the second stage to fill in, and the leading
+        TX_FEATURE_COLUMNS slice is the transaction model's input.
 
         Args:
-            date: Date for prediction
-            weather: Weather condition
-            event: Campus event type
+            dates: Dates for prediction
+            weather_conditions: Weather condition per date, as names or integer codes
+            events: Campus event type per date, as names or integer codes
+            out: Optional preallocated buffer of shape (n, len(WORK_FEATURE_COLUMNS))
 
         Returns:
-            Predicted number of transactions
+            The filled buffer
+        """
+        stats = self._stats
+        started = time.perf_counter() if stats is not None else 0.0
+        num_calendar = len(CalendarFeatureStore.COLUMNS)
+        if out is None:
+            out = np.empty((len(dates), len(self.WORK_FEATURE_COLUMNS)), dtype=np.float32)
+
+        self.calendar_features.fill(dates, out[:, :num_calendar])
+        out[:, num_calendar] = self._impacts(weather_conditions, self.WEATHER_IMPACT_MAP)
+        out[:, num_calendar + 1] = self._impacts(events, self.EVENT_IMPACT_MAP)
+        if stats is not None:
+            stats.lap('stage.features', len(out), started)
+        return out
+
+    @staticmethod
+    def _impacts(values: Sequence, impact_map: Dict[str, float]) -> Any:
+        """Impact factor per row, from names or from integer codes."""
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+            return np.fromiter(impact_map.values(), dtype=np.float32, count=len(impact_map))[values]
+        return [impact_map[value] for value in values]
+
+    def get_code_table(self) -> Dict[str, List[str]]:
+        """Integer codes accepted for weather and event inputs: each list's index is the code."""
+        return {'weather': list(self.WEATHER_CODES), 'event': list(self.EVENT_CODES)}
+
+    def encode_inputs(self, weather_conditions: Sequence, events: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encode weather/event names as integer codes in one vectorized pass.
+
+        Integers are taken as codes already and names go through the code table,
+        so sequences may mix the two. Unknown names, out-of-range codes and any
+        other value (including bools) become -1.
+
+        Returns:
+            Tuple (weather_codes, event_codes) of int16 arrays
+        """
+        return self._encode(weather_conditions, self.WEATHER_CODES), self._encode(events, self.EVENT_CODES)
+
+    @staticmethod
+    def _encode(values: Sequence, table: Tuple[str, ...]) -> np.ndarray:
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+            # Range-check before narrowing so large codes can't wrap into valid ones
+            codes = values.astype(np.int64)
+            return np.where((codes >= 0) & (codes < len(table)), codes, -1).astype(np.int16)
+        if all(type(value) is str for value in values):
+            # get_indexer maps names missing from the table to -1
+            return pd.Index(table).get_indexer(np.asarray(values, dtype=object)).astype(np.int16)
+
+        index = {name: code for code, name in enumerate(table)}
+        codes = np.full(len(values), -1, dtype=np.int16)
+        for i, value in enumerate(values):
+            if isinstance(value, str):
+                codes[i] = index.get(value, -1)
+            elif isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)):
+                if 0 <= value < len(table):
+                    codes[i] = value
+        return codes
+
+    def validate_codes(self, weather_codes: np.ndarray, event_codes: np.ndarray) -> np.ndarray:
+        """
+        Validate a whole batch of encoded inputs at once.
+
+        Returns:
+            Boolean error mask, True where the weather or event code is unknown
+        """
+        return ((weather_codes < 0) | (weather_codes >= len(self.WEATHER_CODES))
+                | (event_codes < 0) | (event_codes >= len(self.EVENT_CODES)))
+
+    def _input_error(self, weather: Any, event: Any) -> str:
+        """Validation message for one invalid row, given as names or codes."""
+        for value, table, kind in ((weather, self.WEATHER_CODES, 'weather'), (event, self.EVENT_CODES, 'event')):
+            if isinstance(value, (bool, np.bool_)):
+                return f"Invalid {kind}: {value}. Must be one of {list(table)} or an integer code"
+            if isinstance(value, (int, np.integer)):
+                if not 0 <= value < len(table):
+                    return f"Invalid {kind} code: {value}. Must be between 0 and {len(table) - 1}"
+            elif value not in table:
+                return f"Invalid {kind}: {value}. Must be one of {list(table)}"
+        return ''
+
+    def _decode(self, codes: np.ndarray, table: Tuple[str, ...]) -> List[str]:
+        return np.asarray(table, dtype=object)[codes].tolist()
+
+    @staticmethod
+    def _input_names(values: Sequence, codes: np.ndarray, table: Tuple[str, ...]) -> List[str]:
+        """Names of encoded inputs, keeping invalid raw values as given for error rows."""
+        return [table[code] if 0 <= code < len(table) else str(value) for value, code in zip(values, codes)]
+
+    def _row_buffer(self) -> np.ndarray:
+        """Per-thread preallocated feature buffer for single-row predictions."""
+        buffer = getattr(self._buffers, 'row', None)
+        if buffer is None:
+            buffer = np.empty((1, len(self.WORK_FEATURE_COLUMNS)), dtype=np.float32)
+            self._buffers.row = buffer
+        return buffer
+
+    def _validate_inputs(self, weather: str, event: str) -> None:
+        """Raise ValueError for unknown weather or event values."""
+        if not isinstance(weather, str) or weather not in self.WEATHER_IMPACT_MAP:
+            raise ValueError(f"Invalid weather: {weather}. Must be one of {list(self.WEATHER_IMPACT_MAP.keys())}")
+
+        if not isinstance(event, str) or event not in self.EVENT_IMPACT_MAP:
+            raise ValueError(f"Invalid event: {event}. Must be one of {list(self.EVENT_IMPACT_MAP.keys())}")
+
+    def _check_models_loaded(self, models: Optional[ModelSet] = None) -> None:
+        models = models or self._models
+        if models.tx_estimator is None:
+            raise ValueError("Transaction model not loaded. Use load_tx_model() or load_models() first.")
+        if models.work_estimator is None:
+            raise ValueError("Work model not loaded. Use load_work_model() or load_models() first.")
+
+    def enable_instrumentation(self, callback: Optional[Callable[[str, int, float], None]] = None) -> InferenceStats:
+        """
+        Start recording per-method and per-stage timings.
+
+        Args:
+            callback: Optional hook called as callback(name, rows, seconds) for every
+                recorded span, e.g. to forward timings to a metrics client
+
+        Returns:
+            The InferenceStats collecting the timings (kept if already enabled)
+        """
+        stats = self._stats or InferenceStats()
+        stats.callback = callback
+        self._stats = stats
+        return stats
+
+    def disable_instrumentation(self) -> None:
+        """Stop recording timings and drop the collected stats."""
+        self._stats = None
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Timings and counters recorded since instrumentation was enabled.
+
+        Args:
+            reset: Clear the aggregates after reading them
+
+        Returns:
+            InferenceStats.snapshot() plus 'enabled'; only {'enabled': False} when
+            instrumentation is off
+        """
+        stats = self._stats
+        if stats is None:
+            return {'enabled': False}
+        snapshot = stats.snapshot()
+        if reset:
+            stats.reset()
+        return dict(snapshot, enabled=True)
+
+    def _count(self, name: str) -> None:
+        if self._stats is not None:
+            self._stats.count(name)
+
+    def _resolve_fidelity(self, fidelity: Any) -> float:
+        """
+        Fraction of boosting rounds for a fidelity level name or fraction (None means full).
+
+        Fractions are rounded to FIDELITY_STEP so clients cannot grow the per-fraction
+        model and cache entries without bound.
+        """
+        if fidelity is None:
+            return 1.0
+        if isinstance(fidelity, str):
+            if fidelity not in self.FIDELITY_LEVELS:
+                raise ValueError(f"Invalid fidelity: {fidelity}. Must be one of {list(self.FIDELITY_LEVELS)} "
+                                 f"or a fraction in (0, 1]")
+            return self.FIDELITY_LEVELS[fidelity]
+        try:
+            fraction = float(fidelity)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid fidelity: {fidelity}. Must be one of {list(self.FIDELITY_LEVELS)} "
+                             f"or a fraction in (0, 1]")
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Invalid fidelity: {fidelity}. Fractions must be in (0, 1]")
+        return round(max(round(fraction / self.FIDELITY_STEP), 1) * self.FIDELITY_STEP, 6)
+
+    def _models_at(self, fidelity: Any) -> Tuple[ModelSet, float]:
+        """Snapshot of the live models, reduced to the requested fidelity."""
+        fraction = self._resolve_fidelity(fidelity)
+        models = self._models
+        if models.tx_stage is None or models.work_stage is None:
+            return models, fraction
+        return models.at_fidelity(fraction), fraction
+
+    def _predict_with_models(self, dates: List[datetime], weather_conditions: Sequence, events: Sequence,
+                             out: Optional[np.ndarray] = None, nthread: Optional[int] = None,
+                             models: Optional[ModelSet] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run both model stages of one model set (the live one by default) over already-validated rows.
+
+        Returns:
+            Tuple (predicted_transactions, role_hours): int64 array of shape (n,) and
+            float32 array of shape (n, outputs), clipped at zero and rounded to 0.1
+        """
+        features = self._assemble_features(dates, weather_conditions, events, out)
+        return self._predict_matrix(features, models or self._models, nthread)
+
+    def _thread_budget(self, num_rows: int, nthread: Optional[int] = None) -> int:
+        """Threads a call of num_rows rows may use: one for small batches, up to the budget otherwise."""
+        limit = min(self.nthread, nthread) if nthread else self.nthread
+        if num_rows <= self.small_batch_rows or self._shut_down:
+            return 1
+        return max(1, min(limit, -(-num_rows // self.small_batch_rows)))
+
+    def _get_executor(self, name: str = '_executor', prefix: str = 'staffing-predictor') -> ThreadPoolExecutor:
+        """The executor stored in attribute name, created on first use."""
+        executor = getattr(self, name)
+        if executor is None:
+            with self._executor_lock:
+                if self._shut_down:
+                    raise RuntimeError("cannot schedule new futures after shutdown")
+                executor = getattr(self, name)
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=self.nthread, thread_name_prefix=prefix)
+                    setattr(self, name, executor)
+        return executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Run a callable (typically one of this predictor's methods) on the internal executor.
+
+        The executor is bounded to nthread workers, and model evaluations are
+        capped at nthread by the inference slots, so fanning out many
+        predictions through it never runs more model evaluations than cores.
+        Large batches submitted here split into chunks on a separate pool.
+
+        Raises:
+            RuntimeError: After shutdown()
+        """
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        """
+        Stop the internal executors and any pending cube rebuild.
+
+        Prediction keeps working, but large batches run serially.
+        """
+        with self._cube_lock:
+            if self._cube_timer is not None:
+                self._cube_timer.cancel()
+        with self._executor_lock:
+            self._shut_down = True
+            executors = [self._executor, self._chunk_executor]
+            self._executor = self._chunk_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def _predict_matrix(self, features: np.ndarray, models: ModelSet,
+                        nthread: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Two-stage prediction over a float32 matrix built by _assemble_features."""
+        budget = self._thread_budget(len(features), nthread)
+        if budget <= 1:
+            with self._inference_slots:
+                return self._predict_matrix_serial(features, models)
+
+        # Chunks are independent rows; each takes its own inference slot on a worker
+        bounds = np.linspace(0, len(features), budget + 1).astype(np.int64)
+        try:
+            executor = self._get_executor('_chunk_executor', 'staffing-predictor-chunk')
+        except RuntimeError:
+            # Shut down while this call was starting
+            with self._inference_slots:
+                return self._predict_matrix_serial(features, models)
+        futures = [
+            executor.submit(self._predict_chunk, features[start:stop], models)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        chunks = [future.result() for future in futures]
+        return (np.concatenate([transactions for transactions, _ in chunks]),
+                np.concatenate([hours for _, hours in chunks]))
+
+    def _predict_chunk(self, features: np.ndarray, models: ModelSet) -> Tuple[np.ndarray, np.ndarray]:
+        with self._inference_slots:
+            return self._predict_matrix_serial(features, models)
+
+    def _predict_matrix_serial(self, features: np.ndarray, models: ModelSet) -> Tuple[np.ndarray, np.ndarray]:
+        """Two-stage prediction in the calling thread."""
+        stats = self._stats
+        started = time.perf_counter() if stats is not None else 0.0
+        num_tx_features = len(self.TX_FEATURE_COLUMNS)
+
+        # Stage 1: one transaction-model pass over every row
+        raw_transactions = np.asarray(models.tx_stage.predict(features[:, :num_tx_features]))
+        predicted_transactions = np.maximum(raw_transactions.astype(np.int64), 0)
+        if stats is not None:
+            started = stats.lap('stage.tx_model', len(features), started)
+
+        # Stage 2: one work-model pass with the predicted transactions filled in
+        features[:, num_tx_features] = predicted_transactions
+        staffing_predictions = np.asarray(models.work_stage.predict(features)).reshape(len(features), -1)
+        if stats is not None:
+            started = stats.lap('stage.work_model', len(features), started)
+
+        # No negative hours
+        role_hours = np.round(np.maximum(staffing_predictions, 0), 1)
+        if stats is not None:
+            stats.lap('stage.postprocess', len(features), started)
+        return predicted_transactions, role_hours
+
+    def _predict_rows(self, dates: List[datetime], weather_conditions: Sequence, events: Sequence,
+                      nthread: Optional[int] = None, models: Optional[ModelSet] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict already-validated rows (names or codes), serving rows inside the scenario cube from it.
+
+        Returns:
+            Same as _predict_with_models
+        """
+        models = models or self._models
+        cube = self._current_cube(models)
+        if cube is None:
+            return self._predict_with_models(dates, weather_conditions, events, nthread=nthread, models=models)
+
+        hit, day_index, weather_index, event_index = cube.locate(dates, weather_conditions, events)
+        if self._stats is not None:
+            self._stats.count('cube_rows', int(hit.sum()))
+        if hit.all():
+            return (cube.transactions[day_index, weather_index, event_index],
+                    cube.hours[day_index, weather_index, event_index])
+
+        predicted_transactions = np.empty(len(dates), dtype=np.int64)
+        role_hours = np.empty((len(dates), cube.hours.shape[-1]), dtype=cube.hours.dtype)
+        hits = np.flatnonzero(hit)
+        predicted_transactions[hits] = cube.transactions[day_index[hits], weather_index[hits], event_index[hits]]
+        role_hours[hits] = cube.hours[day_index[hits], weather_index[hits], event_index[hits]]
+
+        misses = np.flatnonzero(~hit)
+        miss_transactions, miss_hours = self._predict_with_models(
+            [dates[i] for i in misses], _take(weather_conditions, misses), _take(events, misses),
+            nthread=nthread, models=models
+        )
+        predicted_transactions[misses] = miss_transactions
+        role_hours[misses] = miss_hours
+        return predicted_transactions, role_hours
+
+    @staticmethod
+    def _staffing_result(role_hours: np.ndarray, predicted_transactions: int,
+                         target_features: List[str]) -> Dict[str, float]:
+        """Build the per-day result dictionary from one row of role hours."""
+        return StaffingPredictions.from_arrays(
+            role_hours.reshape(1, -1), np.array([predicted_transactions]), target_features
+        ).row(0)
+
+    @_instrumented('predict_transactions', batched=False)
+    def predict_transactions(self, date: datetime, weather: str, event: str, fidelity: Any = None) -> int:
+        """
+        First stage: Predict total transactions for a given date.
+
+        Args:
+            date: Date for prediction
+            weather: Weather condition
+            event: Campus event type
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
+
+        Returns:
+            Predicted number of transactions
 
         Raises:
-            ValueError: If transaction model is not loaded
+            ValueError: If transaction model is not loaded or fidelity is invalid
         """
-        if self.tx_estimator is None:
+        models, fraction = self._models_at(fidelity)
+        if models.tx_estimator is None:
             raise ValueError("Transaction model not loaded. Use load_tx_model() or load_models() first.")
 
-        features = self.create_model_features(date, weather, event)
-        predicted_transactions = self.tx_estimator.predict(features)[0]
+        self._validate_inputs(weather, event)
+        cube = self._current_cube(models)
+        if cube is not None:
+            hit, day_index, weather_index, event_index = cube.locate([date], [weather], [event])
+            if hit[0]:
+                self._count('cube_hits')
+                return int(cube.transactions[day_index[0], weather_index[0], event_index[0]])
+
+        cache_key = ('transactions', date.toordinal(), weather, event, models.version, fraction)
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+        self._count('cache_misses')
+
+        features = self._assemble_features([date], [weather], [event], self._row_buffer())
+        stats = self._stats
+        started = time.perf_counter() if stats is not None else 0.0
+        with self._inference_slots:
+            predicted_transactions = models.tx_stage.predict(features[:, :len(self.TX_FEATURE_COLUMNS)])[0]
+        if stats is not None:
+            stats.lap('stage.tx_model', 1, started)
 
         # Apply reasonable bounds
-        return max(0, int(predicted_transactions))
+        predicted_transactions = max(0, int(predicted_transactions))
+        self.prediction_cache.put(cache_key, predicted_transactions)
+        return predicted_transactions
 
+    @_instrumented('predict_staffing_requirements', batched=False)
     def predict_staffing_requirements(
             self,
             date: datetime,
             weather: str,
             event: str,
-            target_features: Optional[List[str]] = None
+            target_features: Optional[List[str]] = None,
+            fidelity: Any = None
     ) -> Dict[str, float]:
         """
         Two-stage prediction: First predict transactions, then predict staffing requirements.
@@ -277,91 +2205,624 @@ class StaffingPredictor:
             weather: Weather condition
             event: Campus event type
             target_features: List of staffing role column names
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
 
         Returns:
             Dictionary with predicted staffing hours for each role
 
         Raises:
-            ValueError: If either model is not loaded
+            ValueError: If either model is not loaded or fidelity is invalid
         """
-        if self.tx_estimator is None:
-            raise ValueError("Transaction model not loaded. Use load_tx_model() or load_models() first.")
-        if self.work_estimator is None:
-            raise ValueError("Work model not loaded. Use load_work_model() or load_models() first.")
+        models, fraction = self._models_at(fidelity)
+        self._check_models_loaded(models)
 
         if target_features is None:
             target_features = self.DEFAULT_STAFFING_ROLES.copy()
 
-        # Stage 1: Predict transactions
-        predicted_transactions = self.predict_transactions(date, weather, event)
-
-        # Stage 2: Create features including predicted transactions
-        features = self.create_model_features(date, weather, event)
-        features['total_transactions'] = predicted_transactions
+        self._validate_inputs(weather, event)
+        cube = self._current_cube(models)
+        if cube is not None:
+            hit, day_index, weather_index, event_index = cube.locate([date], [weather], [event])
+            if hit[0]:
+                self._count('cube_hits')
+                return self._staffing_result(
+                    cube.hours[day_index[0], weather_index[0], event_index[0]],
+                    cube.transactions[day_index[0], weather_index[0], event_index[0]],
+                    target_features
+                )
+
+        cache_key = ('staffing', date.toordinal(), weather, event, tuple(target_features), models.version, fraction)
+        cached = self.prediction_cache.get(cache_key)
+        if cached is not None:
+            self._count('cache_hits')
+            # Callers are free to mutate the returned dict, so hand out a copy
+            return dict(cached)
+        self._count('cache_misses')
+
+        predicted_transactions, role_hours = self._predict_with_models([date], [weather], [event], self._row_buffer(),
+                                                                       models=models)
+        results = self._staffing_result(role_hours[0], predicted_transactions[0], target_features)
+
+        self.prediction_cache.put(cache_key, dict(results))
+        return results
 
-        # Predict staffing requirements
-        staffing_predictions = self.work_estimator.predict(features)[0]
+    @_instrumented('batch_predict')
+    def batch_predict(
+            self,
+            dates: List[datetime],
+            weather_conditions: List[str],
+            events: List[str],
+            target_features: Optional[List[str]] = None,
+            nthread: Optional[int] = None,
+            fidelity: Any = None
+    ) -> pd.DataFrame:
+        """
+        Batch prediction for multiple dates.
 
-        # Create results dictionary
-        results = {}
-        for i, role in enumerate(target_features):
-            predicted_hours = max(0.0, staffing_predictions[i])  # No negative hours
-            results[role] = round(predicted_hours, 1)
+        Args:
+            dates: List of dates for prediction
+            weather_conditions: Weather conditions (same length as dates), as names or integer codes
+            events: Events (same length as dates), as names or integer codes
+            target_features: List of staffing role column names
+            nthread: Optional cap on the threads this call may use
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
 
-        # Add summary metrics
-        total_hours = sum(results.values())
-        results['total_predicted_hours'] = round(total_hours, 1)
-        results['predicted_transactions'] = predicted_transactions
+        Returns:
+            DataFrame with predictions for all dates with valid inputs; rows with an
+            unknown weather or event are skipped and reported in one logged warning
 
-        # Round all values to 1 decimal place
-        for key in results:
-            if isinstance(results[key], float):
-                results[key] = round(results[key], 1)
+        Raises:
+            ValueError: If input lists have different lengths, models not loaded or fidelity is invalid
+        """
+        if not (len(dates) == len(weather_conditions) == len(events)):
+            raise ValueError("All input lists must have the same length")
+        models, _ = self._models_at(fidelity)
+        self._check_models_loaded(models)
 
-        return results
+        if target_features is None:
+            target_features = self.DEFAULT_STAFFING_ROLES.copy()
 
-    def batch_predict(
+        # Drop rows with unknown inputs up front so one bad row doesn't sink the batch
+        weather_codes, event_codes = self.encode_inputs(weather_conditions, events)
+        invalid = self.validate_codes(weather_codes, event_codes)
+        if invalid.any():
+            skipped = np.flatnonzero(invalid)
+            first = int(skipped[0])
+            logger.warning("Skipped %d of %d rows with invalid inputs; first at %s: %s", len(skipped), len(dates),
+                           dates[first], self._input_error(weather_conditions[first], events[first]))
+            valid = np.flatnonzero(~invalid)
+            if not len(valid):
+                return pd.DataFrame()
+            dates = [dates[i] for i in valid]
+            weather_codes, event_codes = weather_codes[valid], event_codes[valid]
+
+        predictions = self._predict_columns(dates, weather_codes, event_codes, target_features, nthread, models)
+        return predictions.to_pandas()
+
+    def _predict_columns(self, dates: List[datetime], weather_codes: np.ndarray, event_codes: np.ndarray,
+                         target_features: List[str], nthread: Optional[int] = None,
+                         models: Optional[ModelSet] = None) -> StaffingPredictions:
+        """Predict already-validated, encoded rows into columnar results."""
+        predicted_transactions, role_hours = self._predict_rows(dates, weather_codes, event_codes, nthread, models)
+        stats = self._stats
+        started = time.perf_counter() if stats is not None else 0.0
+        predictions = StaffingPredictions.from_arrays(role_hours, predicted_transactions, target_features, dates,
+                                                      self._decode(weather_codes, self.WEATHER_CODES),
+                                                      self._decode(event_codes, self.EVENT_CODES))
+        if stats is not None:
+            stats.lap('stage.results', len(dates), started)
+        return predictions
+
+    @_instrumented('predict_columns')
+    def predict_columns(
             self,
             dates: List[datetime],
             weather_conditions: List[str],
             events: List[str],
-            target_features: Optional[List[str]] = None
-    ) -> pd.DataFrame:
+            target_features: Optional[List[str]] = None,
+            nthread: Optional[int] = None,
+            intervals: bool = False,
+            fidelity: Any = None
+    ) -> StaffingPredictions:
         """
-        Batch prediction for multiple dates.
+        Batch prediction returning columnar arrays instead of a DataFrame or per-day dicts.
+
+        Unlike batch_predict, invalid inputs are not skipped.
 
         Args:
             dates: List of dates for prediction
-            weather_conditions: List of weather conditions (same length as dates)
-            events: List of events (same length as dates)
+            weather_conditions: Weather conditions (same length as dates), as names or integer codes
+            events: Events (same length as dates), as names or integer codes
+            target_features: List of staffing role column names
+            nthread: Optional cap on the threads this call may use
+            intervals: Also evaluate the quantile models (see load_quantile_models)
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds of the
+                point models to evaluate; quantile models always run in full
+
+        Returns:
+            StaffingPredictions with one row per input
+
+        Raises:
+            ValueError: If input lists have different lengths, an input or fidelity is invalid,
+                models (or, with intervals, quantile models) not loaded
+        """
+        if not (len(dates) == len(weather_conditions) == len(events)):
+            raise ValueError("All input lists must have the same length")
+        models, _ = self._models_at(fidelity)
+        self._check_models_loaded(models)
+        weather_codes, event_codes = self.encode_inputs(weather_conditions, events)
+        invalid = self.validate_codes(weather_codes, event_codes)
+        if invalid.any():
+            i = int(np.argmax(invalid))
+            raise ValueError(self._input_error(weather_conditions[i], events[i]))
+
+        if target_features is None:
+            target_features = self.DEFAULT_STAFFING_ROLES.copy()
+
+        if not intervals:
+            return self._predict_columns(dates, weather_codes, event_codes, target_features, nthread, models)
+        if models.quantile_models is None:
+            raise ValueError("Quantile models not loaded. Use load_quantile_models() first.")
+
+        # Point and quantile models of both stages share one feature matrix
+        features = self._assemble_features(dates, weather_codes, event_codes)
+        with self._inference_slots:
+            predicted_transactions, role_hours = self._predict_matrix_serial(features, models)
+            transaction_quantiles, role_hour_quantiles = models.quantile_models.predict(
+                features, len(self.TX_FEATURE_COLUMNS)
+            )
+        predictions = StaffingPredictions.from_arrays(role_hours, predicted_transactions, target_features, dates,
+                                                      self._decode(weather_codes, self.WEATHER_CODES),
+                                                      self._decode(event_codes, self.EVENT_CODES))
+        return predictions.with_intervals(models.quantile_models.quantiles, transaction_quantiles,
+                                          role_hour_quantiles)
+
+    @_instrumented('predict_range', count_rows=_range_days)
+    def predict_range(
+            self,
+            start_date: datetime.date,
+            end_date: datetime.date,
+            weather: str = 'sunny',
+            event: str = 'regular_day',
+            target_features: Optional[List[str]] = None,
+            nthread: Optional[int] = None,
+            fidelity: Any = None
+    ) -> StaffingPredictions:
+        """
+        Predict every day of a date range under one weather condition and event.
+
+        Days already predicted by earlier calls with the same conditions (and
+        models and fidelity) come from range_cache; all missing sub-ranges are
+        predicted together in one batched pass.
+
+        Args:
+            start_date: First day of the range
+            end_date: Last day of the range (inclusive)
+            weather: Weather condition for every day, as a name or integer code
+            event: Campus event for every day, as a name or integer code
             target_features: List of staffing role column names
+            nthread: Optional cap on the threads this call may use
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
+
+        Returns:
+            StaffingPredictions with one row per day, in date order
+
+        Raises:
+            ValueError: If the range is empty, an input or fidelity is invalid, or models not loaded
+        """
+        if end_date < start_date:
+            raise ValueError("end_date must not be before start_date")
+        models, fraction = self._models_at(fidelity)
+        self._check_models_loaded(models)
+        weather_codes, event_codes = self.encode_inputs([weather], [event])
+        if self.validate_codes(weather_codes, event_codes)[0]:
+            raise ValueError(self._input_error(weather, event))
+
+        if target_features is None:
+            target_features = self.DEFAULT_STAFFING_ROLES.copy()
+
+        def compute(ordinals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            dates = [datetime.datetime.fromordinal(ordinal) for ordinal in ordinals.tolist()]
+            return self._predict_rows(dates, np.repeat(weather_codes, len(dates)),
+                                      np.repeat(event_codes, len(dates)), nthread, models)
+
+        start, stop = start_date.toordinal(), end_date.toordinal() + 1
+        key = (models.version, fraction, int(weather_codes[0]), int(event_codes[0]))
+        predicted_transactions, role_hours = self.range_cache.get_range(key, start, stop, compute)
+
+        num_days = stop - start
+        predictions = StaffingPredictions.from_arrays(
+            role_hours, predicted_transactions, target_features, None,
+            self._decode(weather_codes, self.WEATHER_CODES) * num_days,
+            self._decode(event_codes, self.EVENT_CODES) * num_days
+        )
+        first_day = np.datetime64(datetime.date.fromordinal(start), 'D')
+        predictions.dates = (first_day + np.arange(num_days)).astype(str).tolist()
+        return predictions
+
+    @_instrumented('predict_scenarios')
+    def predict_scenarios(
+            self,
+            dates: Sequence[datetime.date],
+            weather_conditions: Sequence,
+            events: Sequence,
+            target_features: Optional[List[str]] = None,
+            nthread: Optional[int] = None,
+            fidelity: Any = None
+    ) -> StaffingPredictions:
+        """
+        Predict arbitrary (date, weather, event) rows, evaluating each distinct scenario once.
+
+        Duplicate rows are collapsed before one batched pass and the results are
+        expanded back, so the output has one row per input, in input order.
+
+        Args:
+            dates: Date of each row
+            weather_conditions: Weather condition per row, as names or integer codes
+            events: Campus event per row, as names or integer codes
+            target_features: List of staffing role column names
+            nthread: Optional cap on the threads this call may use
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
+
+        Returns:
+            StaffingPredictions with one row per input
+
+        Raises:
+            ValueError: If input lists have different lengths, a row or fidelity is invalid,
+                or models not loaded
+        """
+        if not (len(dates) == len(weather_conditions) == len(events)):
+            raise ValueError("All input lists must have the same length")
+        models, _ = self._models_at(fidelity)
+        self._check_models_loaded(models)
+        weather_codes, event_codes = self.encode_inputs(weather_conditions, events)
+        invalid = self.validate_codes(weather_codes, event_codes)
+        if invalid.any():
+            i = int(np.argmax(invalid))
+            raise ValueError(f"Row {i}: {self._input_error(weather_conditions[i], events[i])}")
+
+        if target_features is None:
+            target_features = self.DEFAULT_STAFFING_ROLES.copy()
+
+        ordinals = np.fromiter((date.toordinal() for date in dates), dtype=np.int64, count=len(dates))
+        keys = (ordinals * len(self.WEATHER_CODES) + weather_codes) * len(self.EVENT_CODES) + event_codes
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        if self._stats is not None:
+            self._stats.count('scenario_duplicates', len(keys) - len(first))
+
+        predicted_transactions, role_hours = self._predict_rows(
+            [dates[i] for i in first], weather_codes[first], event_codes[first], nthread, models
+        )
+        return StaffingPredictions.from_arrays(
+            role_hours[inverse], predicted_transactions[inverse], target_features, dates,
+            self._decode(weather_codes, self.WEATHER_CODES), self._decode(event_codes, self.EVENT_CODES)
+        )
+
+    def _scenario_grid(self, days: Sequence[datetime.date]) -> Tuple[List[datetime.date], np.ndarray, np.ndarray]:
+        """Rows for every weather x event combination of each day: day-major, then weather, then event."""
+        num_weather, num_events = len(self.WEATHER_CODES), len(self.EVENT_CODES)
+        dates = [day for day in days for _ in range(num_weather * num_events)]
+        weather_codes = np.tile(np.repeat(np.arange(num_weather, dtype=np.int64), num_events), len(days))
+        event_codes = np.tile(np.arange(num_events, dtype=np.int64), num_weather * len(days))
+        return dates, weather_codes, event_codes
+
+    @_instrumented('predict_scenario_matrix')
+    def predict_scenario_matrix(
+            self,
+            dates: Sequence[datetime.date],
+            target_features: Optional[List[str]] = None,
+            nthread: Optional[int] = None,
+            fidelity: Any = None
+    ) -> StaffingPredictions:
+        """
+        Predict every weather x event combination for each date in one batch.
+
+        Rows are ordered day-major, then WEATHER_CODES, then EVENT_CODES, so the
+        arrays of the result reshape to (len(dates), weather, event). Days inside
+        the scenario cube are served from it.
+
+        Args:
+            dates: Dates to predict
+            target_features: List of staffing role column names
+            nthread: Optional cap on the threads this call may use
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
+
+        Returns:
+            StaffingPredictions with len(WEATHER_CODES) * len(EVENT_CODES) rows per date
+
+        Raises:
+            ValueError: If fidelity is invalid or models not loaded
+        """
+        models, _ = self._models_at(fidelity)
+        self._check_models_loaded(models)
+        if target_features is None:
+            target_features = self.DEFAULT_STAFFING_ROLES.copy()
+
+        rows, weather_codes, event_codes = self._scenario_grid(dates)
+        predicted_transactions, role_hours = self._predict_rows(rows, weather_codes, event_codes, nthread, models)
+        return StaffingPredictions.from_arrays(role_hours, predicted_transactions, target_features, rows,
+                                               self._decode(weather_codes, self.WEATHER_CODES),
+                                               self._decode(event_codes, self.EVENT_CODES))
+
+    @_instrumented('predict_staffing_intervals', batched=False)
+    def predict_staffing_intervals(
+            self,
+            date: datetime,
+            weather: str,
+            event: str,
+            target_features: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Point prediction plus prediction intervals for one day.
+
+        Args:
+            date: Date for prediction
+            weather: Weather condition
+            event: Campus event type
+            target_features: List of staffing role column names
+
+        Returns:
+            The predict_staffing_requirements dictionary with an added 'intervals'
+            entry mapping 'predicted_transactions', 'total_predicted_hours' and each
+            role to {'p10': ..., 'p50': ..., 'p90': ...} (one key per loaded quantile)
+
+        Raises:
+            ValueError: If an input is invalid or models/quantile models not loaded
+        """
+        return self.predict_columns([date], [weather], [event], target_features, intervals=True).row(0)
+
+    def fidelity_report(self, data_path: str = 'df.csv',
+                        levels: Optional[Dict[str, float]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Measure each fidelity level against the full models on historical inputs.
+
+        Every (date, weather, campus_event) row of the data file is predicted at
+        full fidelity and at each level; errors are relative to the full
+        prediction, not to the recorded actuals.
+
+        Args:
+            data_path: CSV with date, weather and campus_event columns
+            levels: Level name -> fraction of boosting rounds (defaults to FIDELITY_LEVELS)
 
         Returns:
-            DataFrame with predictions for all dates
+            Level name -> {'fraction', 'tx_rounds', 'work_rounds', 'transactions_mae',
+            'transactions_mape', 'total_hours_mae', 'total_hours_mape', 'total_hours_max_error',
+            'role_hours_mae', 'seconds', 'speedup'}
 
         Raises:
-            ValueError: If input lists have different lengths or models not loaded
+            ValueError: If models are not loaded
+        """
+        models = self._models
+        self._check_models_loaded(models)
+        if levels is None:
+            levels = self.FIDELITY_LEVELS
+
+        data = pd.read_csv(data_path)
+        dates = [datetime.datetime.strptime(date, '%Y-%m-%d') for date in data['date']]
+        weather_codes, event_codes = self.encode_inputs(list(data['weather']), list(data['campus_event']))
+        keep = np.flatnonzero(~self.validate_codes(weather_codes, event_codes))
+        features = self._assemble_features([dates[i] for i in keep], weather_codes[keep], event_codes[keep])
+
+        def run(level_models: ModelSet) -> Tuple[np.ndarray, np.ndarray, float]:
+            started = time.perf_counter()
+            with self._inference_slots:
+                predicted_transactions, role_hours = self._predict_matrix_serial(features.copy(), level_models)
+            return predicted_transactions, role_hours, time.perf_counter() - started
+
+        full_transactions, full_hours, full_seconds = run(models)
+        full_total = full_hours.sum(axis=1, dtype=np.float64)
+        report = {}
+        for name, fraction in levels.items():
+            fraction = self._resolve_fidelity(fraction)
+            level_models = models.at_fidelity(fraction)
+            predicted_transactions, role_hours, seconds = run(level_models)
+            transaction_error = np.abs(predicted_transactions - full_transactions)
+            total_error = np.abs(role_hours.sum(axis=1, dtype=np.float64) - full_total)
+            report[name] = {
+                'fraction': fraction,
+                'tx_rounds': level_models.tx_stage.num_rounds(),
+                'work_rounds': level_models.work_stage.num_rounds(),
+                'transactions_mae': round(float(transaction_error.mean()), 2),
+                'transactions_mape': round(float((transaction_error / np.maximum(full_transactions, 1)).mean() * 100), 2),
+                'total_hours_mae': round(float(total_error.mean()), 2),
+                'total_hours_mape': round(float((total_error / np.maximum(full_total, 1)).mean() * 100), 2),
+                'total_hours_max_error': round(float(total_error.max()), 2),
+                'role_hours_mae': round(float(np.abs(role_hours - full_hours).mean()), 3),
+                'seconds': round(seconds, 4),
+                'speedup': round(full_seconds / seconds, 2) if seconds else None,
+            }
+        return report
+
+    def iter_predict(
+            self,
+            dates: List[datetime],
+            weather_conditions: List[str],
+            events: List[str],
+            target_features: Optional[List[str]] = None,
+            chunk_size: int = 256,
+            nthread: Optional[int] = None,
+            fidelity: Any = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streaming batch prediction: yield predictions chunk by chunk as they are computed.
+
+        Each chunk is a DataFrame covering the next chunk_size input rows, in input
+        order and indexed by input position, with the batch_predict columns plus an
+        'error' column. Rows with invalid inputs are kept, with the validation
+        message in 'error' and NaN predictions; valid rows have error None. Memory
+        use is bounded by chunk_size regardless of the horizon length.
+
+        Args:
+            dates: List of dates for prediction
+            weather_conditions: Weather conditions (same length as dates), as names or integer codes
+            events: Events (same length as dates), as names or integer codes
+            target_features: List of staffing role column names
+            chunk_size: Input rows per yielded chunk
+            nthread: Optional cap on the threads each chunk may use
+            fidelity: Optional FIDELITY_LEVELS name or fraction of boosting rounds to evaluate
+
+        Yields:
+            DataFrame of predictions for one chunk of input rows
+
+        Raises:
+            ValueError: If input lists have different lengths, models not loaded or fidelity is invalid
         """
         if not (len(dates) == len(weather_conditions) == len(events)):
             raise ValueError("All input lists must have the same length")
+        models, _ = self._models_at(fidelity)
+        self._check_models_loaded(models)
 
         if target_features is None:
             target_features = self.DEFAULT_STAFFING_ROLES.copy()
 
-        results = []
+        # Encode and validate the whole horizon once; chunks then only slice
+        weather_codes, event_codes = self.encode_inputs(weather_conditions, events)
+        invalid = self.validate_codes(weather_codes, event_codes)
+
+        for start in range(0, len(dates), chunk_size):
+            stats = self._stats
+            started = time.perf_counter() if stats is not None else 0.0
+            stop = start + chunk_size
+            chunk_dates = list(dates[start:stop])
+            chunk_weather, chunk_events = weather_codes[start:stop], event_codes[start:stop]
+            chunk_invalid = invalid[start:stop]
+
+            errors = [None] * len(chunk_dates)
+            if not chunk_invalid.any():
+                frame = self._predict_columns(chunk_dates, chunk_weather, chunk_events, target_features,
+                                              nthread, models).to_pandas()
+            else:
+                for i in np.flatnonzero(chunk_invalid):
+                    errors[i] = self._input_error(weather_conditions[start + i], events[start + i])
+                valid = np.flatnonzero(~chunk_invalid)
+                frame = self._predict_columns(
+                    [chunk_dates[i] for i in valid], chunk_weather[valid], chunk_events[valid],
+                    target_features, nthread, models
+                ).to_pandas() if len(valid) else pd.DataFrame(columns=target_features + ['total_predicted_hours',
+                                                                                        'predicted_transactions'])
+                frame.index = valid
+                frame = frame.reindex(range(len(errors)))
+                frame['date'] = [date.strftime('%Y-%m-%d') for date in chunk_dates]
+                frame['weather'] = self._input_names(weather_conditions[start:stop], chunk_weather,
+                                                     self.WEATHER_CODES)
+                frame['event'] = self._input_names(events[start:stop], chunk_events, self.EVENT_CODES)
+
+            frame['error'] = pd.Series(errors, index=frame.index, dtype=object)
+            frame.index = pd.RangeIndex(start, start + len(frame))
+            if stats is not None:
+                stats.lap('iter_predict', len(frame), started)
+            yield frame
+
+    def build_scenario_cube(
+            self,
+            start_date: Optional[datetime.date] = None,
+            num_days: int = 365,
+            path: Optional[str] = None
+    ) -> ScenarioCube:
+        """
+        Precompute every date x weather x event combination in one batched pass.
+
+        Once built, predict_transactions, predict_staffing_requirements and
+        batch_predict serve any row inside the horizon with an array lookup.
+        The cube is rebuilt in the background, CUBE_REBUILD_DELAY seconds after
+        the last model (re)load.
 
-        for date, weather, event in zip(dates, weather_conditions, events):
+        Args:
+            start_date: First day of the horizon (defaults to today)
+            num_days: Number of days covered
+            path: Optional .npz file; reused if it matches the current models,
+                otherwise (re)written after building
+
+        Returns:
+            The installed ScenarioCube
+
+        Raises:
+            ValueError: If either model is not loaded
+        """
+        self._check_models_loaded()
+
+        if start_date is None:
+            start_date = datetime.date.today()
+        if isinstance(start_date, datetime.datetime):
+            start_date = start_date.date()
+        self._cube_config = {'start_date': start_date, 'num_days': num_days, 'path': path}
+
+        models = self._models
+        cube = self._materialize_cube(start_date, num_days, path, models)
+        with self._cube_lock:
+            # A model swap while building makes this cube stale; the swap schedules its own rebuild
+            if models.version == self.model_version:
+                cube.model_version = models.version
+                self.scenario_cube = cube
+        return cube
+
+    def build_scenario_cube_async(
+            self,
+            start_date: Optional[datetime.date] = None,
+            num_days: int = 365,
+            path: Optional[str] = None
+    ) -> threading.Thread:
+        """Same as build_scenario_cube, but runs on a background daemon thread."""
+        thread = threading.Thread(
+            target=self._build_cube_quietly,
+            args=(start_date, num_days, path),
+            name='scenario-cube-builder',
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _build_cube_quietly(self, start_date, num_days, path) -> None:
+        try:
+            self.build_scenario_cube(start_date, num_days, path)
+        except Exception as e:
+            logger.error("Error building scenario cube: %s", e)
+
+    def _materialize_cube(self, start_date: datetime.date, num_days: int, path: Optional[str],
+                          models: ModelSet) -> ScenarioCube:
+        model_signature = models.signature
+        weather_conditions = self.get_available_weather_conditions()
+        events = self.get_available_events()
+        calendar_fingerprint = self.calendar_features._config_fingerprint()
+
+        if path and os.path.exists(path):
             try:
-                prediction = self.predict_staffing_requirements(date, weather, event, target_features)
-                prediction['date'] = date.strftime('%Y-%m-%d')
-                prediction['weather'] = weather
-                prediction['event'] = event
-                results.append(prediction)
+                cube = ScenarioCube.load(path)
+                if (cube.model_signature == model_signature
+                        and cube.calendar_fingerprint == calendar_fingerprint
+                        and cube.start_ordinal == start_date.toordinal()
+                        and cube.num_days == num_days
+                        and cube.weather_conditions == weather_conditions
+                        and cube.events == events):
+                    return cube
             except Exception as e:
-                print(f"Error predicting for {date}: {e}")
-                continue
-
-        return pd.DataFrame(results)
+                logger.warning("Ignoring unreadable scenario cube at %s: %s", path, e)
+
+        days = [start_date + datetime.timedelta(days=i) for i in range(num_days)]
+        dates, weather_codes, event_codes = self._scenario_grid(days)
+        predicted_transactions, role_hours = self._predict_with_models(dates, weather_codes, event_codes, models=models)
+        cube = ScenarioCube(
+            start_date=start_date,
+            weather_conditions=weather_conditions,
+            events=events,
+            transactions=predicted_transactions.reshape(num_days, len(weather_conditions), len(events)),
+            hours=role_hours.reshape(num_days, len(weather_conditions), len(events), -1),
+            model_signature=model_signature,
+            calendar_fingerprint=calendar_fingerprint,
+        )
+        if path:
+            cube.save(path)
+        return cube
+
+    def _current_cube(self, models: Optional[ModelSet] = None) -> Optional[ScenarioCube]:
+        """The installed cube, if it was built from the given (default: live) full-fidelity models and the current calendar."""
+        models = models or self._models
+        cube = self.scenario_cube
+        if cube is None or cube.model_version != models.version or models.fidelity < 1:
+            return None
+        if cube.calendar_fingerprint != self.calendar_features._config_fingerprint():
+            return None
+        return cube
 
     def get_available_weather_conditions(self) -> List[str]:
         """Get list of available weather conditions."""
@@ -378,7 +2839,780 @@ class StaffingPredictor:
     def __repr__(self) -> str:
         tx_loaded = "✓" if self.tx_estimator is not None else "✗"
         work_loaded = "✓" if self.work_estimator is not None else "✗"
-        return f"StaffingPredictor(tx_model={tx_loaded}, work_model={work_loaded})"
+        return (f"StaffingPredictor(tx_model={tx_loaded}, work_model={work_loaded}, "
+                f"model_version={self.model_version}, backend={self.backend})")
+
+
+def _take(values: Sequence, indices: np.ndarray) -> Sequence:
+    """Rows of a list or array at the given positions, keeping arrays as arrays."""
+    if isinstance(values, np.ndarray):
+        return values[indices]
+    return [values[i] for i in indices]
+
+
+def _file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_native_booster(path: str, expected_sha256: Optional[str] = None, use_mmap: bool = True,
+                         compile_trees: bool = False) -> Any:
+    """
+    Load one native booster file, verifying its checksum when one is given.
+
+    With compile_trees the result is a CompiledTreeEnsemble; JSON files are then
+    parsed directly, without going through xgboost.
+
+    Booster.load_model only accepts a path or a writable bytearray, so the file
+    is copied into one bytearray either way; use_mmap only checksums the mapped
+    file before that copy.
+    """
+    with open(path, 'rb') as f:
+        if use_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if expected_sha256 and hashlib.sha256(mapped).hexdigest() != expected_sha256:
+                    raise ValueError(f"Checksum mismatch for model file {path}")
+                raw = bytearray(mapped)
+        else:
+            # Read straight into the bytearray rather than copying a bytes object
+            raw = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(raw)
+            if expected_sha256 and hashlib.sha256(raw).hexdigest() != expected_sha256:
+                raise ValueError(f"Checksum mismatch for model file {path}")
+
+    if compile_trees and path.endswith('.json'):
+        return CompiledTreeEnsemble.from_json_model(json.loads(bytes(raw)))
+    if xgb is None:
+        raise ImportError(f"xgboost is required to read {path}; convert the models with --format json")
+
+    booster = xgb.Booster()
+    booster.load_model(raw)
+    return CompiledTreeEnsemble.from_booster(booster) if compile_trees else booster
+
+
+def convert_pickle_models(tx_model_path: str, work_model_path: str, output_dir: str,
+                          model_format: str = 'ubj') -> str:
+    """
+    Convert pickled tx/work models into the native artifact format.
+
+    Args:
+        tx_model_path: Pickled transaction model
+        work_model_path: Pickled staffing model
+        output_dir: Directory for the native artifacts
+        model_format: 'ubj' or 'json'
+
+    Returns:
+        Path of the written metadata file
+    """
+    predictor = StaffingPredictor(cache_size=0)
+    predictor.load_models(tx_model_path, work_model_path)
+    return predictor.save_native_models(output_dir, model_format)
+
+
+# Per-process predictor used by ParallelStaffingPredictor workers
+_worker_predictor: Optional[StaffingPredictor] = None
+
+
+def _load_predictor(tx_model_path: Optional[str], work_model_path: Optional[str],
+                    native_model_dir: Optional[str], backend: str, nthread: Optional[int]) -> StaffingPredictor:
+    """Build a StaffingPredictor from native artifacts when given, otherwise from the pickles."""
+    predictor = StaffingPredictor(backend=backend, nthread=nthread, cache_size=0)
+    if native_model_dir:
+        predictor.load_native_models(native_model_dir)
+    else:
+        predictor.load_models(tx_model_path, work_model_path)
+    return predictor
+
+
+def _init_worker(tx_model_path: Optional[str], work_model_path: Optional[str],
+                 native_model_dir: Optional[str], backend: str) -> None:
+    """Process pool initializer: load the models once per worker."""
+    global _worker_predictor
+    _worker_predictor = _load_predictor(tx_model_path, work_model_path, native_model_dir, backend, nthread=1)
+
+
+def _predict_shard(dates: List[datetime], weather_conditions: List[str], events: List[str],
+                   target_features: Optional[List[str]]) -> pd.DataFrame:
+    """Run one shard on the worker's predictor."""
+    return _worker_predictor.batch_predict(dates, weather_conditions, events, target_features)
+
+
+class ScenarioSession:
+    """
+    Incremental what-if editing of one date range.
+
+    Holds the range's current per-day weather/event inputs and predictions.
+    apply() takes edits for a few days and re-predicts only the rows whose
+    inputs actually changed, returning those rows plus updated totals, so an
+    interactive edit costs O(changed days) rather than O(range). Range totals
+    are kept in integer tenths of an hour (every prediction is rounded to 0.1),
+    so incremental updates never drift from a full recomputation. If the
+    predictor's models are swapped, the next call recomputes the whole range.
+
+    Sessions are safe to share between threads; edits are serialized.
+    """
+
+    def __init__(
+            self,
+            predictor: StaffingPredictor,
+            start_date: datetime.date,
+            end_date: datetime.date,
+            weather: str = 'sunny',
+            event: str = 'regular_day',
+            target_features: Optional[List[str]] = None
+    ):
+        """
+        Args:
+            predictor: Loaded predictor used for every (re)computation
+            start_date: First day of the range
+            end_date: Last day of the range (inclusive)
+            weather: Initial weather condition of every day, as a name or integer code
+            event: Initial event of every day, as a name or integer code
+            target_features: List of staffing role column names
+
+        Raises:
+            ValueError: If the range is empty or the initial inputs are invalid
+        """
+        if isinstance(start_date, datetime.datetime):
+            start_date = start_date.date()
+        if isinstance(end_date, datetime.datetime):
+            end_date = end_date.date()
+        if start_date > end_date:
+            raise ValueError("start_date cannot be after end_date")
+
+        self.predictor = predictor
+        self.roles = list(target_features or predictor.get_default_staffing_roles())
+        self.start_ordinal = start_date.toordinal()
+        num_days = end_date.toordinal() - self.start_ordinal + 1
+        self.dates = [start_date + datetime.timedelta(days=i) for i in range(num_days)]
+        self.weather = [self._input_name(weather, StaffingPredictor.WEATHER_CODES)] * num_days
+        self.events = [self._input_name(event, StaffingPredictor.EVENT_CODES)] * num_days
+        self._lock = threading.Lock()
+        self._recompute_all()
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _predict(self, indices: np.ndarray) -> StaffingPredictions:
+        return self.predictor.predict_columns(
+            [self.dates[i] for i in indices], [self.weather[i] for i in indices],
+            [self.events[i] for i in indices], self.roles
+        )
+
+    def _recompute_all(self) -> None:
+        self.model_version = self.predictor.model_version
+        predictions = self._predict(np.arange(len(self.dates)))
+        self.role_hours = predictions.role_hours
+        self.total_hours = predictions.total_predicted_hours
+        self.transactions = predictions.predicted_transactions
+        self._role_tenths = np.rint(self.role_hours.astype(np.float64) * 10).astype(np.int64).sum(axis=0)
+        self._total_tenths = int(np.rint(self.total_hours.astype(np.float64) * 10).astype(np.int64).sum())
+        self._total_transactions = int(self.transactions.sum())
+
+    def _index(self, date: Any) -> int:
+        if isinstance(date, str):
+            date = datetime.datetime.strptime(date, '%Y-%m-%d')
+        elif not isinstance(date, datetime.date):
+            raise ValueError(f"Invalid date: {date!r}. Use YYYY-MM-DD")
+        index = date.toordinal() - self.start_ordinal
+        if not 0 <= index < len(self.dates):
+            raise ValueError(f"Date {date:%Y-%m-%d} is outside the session range")
+        return index
+
+    @staticmethod
+    def _input_name(value: Any, table: Tuple[str, ...]) -> Any:
+        """Name for an integer code; other values are returned as given for validation."""
+        if isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)) and 0 <= value < len(table):
+            return table[value]
+        return value
+
+    def apply(self, changes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Apply per-day edits and re-predict only the days whose inputs changed.
+
+        Args:
+            changes: Edits like {'date': '2025-10-30', 'weather': 'rainy', 'event': 'club_fair'};
+                weather and event are each optional names or integer codes, later edits of a day win
+
+        Returns:
+            Dictionary with 'changed' (records of the re-predicted days) and 'totals'
+
+        Raises:
+            ValueError: If a date is invalid or outside the range, or a weather/event is invalid;
+                no edit is applied in that case
+        """
+        with self._lock:
+            edits = {}
+            for change in changes:
+                index = self._index(change['date'])
+                weather, event = edits.get(index, (self.weather[index], self.events[index]))
+                if 'weather' in change:
+                    weather = self._input_name(change['weather'], StaffingPredictor.WEATHER_CODES)
+                if 'event' in change:
+                    event = self._input_name(change['event'], StaffingPredictor.EVENT_CODES)
+                self.predictor._validate_inputs(weather, event)
+                edits[index] = (weather, event)
+
+            if self.model_version != self.predictor.model_version:
+                for index, (weather, event) in edits.items():
+                    self.weather[index], self.events[index] = weather, event
+                self._recompute_all()
+                return {'changed': self.records(), 'totals': self.totals()}
+
+            changed = np.array(sorted(index for index, inputs in edits.items()
+                                      if inputs != (self.weather[index], self.events[index])), dtype=np.int64)
+            if len(changed) == 0:
+                return {'changed': [], 'totals': self.totals()}
+
+            for index in changed:
+                self.weather[index], self.events[index] = edits[index]
+            predictions = self._predict(changed)
+
+            # Swap old rows out of the running totals and the new ones in
+            old_tenths = np.rint(self.role_hours[changed].astype(np.float64) * 10).astype(np.int64)
+            new_tenths = np.rint(predictions.role_hours.astype(np.float64) * 10).astype(np.int64)
+            self._role_tenths += new_tenths.sum(axis=0) - old_tenths.sum(axis=0)
+            self._total_tenths += int(
+                np.rint(predictions.total_predicted_hours.astype(np.float64) * 10).sum()
+                - np.rint(self.total_hours[changed].astype(np.float64) * 10).sum()
+            )
+            self._total_transactions += int(predictions.predicted_transactions.sum() - self.transactions[changed].sum())
+
+            self.role_hours[changed] = predictions.role_hours
+            self.total_hours[changed] = predictions.total_predicted_hours
+            self.transactions[changed] = predictions.predicted_transactions
+            return {'changed': self.records(changed), 'totals': self.totals()}
+
+    def refresh(self) -> bool:
+        """
+        Recompute the whole range if the predictor's models changed.
+
+        Returns:
+            True if the range was recomputed
+        """
+        with self._lock:
+            if self.model_version == self.predictor.model_version:
+                return False
+            self._recompute_all()
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every day's record and the totals, read together under the session lock."""
+        with self._lock:
+            return {'records': self.records(), 'totals': self.totals()}
+
+    def records(self, indices: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Per-day records (native Python values) for the given row indices, or every day."""
+        if indices is None:
+            indices = np.arange(len(self.dates))
+        role_hours = self.role_hours[indices].tolist()
+        total_hours = self.total_hours[indices].tolist()
+        transactions = self.transactions[indices].tolist()
+        records = []
+        for row, index in enumerate(np.asarray(indices).tolist()):
+            record = dict(zip(self.roles, role_hours[row]))
+            record['total_predicted_hours'] = total_hours[row]
+            record['predicted_transactions'] = transactions[row]
+            record['date'] = self.dates[index].strftime('%Y-%m-%d')
+            record['weather'] = self.weather[index]
+            record['event'] = self.events[index]
+            records.append(record)
+        return records
+
+    def totals(self) -> Dict[str, Any]:
+        """Range totals: hours per role, total hours and transactions, and daily averages."""
+        num_days = len(self.dates)
+        total_hours = self._total_tenths / 10
+        return {
+            'days': num_days,
+            'total_predicted_hours': total_hours,
+            'total_predicted_transactions': self._total_transactions,
+            'average_daily_hours': round(total_hours / num_days, 1),
+            'average_daily_transactions': round(self._total_transactions / num_days, 1),
+            'role_hours': {role: int(tenths) / 10 for role, tenths in zip(self.roles, self._role_tenths)},
+        }
+
+    def __repr__(self) -> str:
+        return (f"ScenarioSession(start={self.dates[0]:%Y-%m-%d}, days={len(self.dates)}, "
+                f"model_version={self.model_version})")
+
+
+class ParallelStaffingPredictor:
+    """
+    Shards large batch predictions across a pool of worker processes.
+
+    Each worker loads the models once (via the pool initializer) and runs
+    single-threaded batch_predict calls over contiguous shards of the input;
+    shard results are concatenated back in input order. Inputs smaller than
+    min_parallel_rows are predicted in-process, where pool overhead would
+    dominate.
+    """
+
+    def __init__(
+            self,
+            tx_model_path: Optional[str] = None,
+            work_model_path: Optional[str] = None,
+            native_model_dir: Optional[str] = None,
+            backend: str = 'xgboost',
+            max_workers: Optional[int] = None,
+            chunk_size: Optional[int] = None,
+            min_parallel_rows: int = 2000
+    ):
+        """
+        Args:
+            tx_model_path: Path to the pickled transaction model
+            work_model_path: Path to the pickled staffing model
+            native_model_dir: Directory of native model artifacts, used instead of the pickles when given
+            backend: StaffingPredictor backend used in every process
+            max_workers: Number of worker processes (defaults to the number of CPUs)
+            chunk_size: Rows per shard (defaults to about four shards per worker)
+            min_parallel_rows: Inputs with fewer rows are predicted in-process
+        """
+        if native_model_dir is None and (tx_model_path is None or work_model_path is None):
+            raise ValueError("Either native_model_dir or both tx_model_path and work_model_path are required")
+
+        self.tx_model_path = tx_model_path
+        self.work_model_path = work_model_path
+        self.native_model_dir = native_model_dir
+        self.backend = backend
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.min_parallel_rows = min_parallel_rows
+
+        self._local_predictor: Optional[StaffingPredictor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def local_predictor(self) -> StaffingPredictor:
+        """In-process predictor used for small inputs, loaded on first use."""
+        with self._lock:
+            if self._local_predictor is None:
+                self._local_predictor = _load_predictor(
+                    self.tx_model_path, self.work_model_path, self.native_model_dir, self.backend, nthread=None
+                )
+            return self._local_predictor
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.tx_model_path, self.work_model_path, self.native_model_dir, self.backend),
+                )
+            return self._pool
+
+    def _shard_size(self, num_rows: int) -> int:
+        if self.chunk_size:
+            return self.chunk_size
+        return max(1, -(-num_rows // (self.max_workers * 4)))
+
+    def batch_predict(
+            self,
+            dates: List[datetime],
+            weather_conditions: List[str],
+            events: List[str],
+            target_features: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Batch prediction for multiple dates, sharded across worker processes.
+
+        Same arguments and output as StaffingPredictor.batch_predict.
+
+        Raises:
+            ValueError: If input lists have different lengths
+        """
+        if not (len(dates) == len(weather_conditions) == len(events)):
+            raise ValueError("All input lists must have the same length")
+
+        num_rows = len(dates)
+        if self.max_workers == 1 or num_rows < self.min_parallel_rows:
+            return self.local_predictor.batch_predict(dates, weather_conditions, events, target_features)
+
+        shard_size = self._shard_size(num_rows)
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_predict_shard, list(dates[start:start + shard_size]),
+                        list(weather_conditions[start:start + shard_size]),
+                        list(events[start:start + shard_size]), target_features)
+            for start in range(0, num_rows, shard_size)
+        ]
+
+        # Futures are collected in submission order, so rows come back in input order
+        shards = [future.result() for future in futures]
+        shards = [shard for shard in shards if not shard.empty]
+        if not shards:
+            return pd.DataFrame()
+        return pd.concat(shards, ignore_index=True)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def __enter__(self) -> 'ParallelStaffingPredictor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def __repr__(self) -> str:
+        return (f"ParallelStaffingPredictor(max_workers={self.max_workers}, chunk_size={self.chunk_size}, "
+                f"min_parallel_rows={self.min_parallel_rows}, backend={self.backend})")
+
+
+class ModelFileWatcher:
+    """
+    Polls model files and hot-reloads a StaffingPredictor when they change.
+
+    Watches the two pickles, or model_meta.json of a native artifact directory
+    (save_native_models writes it last). A change is acted on only once the
+    files' modification times and sizes have stayed the same for a full poll
+    interval, so a model that is still being copied into place is never loaded
+    half-written. Failed reloads keep the current models and are not retried
+    until the files change again.
+    """
+
+    def __init__(
+            self,
+            predictor: StaffingPredictor,
+            tx_model_path: Optional[str] = None,
+            work_model_path: Optional[str] = None,
+            native_model_dir: Optional[str] = None,
+            interval: float = 30.0
+    ):
+        """
+        Args:
+            predictor: Predictor to reload
+            tx_model_path: Pickled transaction model to watch
+            work_model_path: Pickled staffing model to watch
+            native_model_dir: Native artifact directory to watch instead of the pickles
+            interval: Seconds between polls
+        """
+        if native_model_dir:
+            self.paths = [os.path.join(native_model_dir, MODEL_METADATA_FILE)]
+        elif tx_model_path and work_model_path:
+            self.paths = [tx_model_path, work_model_path]
+        else:
+            raise ValueError("Either native_model_dir or both tx_model_path and work_model_path are required")
+
+        self.predictor = predictor
+        self.reload_kwargs = {'tx_model_path': tx_model_path, 'work_model_path': work_model_path,
+                              'native_model_dir': native_model_dir}
+        self.interval = interval
+        self._loaded = self._file_state()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_state(self) -> Tuple:
+        state = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                state.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                state.append((path, None, None))
+        return tuple(state)
+
+    def check(self) -> bool:
+        """
+        Poll once.
+
+        Returns:
+            True if the models were reloaded
+        """
+        state = self._file_state()
+        if state == self._loaded or any(mtime is None for _, mtime, _ in state):
+            self._pending = None
+            return False
+        if state != self._pending:
+            # Changed since the last poll; wait for the files to settle
+            self._pending = state
+            return False
+
+        self._pending = None
+        self._loaded = state
+        try:
+            version = self.predictor.reload_models(**self.reload_kwargs)
+        except Exception as e:
+            logger.error("Error reloading changed models, keeping the current ones: %s", e)
+            return False
+        logger.info("Reloaded changed models (model_version=%s)", version)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self) -> 'ModelFileWatcher':
+        """Start polling on a background daemon thread."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='model-file-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop polling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def resident_memory_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class FacilityRegistry:
+    """
+    StaffingPredictors for several dining facilities, keyed by facility ID.
+
+    Each facility has its own tx/work model pair (pickles, or a native artifact
+    directory) and optionally quantile models. Predictors are loaded on first
+    use. The resident memory of each load is measured (growth of the process
+    RSS across the load, at least the size of the model files) and, when a
+    memory budget is set, the least recently used facilities are evicted until
+    the loaded ones fit. A facility used again after eviction is simply
+    reloaded. Predictors registered as already loaded (e.g. the app's main
+    predictor) count towards the budget but are never evicted.
+
+    Thread-safe: loads are serialized so concurrent first requests for one
+    facility load it once, and memory deltas are attributable to one load.
+    """
+
+    def __init__(
+            self,
+            facilities: Optional[Dict[str, Dict[str, Any]]] = None,
+            default_facility: Optional[str] = None,
+            memory_budget_mb: Optional[float] = None,
+            predictor_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            facilities: Facility ID -> config with 'tx_model_path' and 'work_model_path'
+                and/or 'native_model_dir', plus optional 'quantile_model_dir' and 'name'
+            default_facility: Facility used when a request names none (defaults to the first)
+            memory_budget_mb: Cap on the summed resident memory of loaded facilities (None for no cap)
+            predictor_options: Extra StaffingPredictor arguments (backend, nthread, cache_size, ...)
+        """
+        self.facilities: Dict[str, Dict[str, Any]] = {}
+        self.default_facility = default_facility
+        self.memory_budget_mb = memory_budget_mb
+        self.predictor_options = predictor_options or {}
+        self._loaded: OrderedDict = OrderedDict()
+        self._memory: Dict[str, int] = {}
+        self._pinned = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        for facility_id, config in (facilities or {}).items():
+            self.register(facility_id, **config)
+
+    @classmethod
+    def from_config(cls, path: str, **kwargs) -> 'FacilityRegistry':
+        """
+        Build a registry from a JSON file.
+
+        The file holds {"facilities": {id: config, ...}} and optionally "default"
+        and "memory_budget_mb"; relative model paths are resolved against the
+        file's directory. Keyword arguments override the file's settings.
+        """
+        with open(path) as f:
+            config = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        facilities = {}
+        for facility_id, facility in config['facilities'].items():
+            facilities[facility_id] = {
+                key: os.path.join(base_dir, value) if key.endswith(('_path', '_dir')) and value else value
+                for key, value in facility.items()
+            }
+        kwargs.setdefault('default_facility', config.get('default'))
+        kwargs.setdefault('memory_budget_mb', config.get('memory_budget_mb'))
+        return cls(facilities, **kwargs)
+
+    def register(self, facility_id: str, tx_model_path: Optional[str] = None, work_model_path: Optional[str] = None,
+                 native_model_dir: Optional[str] = None, quantile_model_dir: Optional[str] = None,
+                 name: Optional[str] = None, predictor: Optional[StaffingPredictor] = None,
+                 memory_bytes: Optional[int] = None) -> None:
+        """
+        Add a facility, or replace its configuration.
+
+        Args:
+            facility_id: Key requests use to select the facility
+            tx_model_path: Pickled transaction model
+            work_model_path: Pickled staffing model
+            native_model_dir: Native artifact directory, used instead of the pickles when it has model_meta.json
+            quantile_model_dir: Optional quantile model directory
+            name: Display name
+            predictor: Already-loaded predictor to use as-is; it is never evicted
+            memory_bytes: Measured resident memory of the given predictor (defaults to its model files' size)
+
+        Raises:
+            ValueError: If neither a predictor, a native_model_dir nor both pickles are given
+        """
+        if predictor is None and not native_model_dir and not (tx_model_path and work_model_path):
+            raise ValueError(f"Facility {facility_id} needs native_model_dir or both tx_model_path and work_model_path")
+        self.facilities[facility_id] = {
+            'name': name or facility_id, 'tx_model_path': tx_model_path, 'work_model_path': work_model_path,
+            'native_model_dir': native_model_dir, 'quantile_model_dir': quantile_model_dir,
+        }
+        if self.default_facility is None:
+            self.default_facility = facility_id
+        self.evict(facility_id)
+        if predictor is not None:
+            with self._lock:
+                self._loaded[facility_id] = predictor
+                self._memory[facility_id] = memory_bytes or self._model_file_bytes(self.facilities[facility_id])
+                self._pinned.add(facility_id)
+
+    def resolve(self, facility_id: Optional[str] = None) -> str:
+        """
+        The facility a request refers to (the default when none is given).
+
+        Raises:
+            ValueError: If the facility is unknown or not a string
+        """
+        facility_id = facility_id or self.default_facility
+        if not isinstance(facility_id, str):
+            raise ValueError(f"Facility ID must be a string, got {type(facility_id).__name__}")
+        if facility_id not in self.facilities:
+            raise ValueError(f"Unknown facility: {facility_id}. Must be one of {list(self.facilities)}")
+        return facility_id
+
+    def get(self, facility_id: Optional[str] = None) -> StaffingPredictor:
+        """
+        Predictor for a facility, loading it on first use.
+
+        Args:
+            facility_id: Facility ID (defaults to default_facility)
+
+        Returns:
+            The facility's StaffingPredictor
+
+        Raises:
+            ValueError: If the facility is unknown or not a string
+        """
+        facility_id = self.resolve(facility_id)
+        with self._lock:
+            predictor = self._loaded.get(facility_id)
+            if predictor is not None:
+                self._loaded.move_to_end(facility_id)
+                return predictor
+
+        with self._load_lock:
+            # Another thread may have loaded it while this one waited
+            with self._lock:
+                predictor = self._loaded.get(facility_id)
+                if predictor is not None:
+                    self._loaded.move_to_end(facility_id)
+                    return predictor
+
+            config = self.facilities[facility_id]
+            before = resident_memory_bytes()
+            predictor = self._load(config)
+            after = resident_memory_bytes()
+            measured = after - before if before is not None and after is not None else 0
+            memory = max(measured, self._model_file_bytes(config))
+
+            with self._lock:
+                self._loaded[facility_id] = predictor
+                self._memory[facility_id] = memory
+                self._evict_over_budget(keep=facility_id)
+            print(f"✓ Loaded models for facility {facility_id} ({memory / 1e6:.1f} MB resident)")
+            return predictor
+
+    def _load(self, config: Dict[str, Any]) -> StaffingPredictor:
+        predictor = StaffingPredictor(**self.predictor_options)
+        native_model_dir = config['native_model_dir']
+        if native_model_dir and os.path.exists(os.path.join(native_model_dir, MODEL_METADATA_FILE)):
+            predictor.load_native_models(native_model_dir)
+        else:
+            predictor.load_models(config['tx_model_path'], config['work_model_path'])
+        quantile_model_dir = config['quantile_model_dir']
+        if quantile_model_dir and os.path.exists(os.path.join(quantile_model_dir, QUANTILE_METADATA_FILE)):
+            predictor.load_quantile_models(quantile_model_dir)
+        return predictor
+
+    @staticmethod
+    def _model_file_bytes(config: Dict[str, Any]) -> int:
+        """On-disk size of a facility's models, the floor of its resident memory estimate."""
+        paths = [config['tx_model_path'], config['work_model_path']]
+        if config['native_model_dir'] and os.path.isdir(config['native_model_dir']):
+            paths = [os.path.join(config['native_model_dir'], name) for name in os.listdir(config['native_model_dir'])]
+        return sum(os.path.getsize(path) for path in paths if path and os.path.isfile(path))
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Drop least recently used facilities until the loaded ones fit the budget. Caller holds _lock."""
+        if self.memory_budget_mb is None:
+            return
+        budget = self.memory_budget_mb * 1e6
+        for facility_id in list(self._loaded):
+            if sum(self._memory.values()) <= budget:
+                break
+            if facility_id == keep or facility_id in self._pinned:
+                continue
+            del self._loaded[facility_id]
+            memory = self._memory.pop(facility_id)
+            print(f"Evicted facility {facility_id} ({memory / 1e6:.1f} MB) to stay within "
+                  f"{self.memory_budget_mb:g} MB")
+
+    def evict(self, facility_id: str) -> bool:
+        """
+        Unload a facility's predictor (it is reloaded on next use).
+
+        Returns:
+            True if it was loaded
+        """
+        with self._lock:
+            self._pinned.discard(facility_id)
+            self._memory.pop(facility_id, None)
+            return self._loaded.pop(facility_id, None) is not None
+
+    def loaded(self) -> List[str]:
+        """Loaded facility IDs, least recently used first."""
+        with self._lock:
+            return list(self._loaded)
+
+    def info(self) -> Dict[str, Any]:
+        """Configured facilities with their load state and resident memory."""
+        with self._lock:
+            loaded = list(self._loaded)
+            memory = dict(self._memory)
+        return {
+            'default_facility': self.default_facility,
+            'memory_budget_mb': self.memory_budget_mb,
+            'resident_mb': round(sum(memory.values()) / 1e6, 1),
+            'facilities': {
+                facility_id: {
+                    'name': config['name'],
+                    'loaded': facility_id in memory,
+                    'resident_mb': round(memory[facility_id] / 1e6, 1) if facility_id in memory else None,
+                    'lru_rank': loaded.index(facility_id) if facility_id in loaded else None,
+                }
+                for facility_id, config in self.facilities.items()
+            },
+        }
+
+    def __len__(self) -> int:
+        return len(self.facilities)
+
+    def __repr__(self) -> str:
+        return (f"FacilityRegistry(facilities={len(self.facilities)}, loaded={len(self._loaded)}, "
+                f"memory_budget_mb={self.memory_budget_mb})")
+
 
 # # Example usage:
 # # Initialize the predictor
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the app's forecast prefetcher off the network during tests
+os.environ.setdefault('FORECAST_REFRESH_INTERVAL', '0')
+
+TX_MODEL_PATH = os.path.join(ROOT, 'tx_model.pkl')
+WORK_MODEL_PATH = os.path.join(ROOT, 'work_model.pkl')
+
+
+@pytest.fixture(scope='session')
+def predictor():
+    """Predictor with the shipped models and no prediction cache"""
+    from inference import StaffingPredictor
+    return StaffingPredictor(TX_MODEL_PATH, WORK_MODEL_PATH, cache_size=0)
+
+
+@pytest.fixture
+def fresh_predictor():
+    """Predictor for tests that swap models or build a scenario cube"""
+    from inference import StaffingPredictor
+    predictor = StaffingPredictor(TX_MODEL_PATH, WORK_MODEL_PATH)
+    yield predictor
+    predictor.shutdown()
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client for the app, imported from the repository root so it finds the models"""
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        import app as app_module
+    finally:
+        os.chdir(cwd)
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+BATCH_RANGE = {'start_date': '2025-01-01', 'end_date': '2025-01-03'}
+
+
+def post(client, path, **kwargs):
+    response = client.post(path, **kwargs)
+    # Streamed responses must be consumed before the next request
+    body = response.get_data()
+    return response.status_code, json.loads(body) if body else None
+
+
+class TestBatchPredict:
+    def test_per_day_conditions(self, client):
+        status, rows = post(client, '/api/batch-predict', json={
+            **BATCH_RANGE,
+            'weather': ['sunny', 1, 'rainy'],
+            'overrides': {'2025-01-02': {'event': 'graduation'}},
+        })
+        assert status == 200
+        assert [row['weather'] for row in rows] == ['sunny', 'cloudy', 'rainy']
+        assert rows[1]['event'] == 'graduation'
+
+    @pytest.mark.parametrize('payload', [
+        {'start_date': '2025-01-01'},
+        {**BATCH_RANGE, 'end_date': '2025-13-01'},
+        {'start_date': '2000-01-01', 'end_date': '2025-01-01'},
+        {**BATCH_RANGE, 'weather': ['sunny']},
+        {**BATCH_RANGE, 'weather': ['sunny', ['x'], 'rainy']},
+        {**BATCH_RANGE, 'event': {'name': 'graduation'}},
+        {**BATCH_RANGE, 'weather': True},
+        {**BATCH_RANGE, 'weather': 'snow'},
+        {**BATCH_RANGE, 'overrides': ['2025-01-02']},
+        {**BATCH_RANGE, 'overrides': {'2025-02-01': {'weather': 'rainy'}}},
+        {**BATCH_RANGE, 'overrides': {'2025-01-02': {'temperature': 30}}},
+        {**BATCH_RANGE, 'overrides': {'2025-01-02': {'weather': None}}},
+        {**BATCH_RANGE, 'fidelity': 'bogus'},
+        {**BATCH_RANGE, 'facility': ['x']},
+    ])
+    def test_rejects_bad_input(self, client, payload):
+        status, body = post(client, '/api/batch-predict', json=payload)
+        assert status == 400
+        assert 'error' in body
+
+
+class TestScenarioBatch:
+    def test_dedupes_names_and_codes(self, client):
+        status, body = post(client, '/api/scenario-batch', json={'scenarios': [
+            ['2025-01-01', 'sunny', 'regular_day'],
+            {'date': '2025-01-01', 'weather': 0, 'event': 0},
+            ['2025-01-02', 'rainy', 'graduation'],
+        ]})
+        assert status == 200
+        assert body['count'] == 3
+        assert body['unique_scenarios'] == 2
+        assert body['results'][0]['predicted_transactions'] == body['results'][1]['predicted_transactions']
+
+    def test_csv_upload(self, client):
+        csv = b'date,weather,campus_event\n2025-01-01,sunny,regular_day\n2025-01-02,rainy,graduation\n'
+        status, body = post(client, '/api/scenario-batch', data=csv, content_type='text/csv')
+        assert status == 200
+        assert [row['event'] for row in body['results']] == ['regular_day', 'graduation']
+
+    @pytest.mark.parametrize('payload', [
+        {},
+        {'scenarios': 'nope'},
+        {'scenarios': [['2025-01-01', 'sunny']]},
+        {'scenarios': [[20250101, 'sunny', 'regular_day']]},
+        {'scenarios': [['2025-01-01', ['sunny'], 'regular_day']]},
+        {'scenarios': [['2025-01-01', True, 'regular_day']]},
+        {'scenarios': [['01/01/2025', 'sunny', 'regular_day']]},
+        {'scenarios': [['2025-01-01', 'snow', 'regular_day']]},
+        {'scenarios': [['2025-01-01', 'sunny', 99]]},
+        {'scenarios': [['2025-01-01', 'sunny', 'regular_day']], 'fidelity': 5},
+    ])
+    def test_rejects_bad_input(self, client, payload):
+        status, body = post(client, '/api/scenario-batch', json=payload)
+        assert status == 400
+        assert 'error' in body
+
+    def test_csv_missing_column(self, client):
+        status, body = post(client, '/api/scenario-batch', data=b'date,weather\n2025-01-01,sunny\n',
+                            content_type='text/csv')
+        assert status == 400
+        assert 'event' in body['error']
+
+
+class TestScenarioMatrix:
+    def test_matrix_shape(self, client):
+        status, body = post(client, '/api/scenario-matrix', json={'dates': ['2025-01-01', '2025-01-02']})
+        assert status == 200
+        assert [matrix['date'] for matrix in body['matrices']] == ['2025-01-01', '2025-01-02']
+        transactions = body['matrices'][0]['predicted_transactions']
+        assert len(transactions) == len(body['weather_conditions'])
+        assert len(transactions[0]) == len(body['events'])
+
+    @pytest.mark.parametrize('payload', [
+        {},
+        {'dates': '2025-01-01'},
+        {'dates': ['2025-01-01'] * 1000},
+        {'dates': ['2025-1-xx']},
+        {'dates': [20250101]},
+        {'date': '2025-01-01', 'fidelity': 'bogus'},
+    ])
+    def test_rejects_bad_input(self, client, payload):
+        status, body = post(client, '/api/scenario-matrix', json=payload)
+        assert status == 400
+        assert 'error' in body
@@ -0,0 +1,195 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from conftest import TX_MODEL_PATH, WORK_MODEL_PATH
+from inference import DateRangeCache, StaffingPredictor
+
+START = datetime.datetime(2025, 1, 1)
+
+
+def sample_inputs(count=60, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = [START + datetime.timedelta(days=int(day)) for day in rng.integers(0, 730, count)]
+    weather = [StaffingPredictor.WEATHER_CODES[i] for i in rng.integers(0, len(StaffingPredictor.WEATHER_CODES), count)]
+    events = [StaffingPredictor.EVENT_CODES[i] for i in rng.integers(0, len(StaffingPredictor.EVENT_CODES), count)]
+    return dates, weather, events
+
+
+class TestBatchedPrediction:
+    def test_batch_matches_per_row(self, predictor):
+        dates, weather, events = sample_inputs(40)
+        frame = predictor.batch_predict(dates, weather, events)
+        assert len(frame) == len(dates)
+        for i, (date, w, e) in enumerate(zip(dates, weather, events)):
+            single = predictor.predict_staffing_requirements(date, w, e)
+            row = frame.iloc[i]
+            assert row['predicted_transactions'] == single['predicted_transactions']
+            assert row['predicted_transactions'] == predictor.predict_transactions(date, w, e)
+            for key, value in single.items():
+                assert np.float32(row[key]) == np.float32(value), key
+
+    def test_codes_match_names(self, predictor):
+        dates, weather, events = sample_inputs(20, seed=1)
+        weather_codes = [StaffingPredictor.WEATHER_CODES.index(w) for w in weather]
+        event_codes = [StaffingPredictor.EVENT_CODES.index(e) for e in events]
+        by_name = predictor.batch_predict(dates, weather, events)
+        by_code = predictor.batch_predict(dates, weather_codes, event_codes)
+        assert (by_name.values == by_code.values).all()
+
+    def test_invalid_rows_are_skipped(self, predictor):
+        dates, weather, events = sample_inputs(5, seed=2)
+        weather[2] = 'foggy'
+        frame = predictor.batch_predict(dates, weather, events)
+        assert list(frame['date']) == [date.strftime('%Y-%m-%d') for i, date in enumerate(dates) if i != 2]
+
+    def test_scenarios_match_batch(self, predictor):
+        dates, weather, events = sample_inputs(30, seed=3)
+        # Repeat rows so deduplication has work to do
+        dates, weather, events = dates * 2, weather * 2, events * 2
+        scenarios = predictor.predict_scenarios(dates, weather, events)
+        frame = predictor.batch_predict(dates, weather, events)
+        assert (scenarios.predicted_transactions == frame['predicted_transactions'].values).all()
+        assert np.allclose(scenarios.total_predicted_hours, frame['total_predicted_hours'].values)
+
+    def test_range_matches_batch(self, predictor):
+        end = START + datetime.timedelta(days=20)
+        predictions = predictor.predict_range(START, end, 'rainy', 'club_fair')
+        dates = [START + datetime.timedelta(days=i) for i in range(21)]
+        frame = predictor.batch_predict(dates, ['rainy'] * 21, ['club_fair'] * 21)
+        assert predictions.dates == list(frame['date'])
+        assert (predictions.predicted_transactions == frame['predicted_transactions'].values).all()
+
+
+class TestModelSwap:
+    def test_swap_clears_caches_and_cube(self, fresh_predictor):
+        fresh_predictor.build_scenario_cube(START.date(), 10)
+        fresh_predictor.predict_transactions(START, 'sunny', 'regular_day')
+        fresh_predictor.predict_range(START, START + datetime.timedelta(days=5))
+        assert fresh_predictor.scenario_cube is not None
+        version = fresh_predictor.model_version
+
+        fresh_predictor.load_tx_model(TX_MODEL_PATH)
+
+        assert fresh_predictor.model_version == version + 1
+        assert fresh_predictor.scenario_cube is None
+        assert fresh_predictor.cache_info()['size'] == 0
+        assert fresh_predictor.range_cache.info()['days'] == 0
+
+    def test_cube_matches_models(self, fresh_predictor):
+        dates = [START + datetime.timedelta(days=i) for i in range(3)]
+        before = fresh_predictor.predict_scenario_matrix(dates)
+        fresh_predictor.build_scenario_cube(START.date(), 10)
+        after = fresh_predictor.predict_scenario_matrix(dates)
+        assert (before.predicted_transactions == after.predicted_transactions).all()
+        assert (before.role_hours == after.role_hours).all()
+
+    def test_reduced_fidelity_skips_cube(self, fresh_predictor):
+        fresh_predictor.build_scenario_cube(START.date(), 10)
+        cached = fresh_predictor.predict_transactions(START, 'sunny', 'regular_day', fidelity='preview')
+        uncubed = StaffingPredictor(TX_MODEL_PATH, WORK_MODEL_PATH, cache_size=0)
+        assert cached == uncubed.predict_transactions(START, 'sunny', 'regular_day', fidelity='preview')
+
+
+def test_numpy_backend_matches_xgboost(predictor):
+    numpy_predictor = StaffingPredictor(TX_MODEL_PATH, WORK_MODEL_PATH, cache_size=0, backend='numpy')
+    dates, weather, events = sample_inputs(100, seed=4)
+    expected = predictor.batch_predict(dates, weather, events)
+    actual = numpy_predictor.batch_predict(dates, weather, events)
+    assert (expected['predicted_transactions'].values == actual['predicted_transactions'].values).all()
+    # Float32 summation order differs, which can flip a 0.1 rounding step
+    assert np.abs(expected['total_predicted_hours'].values - actual['total_predicted_hours'].values).max() <= 0.2
+
+
+class TestDateRangeCache:
+    @staticmethod
+    def compute_with_log(log):
+        def compute(ordinals):
+            log.append(ordinals.tolist())
+            return (ordinals * 2.0, ordinals.astype(np.int64))
+        return compute
+
+    def test_fills_only_gaps(self):
+        cache = DateRangeCache()
+        calls = []
+        compute = self.compute_with_log(calls)
+        cache.get_range('k', 10, 20, compute)
+        cache.get_range('k', 30, 40, compute)
+        doubled, ordinals = cache.get_range('k', 5, 45, compute)
+
+        assert calls[2] == list(range(5, 10)) + list(range(20, 30)) + list(range(40, 45))
+        assert (ordinals == np.arange(5, 45)).all()
+        assert (doubled == np.arange(5, 45) * 2.0).all()
+        assert cache.info()['segments'] == 1
+        assert cache.info()['hits'] == 20
+
+    def test_fully_cached_range_does_not_compute(self):
+        cache = DateRangeCache()
+        calls = []
+        cache.get_range('k', 0, 30, self.compute_with_log(calls))
+        cache.get_range('k', 5, 25, self.compute_with_log(calls))
+        assert len(calls) == 1
+
+    def test_overlapping_insert_keeps_the_union(self):
+        cache = DateRangeCache()
+        cache._insert('k', [(0, 10, (np.arange(10),))])
+        cache._insert('k', [(0, 30, (np.arange(30),))])
+        [(start, stop, (values,))] = cache._segments['k']
+        assert (start, stop) == (0, 30)
+        assert (values == np.arange(30)).all()
+
+    def test_single_key_is_capped(self):
+        cache = DateRangeCache(max_days=100)
+        doubled, _ = cache.get_range('k', 0, 500, self.compute_with_log([]))
+        assert len(doubled) == 500
+        assert cache.info()['days'] == 100
+
+    def test_evicts_least_recently_used_key(self):
+        cache = DateRangeCache(max_days=50)
+        compute = self.compute_with_log([])
+        cache.get_range('a', 0, 30, compute)
+        cache.get_range('b', 0, 30, compute)
+        assert cache.info()['keys'] == 1
+        assert 'b' in cache._segments
+
+    def test_empty_range_rejected(self):
+        with pytest.raises(ValueError):
+            DateRangeCache().get_range('k', 5, 5, self.compute_with_log([]))
+
+
+class TestEncoding:
+    WEATHER = StaffingPredictor.WEATHER_CODES
+
+    def encode(self, values):
+        return StaffingPredictor._encode(values, self.WEATHER).tolist()
+
+    def test_names_codes_and_mixed(self):
+        assert self.encode(['sunny', 'rainy']) == [0, 2]
+        assert self.encode(['sunny', 2, 'rainy', 0]) == [0, 2, 2, 0]
+        assert self.encode(np.array([1, 3], dtype=np.int8)) == [1, 3]
+
+    def test_unknown_and_out_of_range_values(self):
+        assert self.encode(['snow', 'sunny']) == [-1, 0]
+        assert self.encode([-1, 4, 65536]) == [-1, -1, -1]
+        # Values past int16 must not wrap around to a valid code
+        assert self.encode(np.array([65536, 1])) == [-1, 1]
+
+    def test_bools_and_other_types_rejected(self):
+        assert self.encode([True, False]) == [-1, -1]
+        assert self.encode(np.array([True])) == [-1]
+        assert self.encode([['sunny'], {'a': 1}, 1.0, None]) == [-1, -1, -1, -1]
+
+    def test_empty(self):
+        assert self.encode([]) == []
+        assert self.encode(np.array([], dtype=np.int64)) == []
+
+    def test_validate_codes(self, predictor):
+        weather_codes, event_codes = predictor.encode_inputs(['sunny', 'snow', 1, 0], ['regular_day', 0, 99, True])
+        assert predictor.validate_codes(weather_codes, event_codes).tolist() == [False, True, True, True]
+
+    def test_input_error_messages(self, predictor):
+        assert predictor._input_error('sunny', 'regular_day') == ''
+        assert 'Invalid weather: snow' in predictor._input_error('snow', 'regular_day')
+        assert 'Invalid event code: 99' in predictor._input_error('sunny', 99)
+        assert 'Invalid weather: True' in predictor._input_error(True, 'regular_day')
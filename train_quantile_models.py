@@ -0,0 +1,95 @@
+"""
+Train companion quantile models that give StaffingPredictor prediction intervals.
+
+Fits one multi-quantile XGBoost model for transactions and one per staffing role
+on the historical data, using the predictor's own feature construction so the
+feature order matches the point models, and writes them as native boosters plus
+a quantile_meta.json sidecar for StaffingPredictor.load_quantile_models.
+
+Usage:
+    python train_quantile_models.py --data df.csv --out quantile_models --quantiles 0.1 0.5 0.9
+"""
+import argparse
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from inference import BoosterEnsemble, QuantileModels, StaffingPredictor
+
+
+def _fit_quantile_booster(features: pd.DataFrame, target: pd.Series, quantiles: List[float],
+                          n_estimators: int, max_depth: int, learning_rate: float) -> BoosterEnsemble:
+    model = xgb.XGBRegressor(
+        objective='reg:quantileerror',
+        quantile_alpha=np.array(quantiles),
+        n_estimators=n_estimators,
+        max_depth=max_depth,
+        learning_rate=learning_rate,
+        tree_method='hist',
+    )
+    model.fit(features, target)
+    return BoosterEnsemble([model.get_booster()], list(features.columns))
+
+
+def train_quantile_models(data_path: str, output_dir: str, quantiles: List[float],
+                          n_estimators: int = 300, max_depth: int = 4, learning_rate: float = 0.05,
+                          model_format: str = 'ubj') -> str:
+    """
+    Train and save quantile models for transactions and every staffing role.
+
+    Args:
+        data_path: Historical data CSV (date, weather, campus_event, total_transactions, role hours)
+        output_dir: Directory for the boosters and quantile_meta.json
+        quantiles: Quantile levels, e.g. [0.1, 0.5, 0.9]
+        n_estimators: Boosting rounds per model
+        max_depth: Maximum tree depth
+        learning_rate: Boosting learning rate
+        model_format: 'ubj' or 'json'
+
+    Returns:
+        Path of the written metadata file
+    """
+    predictor = StaffingPredictor(cache_size=0)
+    data = pd.read_csv(data_path)
+    dates = [datetime.strptime(date, '%Y-%m-%d') for date in data['date']]
+
+    tx_features = predictor.create_batch_features(dates, list(data['weather']), list(data['campus_event']))
+    work_features = tx_features.copy()
+    work_features['total_transactions'] = data['total_transactions'].to_numpy(dtype=np.float32)
+
+    print(f"Training transaction quantile model on {len(data)} days...")
+    tx_stage = _fit_quantile_booster(tx_features, data['total_transactions'], quantiles,
+                                     n_estimators, max_depth, learning_rate)
+
+    roles = predictor.get_default_staffing_roles()
+    role_stages = []
+    for role in roles:
+        print(f"Training {role} quantile model...")
+        role_stages.append(_fit_quantile_booster(work_features, data[role], quantiles,
+                                                 n_estimators, max_depth, learning_rate))
+
+    quantile_models = QuantileModels(sorted(quantiles), tx_stage, role_stages, roles)
+    return quantile_models.save(output_dir, model_format)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train quantile models for staffing prediction intervals")
+    parser.add_argument('--data', default='df.csv', help='Historical data CSV')
+    parser.add_argument('--out', default='quantile_models', help='Output directory for the quantile models')
+    parser.add_argument('--quantiles', type=float, nargs='+', default=[0.1, 0.5, 0.9], help='Quantile levels')
+    parser.add_argument('--n-estimators', type=int, default=300, help='Boosting rounds per model')
+    parser.add_argument('--max-depth', type=int, default=4, help='Maximum tree depth')
+    parser.add_argument('--learning-rate', type=float, default=0.05, help='Boosting learning rate')
+    parser.add_argument('--format', default='ubj', choices=['ubj', 'json'], help='Booster serialization format')
+    args = parser.parse_args()
+
+    metadata_path = train_quantile_models(args.data, args.out, args.quantiles, args.n_estimators,
+                                          args.max_depth, args.learning_rate, args.format)
+    print(f"✓ Quantile models written to {args.out} (metadata: {metadata_path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class CompiledTreeEnsemble:
+    """
+    A gradient-boosted tree ensemble compiled into flat NumPy arrays.
+
+    Every node of every tree is stored in contiguous arrays (split feature,
+    threshold, left/right child, default direction, leaf value), with children
+    addressed by absolute node index. Leaves point back at themselves, so a
+    batch of rows is evaluated by advancing all (row, tree) cursors one level
+    per step for max_depth steps, with no Python-level per-tree work.
+
+    Built from XGBoost's JSON model format, so it can be constructed from a
+    Booster or from a JSON model file without the xgboost runtime. Exposes the
+    subset of the Booster interface StaffingPredictor uses (inplace_predict,
+    feature_names, num_boosted_rounds), so it can stand in for a Booster.
+
+    Supports gbtree models with numerical splits and one output per tree
+    (single- or multi-target regression with an identity link).
+    """
+
+    # Objectives whose predictions are the raw margin
+    SUPPORTED_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror', 'reg:quantileerror')
+
+    # Rows evaluated per step; bounds the (rows, trees) cursor matrix
+    ROW_CHUNK = 256
+
+    def __init__(
+            self,
+            split_feature: np.ndarray,
+            threshold: np.ndarray,
+            left: np.ndarray,
+            right: np.ndarray,
+            default_left: np.ndarray,
+            value: np.ndarray,
+            roots: np.ndarray,
+            tree_group: np.ndarray,
+            iteration_indptr: np.ndarray,
+            base_score: np.ndarray,
+            max_depth: int,
+            feature_names: Optional[List[str]] = None
+    ):
+        self.split_feature = split_feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.tree_group = tree_group
+        self.iteration_indptr = iteration_indptr
+        self.base_score = base_score
+        self.max_depth = max_depth
+        self.feature_names = feature_names
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def num_outputs(self) -> int:
+        return len(self.base_score)
+
+    def num_boosted_rounds(self) -> int:
+        """Number of boosting iterations, as reported by Booster.num_boosted_rounds."""
+        return len(self.iteration_indptr) - 1
+
+    @classmethod
+    def from_booster(cls, booster: Any) -> 'CompiledTreeEnsemble':
+        """Compile an xgboost Booster (via its JSON serialization)."""
+        return cls.from_json_model(json.loads(bytes(booster.save_raw(raw_format='json'))))
+
+    @classmethod
+    def from_json_file(cls, path: str) -> 'CompiledTreeEnsemble':
+        """Compile a model saved with Booster.save_model('*.json'). Does not need xgboost."""
+        with open(path) as f:
+            return cls.from_json_model(json.load(f))
+
+    @classmethod
+    def from_json_model(cls, model: Dict[str, Any]) -> 'CompiledTreeEnsemble':
+        """
+        Compile a parsed XGBoost JSON model.
+
+        Raises:
+            ValueError: If the model uses features this evaluator does not support
+        """
+        learner = model['learner']
+        objective = learner['objective']['name']
+        if objective not in cls.SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for compiled evaluation: {objective}")
+
+        booster = learner['gradient_booster']
+        if booster['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster for compiled evaluation: {booster['name']}")
+
+        params = learner['learner_model_param']
+        num_outputs = max(1, int(params.get('num_target', 1)), int(params.get('num_class', 0)))
+        base_score = np.array([float(v) for v in params['base_score'].strip('[]').split(',')], dtype=np.float32)
+        if len(base_score) == 1 and num_outputs > 1:
+            base_score = np.repeat(base_score, num_outputs)
+
+        trees = booster['model']['trees']
+        tree_info = booster['model']['tree_info']
+        if 'iteration_indptr' in booster['model']:
+            iteration_indptr = np.array(booster['model']['iteration_indptr'], dtype=np.int64)
+        else:
+            # Older models: a fixed number of trees per round
+            num_parallel_tree = int(booster['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees_per_round = num_parallel_tree * num_outputs
+            iteration_indptr = np.arange(0, len(trees) + 1, trees_per_round, dtype=np.int64)
+
+        split_feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if int(tree['tree_param'].get('size_leaf_vector', 1)) > 1:
+                raise ValueError("Multi-output trees are not supported by the compiled evaluator")
+            if any(tree.get('split_type', [])):
+                raise ValueError("Categorical splits are not supported by the compiled evaluator")
+
+            tree_left = np.array(tree['left_children'], dtype=np.int64)
+            tree_right = np.array(tree['right_children'], dtype=np.int64)
+            is_leaf = tree_left == -1
+            node_ids = np.arange(len(tree_left), dtype=np.int64)
+
+            # Leaves loop back to themselves so extra traversal steps are no-ops
+            left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+            right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+            split_feature.append(np.where(is_leaf, 0, np.array(tree['split_indices'], dtype=np.int64)))
+            conditions = np.array(tree['split_conditions'], dtype=np.float32)
+            threshold.append(conditions)
+            value.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+            default_left.append(np.array(tree['default_left'], dtype=bool))
+            roots.append(offset)
+
+            max_depth = max(max_depth, cls._tree_depth(tree_left, tree_right))
+            offset += len(tree_left)
+
+        feature_names = learner.get('feature_names') or None
+        return cls(
+            split_feature=np.concatenate(split_feature).astype(np.int32),
+            threshold=np.concatenate(threshold),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            default_left=np.concatenate(default_left),
+            value=np.concatenate(value),
+            roots=np.array(roots, dtype=np.int32),
+            tree_group=np.array(tree_info, dtype=np.int64),
+            iteration_indptr=iteration_indptr,
+            base_score=base_score,
+            max_depth=max_depth,
+            feature_names=feature_names,
+        )
+
+    @staticmethod
+    def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+        """Depth (number of splits on the longest root-to-leaf path) of one tree."""
+        depth = np.zeros(len(left), dtype=np.int64)
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if left[node] != -1:
+                depth[left[node]] = depth[right[node]] = depth[node] + 1
+                stack.extend((left[node], right[node]))
+        return int(depth.max())
+
+    def _tree_slice(self, iteration_range: Tuple[int, int]) -> slice:
+        begin, end = iteration_range
+        if end <= 0 or end > self.num_boosted_rounds():
+            end = self.num_boosted_rounds()
+        return slice(int(self.iteration_indptr[begin]), int(self.iteration_indptr[end]))
+
+    def inplace_predict(
+            self,
+            data: np.ndarray,
+            iteration_range: Tuple[int, int] = (0, 0),
+            missing: float = np.nan,
+            validate_features: bool = False,
+            **kwargs
+    ) -> np.ndarray:
+        """
+        Evaluate the ensemble on a 2-D feature matrix.
+
+        Mirrors Booster.inplace_predict: returns shape (n,) for single-output
+        models and (n, outputs) otherwise. Only NaN is treated as missing.
+
+        Args:
+            data: Feature matrix, columns in training order
+            iteration_range: (begin, end) boosting rounds to use; (0, 0) means all
+        """
+        features = np.asarray(data, dtype=np.float32)
+        trees = self._tree_slice(iteration_range)
+        roots = self.roots[trees]
+
+        # One-hot tree -> output map lets a single matmul sum leaves per output
+        groups = np.zeros((len(roots), self.num_outputs), dtype=np.float32)
+        groups[np.arange(len(roots)), self.tree_group[trees]] = 1.0
+
+        output = np.empty((len(features), self.num_outputs), dtype=np.float32)
+        for start in range(0, len(features), self.ROW_CHUNK):
+            chunk = features[start:start + self.ROW_CHUNK]
+            rows = np.arange(len(chunk))[:, None]
+            nodes = np.broadcast_to(roots, (len(chunk), len(roots))).copy()
+
+            for _ in range(self.max_depth):
+                x = chunk[rows, self.split_feature[nodes]]
+                go_left = x < self.threshold[nodes]
+                is_missing = np.isnan(x)
+                if is_missing.any():
+                    go_left = np.where(is_missing, self.default_left[nodes], go_left)
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+            output[start:start + len(chunk)] = self.value[nodes] @ groups + self.base_score
+
+        return output[:, 0] if self.num_outputs == 1 else output
+
+    def save(self, path: str) -> None:
+        """Persist the compiled arrays to an .npz file."""
+        np.savez(
+            path,
+            split_feature=self.split_feature, threshold=self.threshold, left=self.left, right=self.right,
+            default_left=self.default_left, value=self.value, roots=self.roots, tree_group=self.tree_group,
+            iteration_indptr=self.iteration_indptr, base_score=self.base_score,
+            max_depth=np.array(self.max_depth),
+            feature_names=np.array(json.dumps(self.feature_names)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledTreeEnsemble':
+        """Load arrays written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                split_feature=data['split_feature'], threshold=data['threshold'], left=data['left'],
+                right=data['right'], default_left=data['default_left'], value=data['value'], roots=data['roots'],
+                tree_group=data['tree_group'], iteration_indptr=data['iteration_indptr'],
+                base_score=data['base_score'], max_depth=int(data['max_depth']),
+                feature_names=json.loads(str(data['feature_names'])),
+            )
+
+    def __repr__(self) -> str:
+        return (f"CompiledTreeEnsemble(trees={self.num_trees}, nodes={len(self.value)}, "
+                f"outputs={self.num_outputs}, max_depth={self.max_depth})")
@@ -1,5 +1,7 @@
 import requests
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Tuple
 import json
@@ -550,6 +552,191 @@ class WeatherService:
         }
 
 
+def classify_forecast_period(period: Dict[str, Any]) -> str:
+    """
+    Map one NWS forecast period to an ML weather category.
+
+    Args:
+        period: Period from the NWS forecast endpoint (shortForecast, detailedForecast, temperature)
+
+    Returns:
+        'rainy', 'sunny', 'cloudy' or 'extreme_heat'
+    """
+    detailed_forecast = period.get('detailedForecast', '').lower()
+    short_forecast = period.get('shortForecast', '').lower()
+
+    if 'rain' in detailed_forecast or 'rain' in short_forecast or 'shower' in detailed_forecast:
+        return 'rainy'
+    elif 'sunny' in short_forecast or 'clear' in short_forecast:
+        return 'sunny'
+    elif 'cloud' in short_forecast or 'overcast' in short_forecast:
+        return 'cloudy'
+    elif period.get('temperature', 0) > 95:  # Extreme heat threshold
+        return 'extreme_heat'
+    else:
+        return 'sunny'  # Default fallback
+
+
+class ForecastPrefetcher:
+    """
+    Keeps the NWS 7-day forecast in memory as a date -> ML weather category table.
+
+    A background daemon thread fetches the forecast on a schedule and classifies
+    every period once; get() only reads the table, so request handlers never wait
+    on the network. Each date takes the category of its first period. A failed
+    refresh keeps the previous table and is retried after retry_interval; once
+    the table is older than max_age, get() returns None so callers use their
+    default weather, and the next lookup wakes the thread for an early refresh.
+    """
+
+    FORECAST_DAYS = 7
+
+    def __init__(
+            self,
+            lat: float = 34.0575,
+            lon: float = -117.8231,
+            interval: float = 1800.0,
+            max_age: float = 21600.0,
+            retry_interval: float = 60.0,
+            timeout: float = 10.0,
+            user_agent: Optional[str] = None
+    ):
+        """
+        Args:
+            lat: Latitude of the forecast point
+            lon: Longitude of the forecast point
+            interval: Seconds between refreshes
+            max_age: Seconds after the last successful refresh before the table counts as stale
+            retry_interval: Seconds before retrying a failed refresh
+            timeout: Timeout of each HTTP request in seconds
+            user_agent: User agent string for API requests
+        """
+        self.lat = lat
+        self.lon = lon
+        self.interval = interval
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.user_agent = user_agent or "WeatherService/1.0 (weather@example.com)"
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        # Replaced as a whole on refresh, so readers never see a partial table
+        self._table: Dict[Any, str] = {}
+        self._fetched_at: Optional[float] = None
+        self._fetched_at_wall: Optional[datetime] = None
+        self._forecast_url: Optional[str] = None
+        self._last_attempt = 0.0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _fetch_periods(self) -> list:
+        headers = {'User-Agent': self.user_agent}
+        if self._forecast_url is None:
+            # The grid point's forecast URL rarely changes, so the points lookup is done once
+            response = requests.get(f"https://api.weather.gov/points/{self.lat},{self.lon}",
+                                    headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            self._forecast_url = response.json()['properties']['forecast']
+
+        try:
+            response = requests.get(self._forecast_url, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException:
+            self._forecast_url = None
+            raise
+        return response.json()['properties']['periods']
+
+    def refresh(self) -> bool:
+        """
+        Fetch the forecast and replace the table.
+
+        Returns:
+            True if the table was refreshed, False if the fetch failed (the old table is kept)
+        """
+        self._last_attempt = time.monotonic()
+        try:
+            periods = self._fetch_periods()
+            table = {}
+            for period in periods:
+                period_date = datetime.fromisoformat(period['startTime'].replace('Z', '+00:00')).date()
+                table.setdefault(period_date, classify_forecast_period(period))
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.warning(f"Forecast refresh failed, keeping the previous forecast: {e}")
+            return False
+
+        self._table = table
+        self._fetched_at = time.monotonic()
+        self._fetched_at_wall = datetime.now()
+        self.last_error = None
+        return True
+
+    @property
+    def is_stale(self) -> bool:
+        """True until the first successful refresh and once the table is older than max_age."""
+        return self._fetched_at is None or time.monotonic() - self._fetched_at > self.max_age
+
+    def get(self, date) -> Optional[str]:
+        """
+        ML weather category forecast for a date, without network access.
+
+        Args:
+            date: datetime or date
+
+        Returns:
+            The category if the date is within FORECAST_DAYS from today and the table is fresh, None otherwise
+        """
+        today = datetime.now().date()
+        target_date = date.date() if isinstance(date, datetime) else date
+
+        # Only dates within 7 days from today are forecast
+        if (target_date - today).days > self.FORECAST_DAYS or target_date < today:
+            return None
+
+        if self.is_stale:
+            if self._thread is not None and time.monotonic() - self._last_attempt > self.retry_interval:
+                self._wake.set()
+            return None
+        return self._table.get(target_date)
+
+    def status(self) -> Dict[str, Any]:
+        """The current table and its freshness."""
+        return {
+            'fetched_at': self._fetched_at_wall.isoformat(timespec='seconds') if self._fetched_at_wall else None,
+            'age_seconds': round(time.monotonic() - self._fetched_at, 1) if self._fetched_at is not None else None,
+            'stale': self.is_stale,
+            'last_error': self.last_error,
+            'forecast': {day.isoformat(): category for day, category in sorted(self._table.items())},
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            refreshed = self.refresh()
+            self._wake.wait(self.interval if refreshed else min(self.interval, self.retry_interval))
+            self._wake.clear()
+
+    def start(self) -> 'ForecastPrefetcher':
+        """Start refreshing on a background daemon thread; the first fetch runs immediately."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='forecast-prefetcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop refreshing."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2 * self.timeout)
+            self._thread = None
+
+    def __repr__(self) -> str:
+        return (f"ForecastPrefetcher(days={len(self._table)}, stale={self.is_stale}, "
+                f"interval={self.interval}, max_age={self.max_age})")
+
 # # Example usage and testing
 # if __name__ == "__main__":
 #     # Initialize weather service